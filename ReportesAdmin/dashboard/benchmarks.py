@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Iterator
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tienda.benchdata import BENCH_TAG, bench_user, seed_catalog, seed_sales
+from tienda.models import Product, Sale, SaleItem
+from tienda.views import ProductViewSet, SaleViewSet
+
+from .pdf import generate_report_pdf
+from .views import ReportView
+
+FILTER_CASES = (
+    {},
+    {'start_date': '{start}', 'end_date': '{end}'},
+    {'status': 'pending'},
+    {'category': '{category}'},
+    {'category': '{category}', 'status': 'received'},
+    {'start_date': '{start}', 'end_date': '{end}', 'status': 'return_requested'},
+    {'product_name': 'producto 1'},
+)
+CART_SIZES = (1, 10, 50)
+PDF_ROWS = (1_000, 100_000)
+# Diferencias absolutas por debajo de estas no cuentan como regresión (ruido).
+MIN_DELTA = {'ms_median': 1.0, 'peak_kib': 64.0}
+# Fecha fija para que las ventas sembradas caigan siempre en los mismos días.
+SEED_END = datetime(2025, 1, 1)
+
+
+def synthetic_rows(count: int) -> Iterator[SaleItem]:
+    sale = Sale(created_at=datetime(2025, 1, 1, 12, 0))
+    for n in range(count):
+        yield SaleItem(
+            sale=sale,
+            product_name=f"Producto {n}",
+            category_name="Electrónica",
+            quantity=n % 5 + 1,
+            unit_price=Decimal("199.90"),
+        )
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """Una corrida con tracemalloc para consultas y memoria; las demás solo miden tiempo."""
+    # Calentamiento: plantillas, cachés de consultas y conexiones abiertas.
+    func()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'ms_best': round(min(timings), 3),
+        'ms_median': round(statistics.median(timings), 3),
+        'queries': len(ctx.captured_queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def seed(*, categories: int, products: int, items: int, random_seed: int) -> None:
+    catalog = seed_catalog(categories=categories, products=products, seed=random_seed)
+    seed_sales(catalog, items=items, seed=random_seed, end=SEED_END)
+
+
+class Suite:
+    def __init__(self, repeat: int = 5) -> None:
+        self.repeat = repeat
+        self.user = bench_user()
+        self.api = APIRequestFactory()
+        self.results: dict[str, dict] = {}
+
+    def run(self) -> dict:
+        self.bench_products()
+        self.bench_sales()
+        self.bench_report()
+        self.bench_pdf()
+        return self.results
+
+    def add(self, name: str, func: Callable[[], object], repeat: int | None = None) -> None:
+        self.results[name] = measure(func, self.repeat if repeat is None else repeat)
+
+    def bench_products(self) -> None:
+        view = ProductViewSet.as_view({'get': 'list'})
+
+        def cold():
+            cache.clear()
+            view(self.api.get('/api/products/')).render()
+
+        def warm():
+            view(self.api.get('/api/products/')).render()
+
+        self.add('api.products.cold', cold)
+        self.add('api.products.warm', warm)
+
+    def bench_sales(self) -> None:
+        view = SaleViewSet.as_view({'post': 'create'})
+        products = list(Product.objects.filter(slug__startswith='bench-').order_by('pk')[:max(CART_SIZES)])
+        for size in CART_SIZES:
+            payload = {
+                'customer_name': BENCH_TAG,
+                'terms_accepted': True,
+                'items': [
+                    {'product_id': p.pk, 'quantity': 1, 'unit_price': str(p.price)} for p in products[:size]
+                ],
+            }
+
+            def post(payload=payload):
+                request = self.api.post('/api/sales/', payload, format='json')
+                force_authenticate(request, self.user)
+                response = view(request)
+                assert response.status_code == 201, response.data
+
+            self.add(f'api.sales.create.{size}', post)
+
+    def bench_report(self) -> None:
+        sample = SaleItem.objects.filter(sale__customer_name=BENCH_TAG).select_related('sale').order_by('-pk').first()
+        day = sample.sale.created_at.date()
+        values = {'start': day.replace(day=1).isoformat(), 'end': day.isoformat(), 'category': sample.category_name}
+        view = ReportView.as_view()
+        factory = RequestFactory()
+        for case in FILTER_CASES:
+            params = {key: value.format(**values) for key, value in case.items()}
+
+            def get(params=params):
+                request = factory.get('/', params)
+                request.user = self.user
+                view(request).render()
+
+            self.add(f"report.{'+'.join(case) or 'sin_filtros'}", get)
+
+    def bench_pdf(self) -> None:
+        for rows in PDF_ROWS:
+            self.add(
+                f'report.pdf.{rows}',
+                lambda rows=rows: generate_report_pdf(
+                    title='Reporte de ventas', filters={}, rows=synthetic_rows(rows), summary={}
+                ),
+                repeat=1 if rows >= 100_000 else None,
+            )
+
+
+def environment() -> dict:
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regresiones contra una corrida anterior: tiempo o memoria por encima del
+    umbral relativo, o cualquier consulta adicional."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} → {current['queries']} consultas")
+        for field, min_delta in MIN_DELTA.items():
+            limit = previous[field] * (1 + threshold)
+            if current[field] > limit and current[field] - previous[field] > min_delta:
+                regressions.append(f"{name}: {field} {previous[field]} → {current[field]}")
+    return regressions
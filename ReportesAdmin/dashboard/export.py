@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Sequence
+
+from django.db.models import Exists, OuterRef, Q, QuerySet
+
+from tienda.models import Sale
+
+EXPORT_FIELDS = (
+    'sale_id', 'sale__created_at', 'product_name', 'category_name', 'quantity', 'unit_price', 'status',
+)
+EXPORT_COLUMNS = (
+    'sale_id', 'created_at', 'product_name', 'category_name', 'quantity', 'unit_price', 'subtotal', 'status',
+)
+# Bytes acumulados antes de entregar un trozo al servidor.
+FLUSH_BYTES = 64 * 1024
+
+
+def sale_keys(items: QuerySet, sales: QuerySet | None = None) -> QuerySet:
+    """Claves (created_at, id) de las ventas con artículos en ``items``, de la más reciente a la más antigua.
+
+    La clave es solo de la venta y la recorre el índice tienda_sale_created_idx
+    (InnoDB guarda el id en cada índice secundario): con LIMIT se lee un tramo
+    del índice sin ordenar lo que falta. ``sales`` acota el recorrido (rango de fechas).
+    """
+    return (
+        (Sale.objects.all() if sales is None else sales)
+        .using(items.db)
+        .filter(Exists(items.filter(sale=OuterRef('pk'))))
+        .order_by('-created_at', '-pk')
+        .values_list('created_at', 'pk')
+    )
+
+
+def iter_sale_batches(items: QuerySet, sales: QuerySet | None = None, batch_size: int = 2000) -> Iterator[list]:
+    """Ids de las ventas de ``sale_keys`` por lotes de ``batch_size``."""
+    sales = sale_keys(items, sales)
+    cursor = None
+    while True:
+        batch = sales
+        if cursor:
+            created_at, pk = cursor
+            batch = batch.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        rows = list(batch[:batch_size])
+        if rows:
+            yield [pk for _, pk in rows]
+        if len(rows) < batch_size:
+            return
+        cursor = rows[-1]
+
+
+def iter_batches(items: QuerySet, sales: QuerySet | None = None, batch_size: int = 2000) -> Iterator[list]:
+    """Los artículos de ``items`` por lotes de ventas, en orden (fecha de venta, venta, id) descendente.
+
+    A diferencia de iterator(), no depende de cursores del lado del servidor:
+    con MySQL el cliente guardaría todo el resultado en memoria. Solo se
+    ordenan los artículos de cada lote.
+    """
+    for sale_ids in iter_sale_batches(items, sales, batch_size):
+        yield list(items.filter(sale_id__in=sale_ids).order_by('-sale__created_at', '-sale_id', '-pk'))
+
+
+def iter_items(items: QuerySet, sales: QuerySet | None = None, batch_size: int = 2000) -> Iterator:
+    """Instancias de ``items`` (con ``sale`` unida) lote por lote."""
+    for batch in iter_batches(items, sales, batch_size):
+        yield from batch
+
+
+def iter_rows(items: QuerySet, sales: QuerySet | None = None, batch_size: int = 2000) -> Iterator[tuple]:
+    """Tuplas de ``EXPORT_FIELDS`` lote por lote, sin instanciar modelos."""
+    for batch in iter_batches(items.values_list(*EXPORT_FIELDS), sales, batch_size):
+        yield from batch
+
+
+def _record(row: Sequence) -> tuple:
+    sale_id, created_at, product_name, category_name, quantity, unit_price, status = row
+    return (
+        sale_id, created_at.isoformat(sep=' '), product_name, category_name,
+        quantity, unit_price, quantity * unit_price, status,
+    )
+
+
+def _buffered(lines: Iterable[str]) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def iter_csv(rows: Iterable[Sequence]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def lines() -> Iterator[str]:
+        for record in map(_record, rows):
+            writer.writerow(record)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+
+    writer.writerow(EXPORT_COLUMNS)
+    # El encabezado sale antes de la primera consulta.
+    yield out.getvalue().encode()
+    out.seek(0)
+    out.truncate()
+    yield from _buffered(lines())
+
+
+def iter_ndjson(rows: Iterable[Sequence]) -> Iterator[bytes]:
+    yield from _buffered(
+        json.dumps(dict(zip(EXPORT_COLUMNS, record)), ensure_ascii=False, default=str) + '\n'
+        for record in map(_record, rows)
+    )
@@ -12,7 +12,7 @@ class ReportFilterForm(forms.Form):
     )
     product_name = forms.CharField(
         label='Producto', required=False,
-        widget=forms.TextInput(attrs={'placeholder': 'Nombre contiene…'})
+        widget=forms.TextInput(attrs={'placeholder': 'Palabras del nombre…'})
     )
     category = forms.CharField(
         label='Categoría', required=False,
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tienda.benchdata import bench_database, seed_catalog, seed_sales
+from tienda.models import SaleItem
+
+from dashboard.export import EXPORT_FIELDS, iter_csv, iter_rows
+from dashboard.forms import ReportFilterForm
+from dashboard.views import ReportView
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra artículos en una base de prueba desechable y mide la descarga CSV del reporte: "
+        "tiempo al primer trozo con datos y tiempo total."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200_000)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            self.stdout.write(f"Sembrando {options['items']} artículos...")
+            seed_sales(seed_catalog(), items=options['items'])
+            self.run(options['batch_size'])
+
+    def run(self, batch_size):
+        form = ReportFilterForm({'status': 'pending'})
+        view = ReportView()
+        items = view.get_queryset(form)
+
+        # Referencia: un lote ordenado por la fecha de la venta unida, como hacía el recorrido anterior.
+        started = time.perf_counter()
+        list(items.values_list(*EXPORT_FIELDS).order_by('-sale__created_at', '-pk')[:batch_size])
+        joined = time.perf_counter() - started
+
+        started = time.perf_counter()
+        first_data = None
+        size = 0
+        for n, chunk in enumerate(iter_csv(iter_rows(items, view.get_sales(form), batch_size=batch_size))):
+            size += len(chunk)
+            if n == 1:
+                first_data = time.perf_counter() - started
+        total = time.perf_counter() - started
+
+        self.stdout.write(f"{SaleItem.objects.count()} artículos, {size} bytes de CSV")
+        self.stdout.write(f"{joined * 1000:>10.1f} ms  primer lote ordenando artículos y ventas unidos")
+        self.stdout.write(f"{(first_data or total) * 1000:>10.1f} ms  primer trozo con datos")
+        self.stdout.write(f"{total * 1000:>10.1f} ms  descarga completa")
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from tienda.benchdata import bench_database, seed_catalog, seed_sales
+from tienda.models import SaleItem
+
+from dashboard.benchmarks import FILTER_CASES
+from dashboard.forms import ReportFilterForm
+from dashboard.views import ReportView
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de cada combinación de filtros del reporte (página + totales). "
+        "Sin --seed solo lee la base configurada; con --seed siembra y mide en una base de prueba desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Artículos de prueba a insertar antes de medir.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not options['seed']:
+            return self.run(options['repeat'])
+        with bench_database():
+            self.stdout.write(f"Sembrando {options['seed']} artículos...")
+            seed_sales(seed_catalog(), items=options['seed'])
+            self.run(options['repeat'])
+
+    def run(self, repeat):
+        sample = SaleItem.objects.select_related('sale').order_by('-pk').first()
+        if sample is None:
+            self.stderr.write('No hay ventas; usa --seed N.')
+            return
+        day = sample.sale.created_at.date()
+        values = {
+            'start': day.replace(day=1).isoformat(),
+            'end': day.isoformat(),
+            'category': sample.category_name,
+        }
+
+        self.stdout.write(f"{SaleItem.objects.count()} artículos en la tabla")
+        for case in FILTER_CASES:
+            params = {key: value.format(**values) for key, value in case.items()}
+            view = ReportView()
+            view.request = RequestFactory().get('/', params)
+            form = ReportFilterForm(params)
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                view.get_page(view.get_queryset(form))
+                view.get_totals(form)
+                timings.append(time.perf_counter() - started)
+            best = min(timings) * 1000
+            self.stdout.write(f"{best:>9.2f} ms  {params or 'sin filtros'}")
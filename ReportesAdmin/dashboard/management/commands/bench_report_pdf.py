@@ -0,0 +1,32 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from dashboard.benchmarks import synthetic_rows
+from dashboard.pdf import iter_report_pdf
+
+
+class Command(BaseCommand):
+    help = "Mide memoria pico y tiempo del PDF de reportes en streaming, sin base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'filas':>10} {'bytes PDF':>12} {'pico KiB':>10} {'segundos':>9}")
+        for count in options["rows"]:
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = 0
+            for chunk in iter_report_pdf(
+                title="Reporte de ventas",
+                filters={},
+                rows=synthetic_rows(count),
+                summary={"total": 0, "cantidad": 0},
+            ):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(f"{count:>10} {size:>12} {peak / 1024:>10.1f} {elapsed:>9.2f}")
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda.benchdata import bench_database
+
+from dashboard.benchmarks import Suite, compare, environment, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra datos reproducibles en una base de prueba desechable, mide la API, el reporte y el PDF "
+        "y guarda el resultado en JSON. "
+        "Con --baseline falla si alguna medición empeora más que el umbral."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--items', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=42, help='Semilla del generador de datos.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--baseline', help='JSON de una corrida anterior con el que comparar.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Aumento relativo tolerado (0.25 = 25 %%).')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"No se pudo leer la línea base: {exc}") from exc
+
+        scale = {key: options[key] for key in ('categories', 'products', 'items', 'seed')}
+        with bench_database():
+            self.stdout.write(f"Sembrando {scale['items']} artículos...")
+            seed(
+                categories=scale['categories'],
+                products=scale['products'],
+                items=scale['items'],
+                random_seed=scale['seed'],
+            )
+            results = Suite(repeat=options['repeat']).run()
+
+        Path(options['output']).write_text(
+            json.dumps({**environment(), 'scale': scale, 'results': results}, indent=2), encoding='utf-8'
+        )
+        self.stdout.write(f"{'caso':<45} {'mediana ms':>11} {'consultas':>10} {'pico KiB':>10}")
+        for name, row in results.items():
+            self.stdout.write(f"{name:<45} {row['ms_median']:>11.2f} {row['queries']:>10} {row['peak_kib']:>10.1f}")
+        self.stdout.write(f"Resultados en {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError("Regresiones:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la línea base."))
@@ -0,0 +1,274 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tienda.metrics import request_stats
+from tienda.models import Sale, SaleItem
+from tienda.rollups import rebuild_rollup
+from tienda.search import index_sold_names
+
+from .benchmarks import compare, measure, seed
+from .export import sale_keys
+from .forms import ReportFilterForm
+from .views import ReportExportView, ReportPdfView, ReportView
+
+
+class ReportFixturesMixin:
+    @classmethod
+    def create_sale(cls, created_at, items):
+        sale = Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+        Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+        for product_name, category_name, status in items:
+            SaleItem.objects.create(
+                sale=sale,
+                product_name=product_name,
+                category_name=category_name,
+                quantity=1,
+                unit_price=Decimal("10.00"),
+                status=status,
+            )
+        return sale
+
+    def report_queryset(self, **params):
+        view = ReportView()
+        view.request = RequestFactory().get("/", params)
+        return view.get_queryset(ReportFilterForm(params))
+
+
+class ReportFilterTests(ReportFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", password="secreto123", is_staff=True)
+        cls.create_sale(datetime(2025, 1, 31, 23, 59), [("Laptop", "Oficina", "pending")])
+        cls.create_sale(datetime(2025, 2, 1, 0, 0), [("Mouse", "oficina", "received")])
+        cls.create_sale(datetime(2025, 1, 1, 0, 0), [("Silla", "Hogar", "pending")])
+        rebuild_rollup()
+
+    def test_date_range_is_inclusive_by_day(self):
+        qs = self.report_queryset(start_date="2025-01-01", end_date="2025-01-31")
+        self.assertEqual(
+            sorted(qs.values_list("product_name", flat=True)), ["Laptop", "Silla"]
+        )
+
+    def test_category_matches_any_spelling(self):
+        qs = self.report_queryset(category="OFICINA")
+        self.assertEqual(sorted(qs.values_list("product_name", flat=True)), ["Laptop", "Mouse"])
+
+    def test_category_spellings_do_not_depend_on_the_rollup(self):
+        # bulk_create no pasa por las señales: el artículo no llega al resumen.
+        sale = Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+        SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product_name="Lámpara", category_name="OfIcInA", quantity=1, unit_price=Decimal("1.00"))
+        ])
+        qs = self.report_queryset(category="oficina")
+        self.assertEqual(sorted(qs.values_list("product_name", flat=True)), ["Laptop", "Lámpara", "Mouse"])
+
+    def test_product_name_matches_word_prefixes(self):
+        qs = self.report_queryset(product_name="lap")
+        self.assertEqual(list(qs.values_list("product_name", flat=True)), ["Laptop"])
+
+    def test_product_name_filter_keeps_every_match(self):
+        sale = Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+        names = [f"Cable {n:03}" for n in range(520)]
+        SaleItem.objects.bulk_create(
+            SaleItem(sale=sale, product_name=name, category_name="Oficina", quantity=1, unit_price=Decimal("1.00"))
+            for name in names
+        )
+        index_sold_names(names)
+        rebuild_rollup()
+
+        self.assertEqual(self.report_queryset(product_name="cable").count(), 520)
+        totals = ReportView().get_totals(ReportFilterForm({"product_name": "cable"}))
+        self.assertEqual(totals["total_qty"], 520)
+
+    def test_page_and_totals_render(self):
+        self.client.force_login(self.staff)
+        res = self.client.get("/", {"start_date": "2025-01-01", "end_date": "2025-01-31"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context["items"]), 2)
+        self.assertEqual(res.context["total_qty"], 2)
+
+
+@mock.patch.object(ReportView, "page_size", 3)
+class ReportPaginationTests(ReportFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", password="secreto123", is_staff=True)
+        # Seis filas con la misma fecha: el id es lo único que las ordena.
+        for _ in range(3):
+            cls.create_sale(datetime(2025, 2, 1, 12, 0), [("Laptop", "Oficina", "pending"), ("Mouse", "Oficina", "pending")])
+        cls.create_sale(datetime(2025, 1, 1, 12, 0), [("Silla", "Hogar", "pending")])
+        cls.expected = list(SaleItem.objects.order_by("-sale__created_at", "-pk").values_list("pk", flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def page(self, query="start_date=2025-01-01"):
+        res = self.client.get(f"/?{query}")
+        self.assertEqual(res.status_code, 200)
+        return [item.pk for item in res.context["items"]], res.context
+
+    def test_next_cursor_walks_ties_and_ends_without_next(self):
+        seen, pages, query = [], [], "start_date=2025-01-01"
+        while query is not None:
+            rows, ctx = self.page(query)
+            seen += rows
+            pages.append((rows, ctx["previous_query"]))
+            query = ctx["next_query"]
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(rows) for rows, _ in pages], [3, 3, 1])
+        self.assertIsNone(pages[0][1])
+
+        # Hacia atrás desde la última página se recorren las mismas páginas.
+        back, query = [], pages[-1][1]
+        while query:
+            rows, ctx = self.page(query)
+            back.append(rows)
+            query = ctx["previous_query"]
+        self.assertEqual(back, [pages[1][0], pages[0][0]])
+        self.assertIsNone(ctx["first_query"])
+
+    def test_invalid_cursor_starts_over(self):
+        for value in ("basura", "2025-13-01T00:00:00_4", "2025-02-01T12:00:00_x", "_"):
+            with self.subTest(cursor=value):
+                rows, ctx = self.page(f"start_date=2025-01-01&cursor={value}")
+                self.assertEqual(rows, self.expected[:3])
+                self.assertIsNone(ctx["first_query"])
+                rows, _ = self.page(f"start_date=2025-01-01&before={value}")
+                self.assertEqual(rows, self.expected[:3])
+
+
+@skipUnless(connection.vendor == "sqlite", "El plan se revisa con EXPLAIN QUERY PLAN de SQLite.")
+class ReportQueryPlanTests(ReportFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_sale(datetime(2025, 1, 15, 12, 0), [("Laptop", "Oficina", "pending")])
+        rebuild_rollup()
+
+    def plan(self, **params):
+        view = ReportView()
+        qs = self.report_queryset(**params)
+        return qs.order_by("-sale__created_at", "-pk").only(*view.table_fields)[:51].explain()
+
+    def test_date_range_uses_created_at_index(self):
+        plan = self.plan(start_date="2025-01-01", end_date="2025-01-31")
+        self.assertIn("tienda_sale_created_idx", plan)
+        self.assertNotIn("SCAN tienda_saleitem", plan)
+
+    def test_status_uses_composite_index(self):
+        plan = self.plan(status="pending")
+        self.assertIn("tienda_item_status_sale_idx", plan)
+
+    def test_category_and_status_use_composite_index(self):
+        plan = self.plan(category="oficina", status="pending")
+        self.assertIn("tienda_item_cat_status_idx", plan)
+        self.assertNotIn("SCAN tienda_saleitem", plan)
+
+
+class ReportExportTests(ReportFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", password="secreto123", is_staff=True)
+        cls.create_sale(datetime(2025, 1, 10, 9, 0), [("Laptop", "Oficina", "pending"), ("Mouse", "Oficina", "received")])
+        cls.create_sale(datetime(2025, 1, 20, 9, 0), [("Silla", "Hogar", "pending")])
+        cls.create_sale(datetime(2025, 3, 1, 9, 0), [("Mesa", "Hogar", "pending")])
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def download(self, url, **params):
+        params = {"start_date": "2025-01-01", "end_date": "2025-01-31", **params}
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content)
+
+    def test_csv_streams_filtered_rows_across_batches(self):
+        with mock.patch.object(ReportExportView, "batch_size", 2):
+            res, body = self.download("/descargar/csv/")
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0][:3], ["sale_id", "created_at", "product_name"])
+        self.assertEqual([row[2] for row in rows[1:]], ["Silla", "Mouse", "Laptop"])
+        self.assertEqual(rows[1][6], "10.00")
+        self.assertIn('filename="reporte_ventas.csv"', res["Content-Disposition"])
+
+    def test_ndjson_with_gzip(self):
+        res, body = self.download("/descargar/ndjson/", gzip="1", status="pending")
+        self.assertEqual(res["Content-Type"], "application/gzip")
+        records = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([record["product_name"] for record in records], ["Silla", "Laptop"])
+        self.assertEqual(records[0]["created_at"], "2025-01-20 09:00:00")
+
+    def test_pdf_streams_a_valid_document_in_keyset_batches(self):
+        with mock.patch.object(ReportPdfView, "batch_size", 2), CaptureQueriesContext(connection) as queries:
+            res, body = self.download("/descargar/")
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertTrue(body.rstrip().endswith(b"%%EOF"))
+        for name in (b"Laptop", b"Mouse", b"Silla"):
+            self.assertIn(name, body)
+        self.assertNotIn(b"Mesa", body)
+        # Dos ventas en lotes de dos: un tramo de ventas, sus artículos y el tramo vacío que cierra.
+        sql = [q["sql"] for q in queries.captured_queries]
+        sales = [s for s in sql if s.startswith('SELECT "tienda_sale"."created_at", "tienda_sale"."id"')]
+        self.assertEqual(len(sales), 2)
+        self.assertTrue(all(s.endswith("LIMIT 2") for s in sales))
+        self.assertEqual(len([s for s in sql if '"tienda_saleitem"."sale_id" IN (' in s]), 1)
+
+    def test_sale_batches_walk_the_created_at_index_without_sorting(self):
+        params = {"start_date": "2025-01-01", "end_date": "2025-01-31", "status": "pending"}
+        form = ReportFilterForm(params)
+        self.assertTrue(form.is_valid())
+        view = ReportView()
+        plan = sale_keys(view.get_queryset(form), view.get_sales(form))[:2000].explain()
+        self.assertIn("tienda_sale_created_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTests(TestCase):
+    def test_report_timings_reach_the_staff_endpoint(self):
+        request_stats.reset()
+        staff = get_user_model().objects.create_user("staff", password="secreto123", is_staff=True)
+        self.client.force_login(staff)
+
+        res = self.client.get("/", {"start_date": "2025-01-01"})
+        self.assertIn("db;dur=", res["Server-Timing"])
+        data = self.client.get("/metricas/").json()
+        self.assertEqual(data["views"]["dashboard:reportes"]["requests"], 1)
+
+
+class BenchmarkHarnessTests(TestCase):
+    def test_measure_counts_queries(self):
+        result = measure(lambda: list(SaleItem.objects.all()), repeat=2)
+        self.assertEqual(result["queries"], 1)
+        self.assertLessEqual(result["ms_best"], result["ms_median"])
+
+    def test_compare_flags_extra_queries_and_slowdowns_beyond_threshold(self):
+        baseline = {
+            "api": {"ms_median": 10.0, "queries": 2, "peak_kib": 100.0},
+            "pdf": {"ms_median": 100.0, "queries": 0, "peak_kib": 500.0},
+        }
+        results = {
+            "api": {"ms_median": 11.5, "queries": 3, "peak_kib": 120.0},
+            "pdf": {"ms_median": 130.0, "queries": 0, "peak_kib": 510.0},
+            "nuevo": {"ms_median": 1.0, "queries": 9, "peak_kib": 1.0},
+        }
+        regressions = compare(results, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("api: 2 → 3 consultas", regressions)
+        self.assertTrue(regressions[1].startswith("pdf: ms_median"))
+
+    def test_seeding_refuses_the_configured_database(self):
+        with self.assertRaises(RuntimeError):
+            seed(categories=1, products=1, items=1, random_seed=0)
+        self.assertFalse(SaleItem.objects.exists())
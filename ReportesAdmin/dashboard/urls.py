@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ReportView, ReportPdfView, DashboardLoginView, DashboardLogoutView
+from .views import ReportView, ReportPdfView, ReportExportView, DashboardLoginView, DashboardLogoutView, MetricsView
 
 app_name = 'dashboard'
 
@@ -8,4 +8,7 @@ urlpatterns = [
     path('logout/', DashboardLogoutView.as_view(), name='logout'),
     path('', ReportView.as_view(), name='reportes'),
     path('descargar/', ReportPdfView.as_view(), name='descargar_pdf'),
+    path('descargar/csv/', ReportExportView.as_view(export_format='csv'), name='descargar_csv'),
+    path('descargar/ndjson/', ReportExportView.as_view(export_format='ndjson'), name='descargar_ndjson'),
+    path('metricas/', MetricsView.as_view(), name='metricas'),
 ]
\ No newline at end of file
@@ -1,18 +1,27 @@
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView, LogoutView
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q, Sum
+from django.http import JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.text import compress_sequence
 from django.views.generic import TemplateView, View
 
-from tienda.models import SaleItem
+from tienda.db.pool import pool_stats
+from tienda.metrics import request_stats
+from tienda.models import DailySalesRollup, Sale, SaleItem
+from tienda.search import sold_names
 
+from .export import iter_csv, iter_items, iter_ndjson, iter_rows
 from .forms import ReportFilterForm
-from .pdf import generate_report_pdf
+from .pdf import iter_report_pdf
 
 
 class StaffRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     login_url = reverse_lazy('dashboard:login')
+    # Los reportes solo leen: tienda.routers.ReplicaRoutingMiddleware los manda a la réplica.
+    replica_reads = True
 
     def test_func(self):  
         return self.request.user.is_staff
@@ -32,47 +41,152 @@ class DashboardLogoutView(LogoutView):
 
 class ReportView(StaffRequiredMixin, TemplateView):
     template_name = 'dashboard/reportes.html'
+    page_size = 50
+    table_fields = (
+        'product_name', 'category_name', 'quantity', 'unit_price', 'status', 'sale__created_at',
+    )
 
     def get_form(self):
         return ReportFilterForm(self.request.GET or None)
 
+    @staticmethod
+    def category_spellings(category):
+        # Resolver antes las variantes de mayúsculas permite filtrar con IN y
+        # usar el índice; DISTINCT sobre category_name se resuelve en ese índice.
+        return list(
+            SaleItem.objects.filter(category_name__iexact=category)
+            .order_by()
+            .values_list('category_name', flat=True)
+            .distinct()
+        )
+
+    @staticmethod
+    def created_range(data, prefix=''):
+        # Rangos semiabiertos sobre la columna: DATE(created_at) impediría el índice.
+        lookups = {}
+        if data.get('start_date'):
+            lookups[f'{prefix}created_at__gte'] = datetime.combine(data['start_date'], time.min)
+        if data.get('end_date'):
+            lookups[f'{prefix}created_at__lt'] = datetime.combine(data['end_date'] + timedelta(days=1), time.min)
+        return lookups
+
     def filter_queryset(self, qs, data):
+        qs = qs.filter(**self.created_range(data, prefix='sale__'))
+        if data.get('product_name'):
+            qs = qs.filter(product_name__in=sold_names(data['product_name']))
+        if data.get('category'):
+            qs = qs.filter(category_name__in=self.category_spellings(data['category']))
+        if data.get('status'):
+            qs = qs.filter(status=data['status'])
+        return qs
+
+    def filter_rollup(self, qs, data):
         if data.get('start_date'):
-            qs = qs.filter(sale__created_at__date__gte=data['start_date'])
+            qs = qs.filter(day__gte=data['start_date'])
         if data.get('end_date'):
-            qs = qs.filter(sale__created_at__date__lte=data['end_date'])
+            qs = qs.filter(day__lte=data['end_date'])
         if data.get('product_name'):
-            qs = qs.filter(product_name__icontains=data['product_name'])
+            qs = qs.filter(product_name__in=sold_names(data['product_name']))
         if data.get('category'):
             qs = qs.filter(category_name__iexact=data['category'])
         if data.get('status'):
             qs = qs.filter(status=data['status'])
         return qs
 
+    def get_totals(self, form: ReportFilterForm):
+        if not form.is_valid():
+            return {'total_amount': 0, 'total_qty': 0}
+        totals = self.filter_rollup(DailySalesRollup.objects.all(), form.cleaned_data).aggregate(
+            total_amount=Sum('amount'),
+            total_qty=Sum('quantity'),
+        )
+        return {'total_amount': totals['total_amount'] or 0, 'total_qty': totals['total_qty'] or 0}
+
+    def get_sales(self, form: ReportFilterForm):
+        """Ventas del rango de fechas: acotan el recorrido por lotes de las descargas."""
+        if not form.is_valid():
+            return Sale.objects.none()
+        return Sale.objects.filter(**self.created_range(form.cleaned_data))
+
     def get_queryset(self, form: ReportFilterForm):
         qs = SaleItem.objects.select_related('sale').order_by('-sale__created_at')
         if not form.is_valid():
             return qs.none()
         return self.filter_queryset(qs, form.cleaned_data)
 
+    @staticmethod
+    def encode_cursor(item):
+        return f"{item.sale.created_at.isoformat()}_{item.pk}"
+
+    @staticmethod
+    def decode_cursor(value):
+        created_at, _, pk = (value or '').rpartition('_')
+        try:
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            return None
+
+    def get_page(self, items):
+        """Ventana por clave (fecha de venta, id): no usa OFFSET ni COUNT.
+
+        ``?cursor=`` pide las filas más antiguas que esa clave y ``?before=``
+        las más nuevas (página anterior); un cursor inválido vuelve al principio.
+        """
+        after = self.decode_cursor(self.request.GET.get('cursor'))
+        before = None if after else self.decode_cursor(self.request.GET.get('before'))
+        items = items.only(*self.table_fields)
+        if before:
+            created_at, pk = before
+            rows = list(
+                items.filter(Q(sale__created_at__gt=created_at) | Q(sale__created_at=created_at, pk__gt=pk))
+                .order_by('sale__created_at', 'pk')[:self.page_size + 1]
+            )
+            has_previous, has_next = len(rows) > self.page_size, True
+            rows = rows[:self.page_size][::-1]
+        else:
+            if after:
+                created_at, pk = after
+                items = items.filter(Q(sale__created_at__lt=created_at) | Q(sale__created_at=created_at, pk__lt=pk))
+            rows = list(items.order_by('-sale__created_at', '-pk')[:self.page_size + 1])
+            has_previous, has_next = bool(after), len(rows) > self.page_size
+            rows = rows[:self.page_size]
+        page = {'rows': rows, 'next_query': None, 'previous_query': None, 'first_query': None}
+
+        query = self.request.GET.copy()
+        query.pop('cursor', None)
+        query.pop('before', None)
+        if has_previous:
+            page['first_query'] = query.urlencode()
+        if rows and has_next:
+            page['next_query'] = self.with_param(query, 'cursor', self.encode_cursor(rows[-1]))
+        if rows and has_previous:
+            page['previous_query'] = self.with_param(query, 'before', self.encode_cursor(rows[0]))
+        return page
+
+    @staticmethod
+    def with_param(query, name, value):
+        query = query.copy()
+        query[name] = value
+        return query.urlencode()
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         form = self.get_form()
-        items = self.get_queryset(form)
-        totals = items.aggregate(
-            total_amount=Sum(F('quantity') * F('unit_price')),
-            total_qty=Sum('quantity'),
-        )
+        page = self.get_page(self.get_queryset(form))
         ctx.update({
             'form': form,
-            'items': items,
-            'total_amount': totals.get('total_amount') or 0,
-            'total_qty': totals.get('total_qty') or 0,
+            'items': page['rows'],
+            'next_query': page['next_query'],
+            'previous_query': page['previous_query'],
+            'first_query': page['first_query'],
+            **self.get_totals(form),
         })
         return ctx
 
 
 class ReportPdfView(StaffRequiredMixin, View):
+    batch_size = 2000
+
     def get(self, request, *args, **kwargs):
         form = ReportFilterForm(request.GET or None)
         base_qs = SaleItem.objects.select_related('sale').order_by('-sale__created_at')
@@ -80,17 +194,47 @@ class ReportPdfView(StaffRequiredMixin, View):
             items = ReportView().filter_queryset(base_qs, form.cleaned_data)
         else:
             items = base_qs.none()
-        totals = items.aggregate(
-            total_amount=Sum(F('quantity') * F('unit_price')),
-            total_qty=Sum('quantity'),
-        )
+        # La respuesta se genera fuera de la vista: fijar ya la base elegida.
+        items = items.using(items.db)
+        totals = ReportView().get_totals(form)
         filters = {k: v for k, v in form.cleaned_data.items() if v} if form.is_valid() else {}
-        pdf_bytes = generate_report_pdf(
+        pdf_chunks = iter_report_pdf(
             title='Reporte de ventas',
             filters=filters,
-            rows=items,
-            summary={'total': totals.get('total_amount') or 0, 'cantidad': totals.get('total_qty') or 0},
+            rows=iter_items(items, ReportView().get_sales(form), batch_size=self.batch_size),
+            summary={'total': totals['total_amount'], 'cantidad': totals['total_qty']},
         )
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
+        response = StreamingHttpResponse(pdf_chunks, content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="reporte_ventas.pdf"'
-        return response
\ No newline at end of file
+        return response
+
+
+class ReportExportView(StaffRequiredMixin, View):
+    """Datos crudos del reporte en CSV o NDJSON; ?gzip=1 los comprime al vuelo."""
+    export_format = 'csv'
+    batch_size = 2000
+    formats = {
+        'csv': (iter_csv, 'text/csv; charset=utf-8'),
+        'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        form = ReportFilterForm(request.GET or None)
+        items = ReportView().get_queryset(form)
+        # La respuesta se genera fuera de la vista: fijar ya la base elegida.
+        items = items.using(items.db)
+        encoder, content_type = self.formats[self.export_format]
+        chunks = encoder(iter_rows(items, ReportView().get_sales(form), batch_size=self.batch_size))
+        filename = f'reporte_ventas.{self.export_format}'
+        if request.GET.get('gzip') == '1':
+            chunks = compress_sequence(chunks)
+            content_type = 'application/gzip'
+            filename += '.gz'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class MetricsView(StaffRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({**request_stats.snapshot(), 'pools': pool_stats()})
\ No newline at end of file
@@ -22,11 +22,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tienda.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tienda.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -53,7 +55,8 @@ WSGI_APPLICATION = 'reportes_admin.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # MySQL con pool de conexiones por proceso (tienda.db.pool).
+        'ENGINE': 'tienda.db.mysql',
         'NAME': 'tienda_db',
         'USER': 'Admin',
         'PASSWORD': 'Panda15w6',
@@ -63,9 +66,30 @@ DATABASES = {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # Django cierra la conexión al final de cada petición; con el pool eso
+        # solo la devuelve para la siguiente. Ver POOL_DEFAULTS en tienda.db.pool.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': 5,
+            'MAX_IDLE': 300,
+            'MAX_LIFETIME': 3600,
+            'TIMEOUT': 5,
+            'CHECK_AFTER': 30,
+        },
     }
 }
 
+# Réplica de lectura: añadir a DATABASES un alias 'replica' con la misma
+# configuración apuntando al servidor réplica. Sin él todo va al primario.
+# Las vistas con replica_reads = True leen de la réplica salvo que vaya más de
+# REPLICA_MAX_LAG segundos atrasada (se mide cada REPLICA_CHECK_INTERVAL) o que
+# el cliente haya escrito en los últimos REPLICA_PIN_SECONDS.
+DATABASE_ROUTERS = ['tienda.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_MAX_LAG = 10
+REPLICA_CHECK_INTERVAL = 5
+REPLICA_PIN_SECONDS = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -84,6 +108,12 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'dashboard' / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Métricas por vista en la cabecera Server-Timing y en /metricas/; la
+# middleware vive en tienda.metrics y se descarta si están desactivadas.
+REQUEST_METRICS = False
+REQUEST_METRICS_WINDOW = 500
+REQUEST_METRICS_DUPLICATE_THRESHOLD = 3
+
 LOGIN_URL = 'dashboard:login'
 LOGIN_REDIRECT_URL = 'dashboard:reportes'
 LOGOUT_REDIRECT_URL = 'dashboard:login'
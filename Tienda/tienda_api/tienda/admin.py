@@ -1,5 +1,9 @@
+from django import forms
 from django.contrib import admin
+from django.db import transaction
+
 from .models import Category, Product, Sale, SaleItem, ContactMessage
+from .stock import item_quantities, release_stock, reserve_stock
 
 
 @admin.register(Category)
@@ -17,8 +21,55 @@ class ProductAdmin(admin.ModelAdmin):
     autocomplete_fields = ("category",)
 
 
+def stock_changes(form, product_id, quantity):
+    """Unidades a apartar y a devolver porque cambió el producto o la cantidad del artículo.
+
+    Se calcula con el estado anterior: el cambio de estado lo resuelve ``set_status``.
+    """
+    initial = form.initial if form.instance.pk else {}
+    status = initial.get("status", form.cleaned_data.get("status"))
+    before = item_quantities([SaleItem(product_id=initial.get("product"), quantity=initial.get("quantity") or 0, status=status)])
+    after = item_quantities([SaleItem(product_id=product_id, quantity=quantity or 0, status=status)])
+    return after - before, before - after
+
+
+class SaleItemAdminForm(forms.ModelForm):
+    class Meta:
+        model = SaleItem
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get("product")
+        reserve, _ = stock_changes(self, product.pk if product else None, cleaned_data.get("quantity"))
+        available = dict(Product.objects.filter(pk__in=reserve).values_list("pk", "stock"))
+        if any(available.get(pk, 0) < qty for pk, qty in reserve.items()):
+            raise forms.ValidationError(f"Stock insuficiente: quedan {product.stock} unidades de {product.name}.")
+        return cleaned_data
+
+
+def save_item(item, form):
+    """Guarda un artículo editado en el admin moviendo el stock como la API.
+
+    Un artículo nuevo aparta sus unidades, un cambio de producto o cantidad
+    aparta o devuelve la diferencia, y el cambio de estado pasa por
+    ``SaleItem.set_status``.
+    """
+    reserve, release = stock_changes(form, item.product_id, item.quantity)
+    with transaction.atomic():
+        reserve_stock(reserve)
+        release_stock(release)
+        if not item.pk or "status" not in form.changed_data:
+            item.save()
+            return
+        status, item.status = item.status, form.initial["status"]
+        item.save()
+        item.set_status(status)
+
+
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
+    form = SaleItemAdminForm
     extra = 0
 
 
@@ -26,13 +77,30 @@ class SaleItemInline(admin.TabularInline):
 class SaleAdmin(admin.ModelAdmin):
     list_display = ("id", "customer_name", "total_amount", "created_at")
     date_hierarchy = "created_at"
+    # Lo mantienen las señales de SaleItem al guardar los artículos en línea.
+    readonly_fields = ("total_amount",)
     inlines = [SaleItemInline]
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not SaleItem:
+            return super().save_formset(request, form, formset, change)
+        saved = formset.save(commit=False)
+        for item in formset.deleted_objects:
+            item.delete()
+        for item_form in formset.forms:
+            if item_form.instance in saved:
+                save_item(item_form.instance, item_form)
+        formset.save_m2m()
+
 
 @admin.register(SaleItem)
 class SaleItemAdmin(admin.ModelAdmin):
     list_display = ("id", "sale", "product_name", "quantity", "unit_price", "status")
     list_filter = ("status",)
+    form = SaleItemAdminForm
+
+    def save_model(self, request, obj, form, change):
+        save_item(obj, form)
 
 
 @admin.register(ContactMessage)
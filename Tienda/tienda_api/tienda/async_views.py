@@ -0,0 +1,137 @@
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views import View
+
+from .cache import CATALOG_HITS_KEY, CATALOG_MISSES_KEY, _aincr, acache, acatalog_cache_key
+from .metrics import timed
+from .models import Category, Product
+from .serializers import CategorySerializer, ProductSerializer
+
+NOT_FOUND = {"detail": "No encontrado."}
+
+
+class AsyncCatalogView(View):
+    """Lecturas del catálogo para ASGI: ORM y caché asíncronos, sin pasar la vista a un hilo.
+
+    Serializan igual que los ViewSets de DRF y comparten su versión de caché,
+    así que cualquier cambio del catálogo invalida ambas.
+    """
+
+    replica_reads = True
+    cache_timeout = 60 * 15
+    cache_name = None
+    model = None
+
+    async def get(self, request, *args, **kwargs):
+        key = await acatalog_cache_key(request, "async", self.cache_name)
+        entry = await acache("get", key)
+        if entry is None:
+            await _aincr(CATALOG_MISSES_KEY)
+            status, data = await self.build(request, *args, **kwargs)
+            if status == 200:
+                await acache("set", key, data, await self.entry_timeout())
+            response = JsonResponse(data, status=status, safe=False)
+            response["X-Cache"] = "MISS"
+            return response
+        await _aincr(CATALOG_HITS_KEY)
+        response = JsonResponse(entry, safe=False)
+        response["X-Cache"] = "HIT"
+        return response
+
+    async def entry_timeout(self):
+        # Igual que CatalogCacheMixin: lo leído de la réplica dura como mucho el retraso tolerado.
+        alias = await sync_to_async(router.db_for_read)(self.model)
+        if alias != DEFAULT_DB_ALIAS:
+            return min(self.cache_timeout, getattr(settings, "REPLICA_MAX_LAG", 10))
+        return self.cache_timeout
+
+    async def build(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncProductListView(AsyncCatalogView):
+    """Catálogo por cursor sobre (-created_at, id); la búsqueda ?q=, los filtros y las facetas siguen en /api/products/."""
+
+    cache_name = "product-list"
+    model = Product
+    page_size = 24
+    max_page_size = 100
+
+    @staticmethod
+    def decode_cursor(value):
+        created_at, _, pk = (value or "").rpartition("_")
+        try:
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            return None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get("page_size", self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    async def build(self, request):
+        size = self.get_page_size(request)
+        products = (
+            Product.objects.filter(is_active=True)
+            .select_related("category")
+            .order_by("-created_at", "id")
+        )
+        cursor = self.decode_cursor(request.GET.get("cursor"))
+        if cursor:
+            created_at, pk = cursor
+            products = products.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        rows = [product async for product in products[:size + 1].aiterator()]
+
+        next_url = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            query = request.GET.copy()
+            query["cursor"] = f"{last.created_at.isoformat()}_{last.pk}"
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        with timed(request, "serialize"):
+            results = ProductSerializer(rows[:size], many=True, context={"request": request}).data
+        return 200, {"next": next_url, "results": results}
+
+
+class AsyncProductDetailView(AsyncCatalogView):
+    cache_name = "product-detail"
+    model = Product
+
+    async def build(self, request, pk):
+        try:
+            product = await Product.objects.select_related("category").aget(pk=pk, is_active=True)
+        except Product.DoesNotExist:
+            return 404, NOT_FOUND
+        with timed(request, "serialize"):
+            return 200, ProductSerializer(product, context={"request": request}).data
+
+
+class AsyncCategoryListView(AsyncCatalogView):
+    cache_name = "category-list"
+    model = Category
+
+    async def build(self, request):
+        categories = [category async for category in Category.objects.order_by("name").aiterator()]
+        with timed(request, "serialize"):
+            return 200, CategorySerializer(categories, many=True).data
+
+
+class AsyncCategoryDetailView(AsyncCatalogView):
+    cache_name = "category-detail"
+    model = Category
+
+    async def build(self, request, pk):
+        try:
+            category = await Category.objects.aget(pk=pk)
+        except Category.DoesNotExist:
+            return 404, NOT_FOUND
+        with timed(request, "serialize"):
+            return 200, CategorySerializer(category).data
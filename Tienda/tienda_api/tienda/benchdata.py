@@ -0,0 +1,152 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.test.utils import setup_databases, teardown_databases
+
+from .models import Category, Product, Sale, SaleItem
+from .rollups import rebuild_rollup
+from .search import index_products, index_sold_names
+from .signals import update_aggregates_on_delete, update_aggregates_on_save
+
+BENCH_TAG = "__bench__"
+BENCH_SLUG_PREFIX = "bench-"
+
+_bench_database_active = False
+
+
+@contextmanager
+def bench_database(verbosity=0):
+    """Crea las bases de prueba (``test_<NAME>``), cambia las conexiones a ellas y las borra al salir.
+
+    Las mediciones siembran, parchean campos y desconectan señales: nada de
+    eso debe tocar la base configurada.
+    """
+    global _bench_database_active
+    old_config = setup_databases(verbosity, interactive=False, serialized_aliases=())
+    _bench_database_active = True
+    try:
+        yield
+    finally:
+        _bench_database_active = False
+        teardown_databases(old_config, verbosity)
+
+
+def _require_bench_database():
+    if not _bench_database_active:
+        raise RuntimeError("Los datos de prueba solo se siembran dentro de bench_database().")
+
+
+@contextmanager
+def auto_now_add_disabled(model, field_name):
+    """Permite fijar fechas históricas en campos auto_now_add al sembrar datos."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+@contextmanager
+def aggregate_signals_disabled():
+    post_save.disconnect(update_aggregates_on_save, sender=SaleItem)
+    post_delete.disconnect(update_aggregates_on_delete, sender=SaleItem)
+    try:
+        yield
+    finally:
+        post_save.connect(update_aggregates_on_save, sender=SaleItem)
+        post_delete.connect(update_aggregates_on_delete, sender=SaleItem)
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def bench_user():
+    user, _ = get_user_model().objects.get_or_create(username=BENCH_TAG, defaults={"is_staff": True})
+    return user
+
+
+def seed_catalog(*, categories=10, products=200, stock=1_000_000, seed=42):
+    _require_bench_database()
+    rng = random.Random(seed)
+    start = _next_pk(Category)
+    Category.objects.bulk_create(
+        [
+            Category(name=f"Bench categoría {start + n}", slug=f"{BENCH_SLUG_PREFIX}cat-{start + n}")
+            for n in range(categories)
+        ]
+    )
+    category_objs = list(Category.objects.filter(slug__startswith=f"{BENCH_SLUG_PREFIX}cat-"))
+    start = _next_pk(Product)
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Bench producto {start + n}",
+                slug=f"{BENCH_SLUG_PREFIX}prod-{start + n}",
+                price=Decimal(rng.randint(1000, 500000)) / 100,
+                category=rng.choice(category_objs),
+                stock=stock,
+            )
+            for n in range(products)
+        ],
+        batch_size=1000,
+    )
+    bench_products = list(Product.objects.filter(slug__startswith=BENCH_SLUG_PREFIX).select_related("category"))
+    index_products(bench_products)
+    return bench_products
+
+
+def seed_sales(products, *, items, items_per_sale=4, days=365, seed=42, batch_size=5000, end=None):
+    """Inserta ``items`` artículos repartidos en ventas de los últimos ``days`` días."""
+    _require_bench_database()
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    span = int((end - start).total_seconds())
+    statuses = [code for code, _ in Sale.STATUS_CHOICES]
+
+    sale_pk = _next_pk(Sale)
+    remaining = items
+    with auto_now_add_disabled(Sale, "created_at"), aggregate_signals_disabled():
+        while remaining > 0:
+            sales, sale_items = [], []
+            while remaining > 0 and len(sale_items) < batch_size:
+                lines = min(items_per_sale, remaining)
+                sale = Sale(
+                    pk=sale_pk,
+                    customer_name=BENCH_TAG,
+                    terms_accepted=True,
+                    created_at=start + timedelta(seconds=rng.randrange(span)),
+                )
+                total = Decimal("0")
+                for product in rng.sample(products, lines):
+                    quantity = rng.randint(1, 5)
+                    sale_items.append(
+                        SaleItem(
+                            sale_id=sale_pk,
+                            product=product,
+                            product_name=product.name,
+                            category_name=product.category.name,
+                            quantity=quantity,
+                            unit_price=product.price,
+                            status=rng.choice(statuses),
+                        )
+                    )
+                    total += quantity * product.price
+                sale.total_amount = total
+                sales.append(sale)
+                sale_pk += 1
+                remaining -= lines
+            with transaction.atomic():
+                Sale.objects.bulk_create(sales)
+                SaleItem.objects.bulk_create(sale_items)
+    index_sold_names(product.name for product in products)
+    # Solo en la base desechable: reconstruye la tabla de resumen completa.
+    rebuild_rollup()
@@ -0,0 +1,141 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = "tienda:catalog:version"
+CATALOG_HITS_KEY = "tienda:catalog:hits"
+CATALOG_MISSES_KEY = "tienda:catalog:misses"
+
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # La clave no existe todavía (o el backend la expulsó).
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+async def acache(method, *args, **kwargs):
+    """Operación de caché desde código async.
+
+    LocMemCache no hace E/S: llamarla directamente evita el salto a un hilo
+    que hacen sus métodos a*() por omisión.
+    """
+    backend = caches["default"]
+    if isinstance(backend, LocMemCache):
+        return getattr(backend, method)(*args, **kwargs)
+    return await getattr(backend, f"a{method}")(*args, **kwargs)
+
+
+async def _aincr(key):
+    try:
+        return await acache("incr", key)
+    except ValueError:
+        if await acache("add", key, 1, timeout=None):
+            return 1
+        return await acache("incr", key)
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+async def aget_catalog_version():
+    version = await acache("get", CATALOG_VERSION_KEY)
+    if version is None:
+        await acache("add", CATALOG_VERSION_KEY, 1, timeout=None)
+        version = await acache("get", CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    return _incr(CATALOG_VERSION_KEY)
+
+
+def invalidate_catalog():
+    """Invalida todas las páginas del catálogo con un solo incremento."""
+    bump_catalog_version()
+    # Se repite al confirmar para que ninguna lectura concurrente deje en
+    # caché filas previas al commit bajo la versión nueva.
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_cache_stats():
+    return {
+        "version": get_catalog_version(),
+        "hits": cache.get(CATALOG_HITS_KEY, 0),
+        "misses": cache.get(CATALOG_MISSES_KEY, 0),
+    }
+
+
+def _catalog_digest(request, parts):
+    renderer = getattr(request, "accepted_renderer", None)
+    raw = "|".join(
+        [str(part) for part in parts]
+        + [getattr(renderer, "format", "") or "", request.get_full_path()]
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def catalog_cache_key(request, *parts):
+    return f"tienda:catalog:v{get_catalog_version()}:{_catalog_digest(request, parts)}"
+
+
+async def acatalog_cache_key(request, *parts):
+    return f"tienda:catalog:v{await aget_catalog_version()}:{_catalog_digest(request, parts)}"
+
+
+class CatalogCacheMixin:
+    """Guarda en caché la salida serializada de list/retrieve por versión de catálogo."""
+
+    cache_timeout = 60 * 15
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = catalog_cache_key(request, self.basename, self.action)
+        entry = cache.get(key)
+
+        if entry is None:
+            _incr(CATALOG_MISSES_KEY)
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+                cache.set(key, {"data": response.data, "headers": headers}, self.entry_timeout())
+            response["X-Cache"] = "MISS"
+            return response
+
+        _incr(CATALOG_HITS_KEY)
+        headers = entry["headers"]
+        # Como ConditionalGetMixin: solo el ETag, If-Modified-Since no ve los cambios del mismo segundo.
+        response = get_conditional_response(request, etag=headers.get("ETag"))
+        if response is None:
+            response = Response(entry["data"])
+        for name, value in headers.items():
+            response[name] = value
+        response["X-Cache"] = "HIT"
+        return response
+
+    def entry_timeout(self):
+        # Lo leído de una réplica puede ser anterior a la última invalidación:
+        # se guarda como mucho el retraso tolerado.
+        if router.db_for_read(self.queryset.model) != DEFAULT_DB_ALIAS:
+            return min(self.cache_timeout, getattr(settings, "REPLICA_MAX_LAG", 10))
+        return self.cache_timeout
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Responde 304 a los GET condicionales sin tocar el serializador.
+
+    El validador sale de ``Max(updated_at)`` y del número de filas del
+    queryset que vería la vista, así que altas, bajas y ediciones lo cambian.
+    ``validator_related_fields`` suma las fechas de las tablas unidas cuyos
+    datos también salen en la respuesta.
+
+    Solo se evalúa ``If-None-Match``: el ETag lleva la fecha con microsegundos,
+    mientras que ``If-Modified-Since`` tiene resolución de un segundo y daría
+    304 tras dos cambios en el mismo segundo. ``Last-Modified`` se envía como dato.
+    """
+
+    validator_field = "updated_at"
+    validator_related_fields = ()
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset.order_by()
+
+    def get_validators(self, request):
+        fields = (self.validator_field, *self.validator_related_fields)
+        stats = self.get_validator_queryset().aggregate(
+            count=Count("pk"),
+            **{f"last_{n}": Max(field) for n, field in enumerate(fields)},
+        )
+        last_modified = max(
+            (stats[f"last_{n}"] for n in range(len(fields)) if stats[f"last_{n}"] is not None), default=None
+        )
+        if last_modified is not None and timezone.is_naive(last_modified):
+            # Con USE_TZ=False las fechas son locales (TIME_ZONE), no UTC.
+            last_modified = timezone.make_aware(last_modified)
+
+        renderer = getattr(request, "accepted_renderer", None)
+        raw = "|".join(
+            (
+                self.get_queryset().model._meta.label,
+                str(stats["count"]),
+                last_modified.isoformat() if last_modified else "",
+                getattr(renderer, "format", "") or "",
+                request.get_full_path(),
+            )
+        )
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
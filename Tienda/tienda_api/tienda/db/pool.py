@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import Counter
+
+from django.db.utils import OperationalError
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 10,
+    # Segundos que una conexión puede esperar sin uso antes de cerrarse.
+    "MAX_IDLE": 300,
+    # Edad máxima: se reemplaza antes de que el servidor la corte (wait_timeout).
+    "MAX_LIFETIME": 3600,
+    # Espera máxima por una conexión libre cuando el pool está lleno.
+    "TIMEOUT": 5,
+    # Solo se comprueba con SELECT 1 la conexión que lleva más que esto sin usarse.
+    "CHECK_AFTER": 30,
+}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Conexiones crudas reutilizables entre peticiones e hilos del proceso."""
+
+    def __init__(self, max_size=10, max_idle=300, max_lifetime=3600, timeout=5, check_after=30):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check_after = check_after
+        self.cond = threading.Condition()
+        # (conexión, creada, liberada); se reutiliza la última liberada.
+        self.idle = []
+        self.born = {}
+        self.in_use = 0
+        self.counters = Counter()
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+
+    @classmethod
+    def from_settings(cls, options):
+        options = {**POOL_DEFAULTS, **(options or {})}
+        return cls(**{key.lower(): value for key, value in options.items()})
+
+    def _evict(self, now):
+        keep = []
+        for entry in self.idle:
+            raw, born, released = entry
+            if now - released > self.max_idle or now - born > self.max_lifetime:
+                self._discard(raw, "evicted")
+            else:
+                keep.append(entry)
+        self.idle = keep
+
+    def _discard(self, raw, reason):
+        self.born.pop(id(raw), None)
+        self.counters[reason] += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self, connect, check):
+        """Devuelve una conexión libre, sana, o una nueva si hay cupo; si no, espera."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._evict(now)
+                if self.idle:
+                    entry = self.idle.pop()
+                    break
+                if self.in_use < self.max_size:
+                    entry = None
+                    break
+                if now >= deadline:
+                    self.counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No hubo conexión libre en {self.timeout} s (máximo {self.max_size})."
+                    )
+                waited = True
+                self.cond.wait(deadline - now)
+            self.in_use += 1
+            if waited:
+                wait = time.monotonic() - started
+                self.counters["waits"] += 1
+                self.wait_seconds += wait
+                self.wait_max = max(self.wait_max, wait)
+
+        # Conectar o comprobar fuera del candado: son idas y vueltas a la red.
+        try:
+            if entry is not None:
+                raw, _, released = entry
+                if time.monotonic() - released > self.check_after and not check(raw):
+                    with self.cond:
+                        self._discard(raw, "failed_checks")
+                    entry = None
+            if entry is None:
+                raw = connect()
+                with self.cond:
+                    self.born[id(raw)] = time.monotonic()
+                    self.counters["created"] += 1
+                return raw, False
+        except BaseException:
+            with self.cond:
+                self.in_use -= 1
+                self.cond.notify()
+            raise
+        with self.cond:
+            self.counters["reused"] += 1
+        return raw, True
+
+    def release(self, raw, reusable=True):
+        with self.cond:
+            self.in_use -= 1
+            now = time.monotonic()
+            born = self.born.get(id(raw), now)
+            if reusable and now - born < self.max_lifetime and len(self.idle) < self.max_size:
+                self.idle.append((raw, born, now))
+            else:
+                self._discard(raw, "discarded" if not reusable else "evicted")
+            self.cond.notify()
+
+    def close_all(self):
+        with self.cond:
+            for raw, _, _ in self.idle:
+                self._discard(raw, "evicted")
+            self.idle = []
+
+    def stats(self):
+        with self.cond:
+            waits = self.counters["waits"]
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "idle": len(self.idle),
+                "created": self.counters["created"],
+                "reused": self.counters["reused"],
+                "evicted": self.counters["evicted"],
+                "discarded": self.counters["discarded"],
+                "failed_checks": self.counters["failed_checks"],
+                "waits": waits,
+                "timeouts": self.counters["timeouts"],
+                "wait_ms_avg": round(self.wait_seconds / waits * 1000, 2) if waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Lo que decide a qué servidor y base apunta una conexión.
+POOL_KEY_SETTINGS = ("NAME", "HOST", "PORT", "USER")
+
+
+def pool_key(alias, settings_dict):
+    # El alias solo no basta: el ejecutor de pruebas cambia NAME en el mismo
+    # alias y MySQL abre conexiones sin base (NAME=None) para crearla.
+    return (alias, *(str(settings_dict.get(name) or "") for name in POOL_KEY_SETTINGS))
+
+
+def get_pool(alias, settings_dict):
+    key = pool_key(alias, settings_dict)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool.from_settings(settings_dict.get("POOL"))
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    aliases = Counter(key[0] for key in pools)
+    # Con un solo pool por alias la clave sigue siendo el alias.
+    return {
+        key[0] if aliases[key[0]] == 1 else f"{key[0]}:{key[1]}": pool.stats()
+        for key, pool in sorted(pools.items())
+    }
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+class PooledDatabaseWrapperMixin:
+    """Toma las conexiones de un pool por alias y las devuelve al cerrar.
+
+    Django cierra la conexión al terminar cada petición (CONN_MAX_AGE = 0): con
+    esta mezcla eso solo la devuelve al pool, así que la siguiente petición,
+    desde cualquier hilo del servidor WSGI o del ejecutor de ASGI, se ahorra
+    el saludo con el servidor.
+    """
+
+    def get_new_connection(self, conn_params):
+        # Se recuerda el pool: la conexión vuelve al mismo aunque cambien los ajustes.
+        pool = self.pool = get_pool(self.alias, self.settings_dict)
+        raw, self.pool_reused = pool.acquire(
+            lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params),
+            self.check_pooled_connection,
+        )
+        return raw
+
+    def init_connection_state(self):
+        # El estado de sesión sobrevive en la conexión reutilizada.
+        if not getattr(self, "pool_reused", False):
+            super().init_connection_state()
+
+    def check_pooled_connection(self, raw):
+        try:
+            cursor = raw.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = self.pool
+        raw = self.connection
+        # Dentro de un atomic Django conserva la referencia: no puede volver al pool.
+        reusable = not self.in_atomic_block and (not self.errors_occurred or self.is_usable())
+        if reusable and not self.autocommit:
+            try:
+                raw.rollback()
+            except self.Database.Error:
+                reusable = False
+        pool.release(raw, reusable=reusable)
@@ -0,0 +1,234 @@
+import asyncio
+import mimetypes
+import os
+import re
+from http import HTTPStatus
+
+from django.conf import settings
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+# Nombres con hash de contenido: los del manifiesto de estáticos y las variantes de imagen.
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+BLOCK_SIZE = 64 * 1024
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileResponse:
+    def __init__(self, status, headers, path=None, start=0, length=0):
+        self.status = status
+        self.headers = headers
+        self.path = path
+        self.start = start
+        self.length = length
+
+    @property
+    def status_line(self):
+        return f"{self.status} {HTTPStatus(self.status).phrase}"
+
+    def chunks(self):
+        with open(self.path, "rb") as handle:
+            handle.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = handle.read(min(BLOCK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class FileServer:
+    """Sirve archivos de ``STATIC_ROOT`` y ``MEDIA_ROOT`` sin pasar por Django.
+
+    Elige el hermano ``.br``/``.gz`` que acepte el cliente, responde 304 a los
+    GET condicionales, atiende un rango de bytes (con ``If-Range``) y marca
+    como ``immutable`` los nombres que llevan el hash del contenido. Lo que no
+    existe sigue hacia la aplicación.
+    """
+
+    def __init__(self, mounts, max_age=60):
+        self.mounts = [(prefix, os.path.realpath(root)) for prefix, root in mounts if prefix and root]
+        self.max_age = max_age
+
+    @classmethod
+    def from_settings(cls):
+        mounts = []
+        for url, root in ((settings.STATIC_URL, settings.STATIC_ROOT), (settings.MEDIA_URL, settings.MEDIA_ROOT)):
+            # Con una URL absoluta (CDN) los archivos no pasan por aquí.
+            if url and root and url.startswith("/"):
+                mounts.append((url, str(root)))
+        return cls(mounts, max_age=getattr(settings, "STATIC_MAX_AGE", 60))
+
+    def find(self, path):
+        for prefix, root in self.mounts:
+            if not path.startswith(prefix):
+                continue
+            full = os.path.realpath(os.path.join(root, path[len(prefix):]))
+            if full.startswith(root + os.sep) and os.path.isfile(full):
+                return full
+        return None
+
+    def respond(self, method, path, headers):
+        """``headers`` con nombres en minúsculas; devuelve ``None`` si el archivo no es nuestro."""
+        full = self.find(path)
+        if full is None:
+            return None
+        if method not in ("GET", "HEAD"):
+            return FileResponse(405, [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+
+        stat = os.stat(full)
+        content_type, _ = mimetypes.guess_type(full)
+        content_type = content_type or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        compressible = any(os.path.isfile(full + suffix) for _, suffix in ENCODINGS)
+
+        encoding, suffix = None, ""
+        byte_range = headers.get("range")
+        if byte_range and not self.range_applies(headers.get("if-range"), stat):
+            byte_range = None
+        if compressible and not byte_range:
+            encoding, suffix = self.choose_encoding(headers.get("accept-encoding", ""), full)
+        served = os.stat(full + suffix) if suffix else stat
+
+        etag = self.etag(stat, encoding)
+        common = [
+            ("ETag", etag),
+            ("Last-Modified", http_date(stat.st_mtime)),
+            ("Cache-Control", IMMUTABLE if HASHED_NAME.search(full) else f"public, max-age={self.max_age}"),
+        ]
+        if compressible:
+            common.append(("Vary", "Accept-Encoding"))
+        if self.not_modified(headers, etag, stat):
+            return FileResponse(304, common)
+
+        common += [("Content-Type", content_type), ("Accept-Ranges", "bytes")]
+        if encoding:
+            common.append(("Content-Encoding", encoding))
+        if byte_range:
+            bounds = self.parse_range(byte_range, stat.st_size)
+            if bounds is False:
+                return FileResponse(416, common + [("Content-Range", f"bytes */{stat.st_size}"), ("Content-Length", "0")])
+            if bounds is not None:
+                start, end = bounds
+                length = end - start + 1
+                return FileResponse(
+                    206,
+                    common + [("Content-Range", f"bytes {start}-{end}/{stat.st_size}"), ("Content-Length", str(length))],
+                    full, start, length,
+                )
+        return FileResponse(200, common + [("Content-Length", str(served.st_size))], full + suffix, 0, served.st_size)
+
+    @staticmethod
+    def etag(stat, encoding):
+        tag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    @staticmethod
+    def choose_encoding(accept_encoding, full):
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(name.strip().lower())
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(full + suffix):
+                return encoding, suffix
+        return None, ""
+
+    @staticmethod
+    def not_modified(headers, etag, stat):
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            # Comparación débil: W/"x" vale lo mismo que "x".
+            wanted = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+            return "*" in wanted or etag in wanted
+        since = parse_http_date_safe(headers.get("if-modified-since", ""))
+        return since is not None and int(stat.st_mtime) <= since
+
+    @staticmethod
+    def range_applies(if_range, stat):
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == FileServer.etag(stat, None)
+        since = parse_http_date_safe(if_range)
+        return since is not None and int(stat.st_mtime) <= since
+
+    @staticmethod
+    def parse_range(value, size):
+        """``(inicio, fin)`` inclusivos, ``False`` si no se puede satisfacer y ``None`` si se ignora."""
+        match = RANGE.match(value.replace(" ", ""))
+        if not match or match.groups() == ("", ""):
+            # Varios rangos o sintaxis desconocida: se manda el archivo completo.
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+
+class StaticFilesMiddleware:
+    """Envoltura WSGI: los estáticos y la media se sirven antes de llegar a Django."""
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or FileServer.from_settings()
+
+    def __call__(self, environ, start_response):
+        headers = {
+            key[5:].replace("_", "-").lower(): value for key, value in environ.items() if key.startswith("HTTP_")
+        }
+        method = environ.get("REQUEST_METHOD", "GET")
+        response = self.server.respond(method, environ.get("PATH_INFO", ""), headers)
+        if response is None:
+            return self.application(environ, start_response)
+        start_response(response.status_line, response.headers)
+        if method == "HEAD" or response.path is None:
+            return []
+        if response.start == 0 and "wsgi.file_wrapper" in environ and response.status == 200:
+            return environ["wsgi.file_wrapper"](open(response.path, "rb"), BLOCK_SIZE)
+        return response.chunks()
+
+
+class StaticFilesASGIMiddleware:
+    """Envoltura ASGI equivalente; la lectura del disco va a un hilo."""
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or FileServer.from_settings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.application(scope, receive, send)
+        headers = {}
+        for key, value in scope.get("headers", ()):
+            name = key.decode("latin-1").lower()
+            value = value.decode("latin-1")
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        response = self.server.respond(scope["method"], scope["path"], headers)
+        if response is None:
+            return await self.application(scope, receive, send)
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in response.headers],
+        })
+        if scope["method"] == "HEAD" or response.path is None:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        chunks = response.chunks()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
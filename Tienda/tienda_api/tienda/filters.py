@@ -0,0 +1,76 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+TRUE_VALUES = {"1", "true", "si", "sí", "yes", "on"}
+
+
+class CatalogFilter(BaseFilterBackend):
+    """Filtros del catálogo: ``category`` (ids separados por coma), ``category_name``,
+    ``min_price``, ``max_price`` e ``in_stock``.
+    """
+
+    category_params = ("category", "category_name")
+
+    @staticmethod
+    def parse_ids(value):
+        try:
+            return [int(part) for part in value.split(",") if part.strip()]
+        except ValueError:
+            raise ValidationError({"category": "Debe ser una lista de ids separados por coma."})
+
+    @staticmethod
+    def parse_price(params, name):
+        value = params.get(name, "").strip()
+        if not value:
+            return None
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: "Debe ser un número."})
+        if not price.is_finite() or price < 0:
+            raise ValidationError({name: "Debe ser un número positivo."})
+        return price
+
+    def filter_queryset(self, request, queryset, view, skip=()):
+        params = request.query_params
+        if "category" not in skip and params.get("category", "").strip():
+            queryset = queryset.filter(category_id__in=self.parse_ids(params["category"]))
+        if "category_name" not in skip and params.get("category_name", "").strip():
+            queryset = queryset.filter(category__name__icontains=params["category_name"].strip())
+
+        min_price = self.parse_price(params, "min_price")
+        max_price = self.parse_price(params, "max_price")
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        if params.get("in_stock", "").strip().lower() in TRUE_VALUES:
+            queryset = queryset.filter(stock__gt=0)
+        return queryset
+
+    def category_facets(self, request, queryset, view):
+        """Conteo por categoría en una sola consulta agrupada.
+
+        Se aplican todos los filtros menos los de categoría, para que el
+        menú muestre cuántos productos tendría cada opción al elegirla.
+        """
+        rows = (
+            self.filter_queryset(request, queryset, view, skip=self.category_params)
+            .order_by()
+            .values("category_id", "category__name")
+            .annotate(count=Count("pk"))
+            .order_by("category__name")
+        )
+        return [
+            {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+            for row in rows
+        ]
+
+
+class CatalogOrderingFilter(OrderingFilter):
+    """``?ordering=`` con los órdenes que el catálogo puede paginar por cursor."""
+
+    ordering_fields = ("price", "name", "created_at")
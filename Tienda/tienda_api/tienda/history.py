@@ -0,0 +1,50 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import DeletedSale, Sale
+
+
+def watermark():
+    """Marca para el siguiente ``?since=``, tomada antes de leer.
+
+    Se resta un margen: una transacción que fijó su fecha antes de confirmar
+    todavía entra en la siguiente consulta. Lo repetido se reemplaza por id.
+    """
+    overlap = getattr(settings, "SALES_SINCE_OVERLAP", 5)
+    return timezone.now() - timedelta(seconds=overlap)
+
+
+def encode_since(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_since(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        return datetime.fromisoformat(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"since": "Cursor inválido."})
+
+
+def touch_sales(sale_ids):
+    """Marca las ventas como cambiadas para el siguiente ``?since=`` (cambió algún artículo)."""
+    sale_ids = {pk for pk in sale_ids if pk}
+    if sale_ids:
+        Sale.objects.filter(pk__in=sale_ids).update(updated_at=timezone.now())
+
+
+def sale_changes(user, since):
+    """Ids de las ventas del usuario creadas o cambiadas después de ``since`` y de las borradas.
+
+    Un rango por índice para cada parte, (user, updated_at) en Sale y
+    (user, deleted_at) en DeletedSale: el costo depende de los cambios, no
+    del historial.
+    """
+    changed = Sale.objects.filter(user=user, updated_at__gt=since).values_list("pk", flat=True)
+    deleted = DeletedSale.objects.filter(user=user, deleted_at__gt=since).values_list("sale_id", flat=True)
+    return set(changed), set(deleted)
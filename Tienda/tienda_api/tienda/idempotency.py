@@ -0,0 +1,218 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+CACHE_PREFIX = "tienda:idem:"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def digest(*parts):
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def pack(data):
+    return zlib.compress(json.dumps(data, cls=JSONEncoder, separators=(",", ":")).encode())
+
+
+def unpack(body):
+    return json.loads(zlib.decompress(bytes(body)))
+
+
+class KeyLocks:
+    """Un candado por clave dentro del proceso: los duplicados concurrentes esperan al primero."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    def acquire(self, key):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+
+    def release(self, key):
+        with self.lock:
+            entry = self.locks[key]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[key]
+
+
+class IdempotencyStore:
+    """Respuestas de escrituras repetibles, en caché y en la base.
+
+    La caché es el primer nivel y se llena al confirmar; la base es la
+    fuente de verdad. La fila se reserva antes de ejecutar la petición
+    (clave única), así que entre procesos solo uno la ejecuta y el resto
+    espera su resultado. La respuesta se guarda en la misma transacción
+    que la venta: o quedan las dos o ninguna.
+    """
+
+    def __init__(self):
+        self.locks = KeyLocks()
+
+    @property
+    def ttl(self):
+        return _setting("IDEMPOTENCY_TTL", 60 * 60 * 24)
+
+    @property
+    def lock_timeout(self):
+        return _setting("IDEMPOTENCY_LOCK_TIMEOUT", 300)
+
+    def run(self, key, fingerprint, handler):
+        """Devuelve la respuesta guardada para ``key`` o ejecuta ``handler`` una sola vez."""
+        cached = self.lookup(key, fingerprint)
+        if cached is not None:
+            return cached
+        self.locks.acquire(key)
+        try:
+            # Otro hilo de este proceso pudo terminarla mientras esperábamos.
+            cached = self.lookup(key, fingerprint)
+            if cached is not None:
+                return cached
+            record = self.claim(key, fingerprint)
+            if not isinstance(record, IdempotencyRecord):
+                return record
+            return self.execute(record, handler)
+        finally:
+            self.locks.release(key)
+
+    def lookup(self, key, fingerprint):
+        entry = cache.get(CACHE_PREFIX + key)
+        if entry is None:
+            return None
+        stored_fingerprint, status_code, body = entry
+        return self.replay(stored_fingerprint, fingerprint, status_code, body)
+
+    def replay(self, stored_fingerprint, fingerprint, status_code, body):
+        if stored_fingerprint != fingerprint:
+            return Response(
+                {"detail": "La clave de idempotencia ya se usó con otra petición."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        response = Response(unpack(body), status=status_code)
+        response[REPLAY_HEADER] = "true"
+        return response
+
+    def remember(self, key, fingerprint, status_code, body, expires_at):
+        timeout = max(int((expires_at - timezone.now()).total_seconds()), 1)
+        cache.set(CACHE_PREFIX + key, (fingerprint, status_code, body), timeout)
+
+    def claim(self, key, fingerprint):
+        """Reserva la clave; si ya existe, espera a su respuesta o toma una reserva vencida."""
+        deadline = time.monotonic() + _setting("IDEMPOTENCY_WAIT", 10)
+        while True:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    return IdempotencyRecord.objects.create(
+                        key=key, fingerprint=fingerprint, locked_at=now, expires_at=now + timedelta(seconds=self.ttl)
+                    )
+            except IntegrityError:
+                pass
+            record = IdempotencyRecord.objects.filter(key=key).first()
+            if record is None:
+                continue
+            if record.expires_at <= now:
+                IdempotencyRecord.objects.filter(pk=record.pk, expires_at=record.expires_at).delete()
+                continue
+            if record.status_code is not None:
+                self.remember(key, record.fingerprint, record.status_code, bytes(record.body), record.expires_at)
+                return self.replay(record.fingerprint, fingerprint, record.status_code, record.body)
+            if record.fingerprint != fingerprint:
+                return self.replay(record.fingerprint, fingerprint, None, None)
+            if record.locked_at <= now - timedelta(seconds=self.lock_timeout):
+                # Quien la reservó no terminó (proceso caído): se toma la reserva.
+                taken = IdempotencyRecord.objects.filter(
+                    pk=record.pk, status_code__isnull=True, locked_at=record.locked_at
+                ).update(locked_at=now)
+                if taken:
+                    record.locked_at = now
+                    return record
+                continue
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"detail": "Una petición con la misma clave de idempotencia sigue en proceso."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(POLL_INTERVAL)
+
+    def execute(self, record, handler):
+        # Cada escritura exige seguir siendo dueño de la reserva (mismo locked_at):
+        # si otra petición la tomó por vencida, esta se deshace en lugar de duplicar la venta.
+        owned = IdempotencyRecord.objects.filter(pk=record.pk, status_code__isnull=True, locked_at=record.locked_at)
+        try:
+            with transaction.atomic():
+                response = handler()
+                if not status.is_success(response.status_code):
+                    transaction.set_rollback(True)
+                else:
+                    body = pack(response.data)
+                    if owned.update(status_code=response.status_code, body=body):
+                        transaction.on_commit(
+                            lambda: self.remember(record.key, record.fingerprint, response.status_code, body, record.expires_at)
+                        )
+                    else:
+                        transaction.set_rollback(True)
+                        response = Response(
+                            {"detail": "Otra petición con la misma clave de idempotencia tomó su lugar."},
+                            status=status.HTTP_409_CONFLICT,
+                        )
+        finally:
+            # Solo se guardan los éxitos; tras un error se puede reintentar con la misma clave.
+            owned.delete()
+        return response
+
+
+idempotency_store = IdempotencyStore()
+
+
+def clear_expired():
+    return IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+def idempotent(view_method):
+    """Acepta ``Idempotency-Key`` en una acción de escritura de un viewset.
+
+    La clave se separa por usuario y ruta; los reintentos reciben la misma
+    respuesta sin repetir la escritura.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        scoped = digest(request.user.pk, request.path, key)
+        fingerprint = digest(json.dumps(request.data, cls=JSONEncoder, sort_keys=True))
+        return idempotency_store.run(scoped, fingerprint, lambda: view_method(self, request, *args, **kwargs))
+
+    return wrapper
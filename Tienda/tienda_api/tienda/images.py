@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "products/derived"
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def variant_widths():
+    return tuple(sorted(getattr(settings, "PRODUCT_IMAGE_WIDTHS", (240, 480, 720))))
+
+
+def render_variant(image, width):
+    """Reduce ``image`` (ya abierta y orientada) a ``width`` px de ancho y la codifica."""
+    if image.width > width:
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        getattr(settings, "PRODUCT_IMAGE_FORMAT", "WEBP"),
+        quality=getattr(settings, "PRODUCT_IMAGE_QUALITY", 80),
+    )
+    return buffer.getvalue()
+
+
+def variant_name(source_name, width, content):
+    stem = posixpath.splitext(posixpath.basename(source_name))[0]
+    extension = getattr(settings, "PRODUCT_IMAGE_FORMAT", "WEBP").lower()
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return f"{DERIVED_DIR}/{stem}-{width}w.{digest}.{extension}"
+
+
+def build_variants(source_name, storage=default_storage):
+    """Genera las variantes de ``source_name`` y devuelve ``{ancho: nombre}``.
+
+    Los nombres llevan el hash del contenido: si el archivo ya existe es
+    idéntico y no se vuelve a escribir. La imagen nunca se amplía; si el
+    original no llega a la medida mayor, su propio ancho es la última variante.
+    """
+    with storage.open(source_name, "rb") as handle, Image.open(handle) as original:
+        image = ImageOps.exif_transpose(original)
+        widths = [width for width in variant_widths() if width < image.width]
+        if image.width <= variant_widths()[-1]:
+            widths.append(image.width)
+        variants = {}
+        for width in widths:
+            content = render_variant(image, width)
+            name = variant_name(source_name, width, content)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(content))
+            variants[str(width)] = name
+    return variants
+
+
+def variants_current(product, storage=default_storage):
+    variants = product.image_variants or {}
+    return (
+        variants.get("source") == product.image.name
+        and bool(variants.get("widths"))
+        and all(storage.exists(name) for name in variants["widths"].values())
+    )
+
+
+def process_product(pk):
+    """Genera las variantes de la imagen actual del producto y las guarda en ``image_variants``."""
+    from .cache import invalidate_catalog
+    from .models import Product
+
+    product = Product.objects.filter(pk=pk).only("image", "image_variants").first()
+    if product is None or not product.image:
+        return None
+    if variants_current(product):
+        return product.image_variants
+    variants = {"source": product.image.name, "widths": build_variants(product.image.name)}
+    # Solo si la imagen no cambió mientras tanto; updated_at mueve el ETag del catálogo.
+    updated = Product.objects.filter(pk=pk, image=product.image.name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        invalidate_catalog()
+    return variants
+
+
+def _run(pk):
+    try:
+        return process_product(pk)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de la imagen del producto %s", pk)
+        raise
+    finally:
+        connections.close_all()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "PRODUCT_IMAGE_WORKERS", 2),
+                thread_name_prefix="product-images",
+            )
+        return _executor
+
+
+def schedule(pk):
+    """Encola la generación de variantes; la subida no espera al redimensionado."""
+    future = executor().submit(_run, pk)
+    with _executor_lock:
+        _pending.add(future)
+    future.add_done_callback(_forget)
+    return future
+
+
+def _forget(future):
+    with _executor_lock:
+        _pending.discard(future)
+
+
+def wait_pending(timeout=None):
+    """Espera a las variantes encoladas (pruebas y comando de relleno)."""
+    with _executor_lock:
+        futures = set(_pending)
+    return wait(futures, timeout=timeout)
+
+
+def variant_urls(product, storage=default_storage):
+    """``[(ancho, url)]`` de menor a mayor; vacío si las variantes no son de la imagen actual."""
+    variants = product.image_variants or {}
+    if not product.image or variants.get("source") != product.image.name:
+        return []
+    widths = variants.get("widths") or {}
+    return [(int(width), storage.url(name)) for width, name in sorted(widths.items(), key=lambda row: int(row[0]))]
@@ -0,0 +1,260 @@
+import csv
+import json
+from collections import Counter
+from itertools import groupby
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .filters import TRUE_VALUES
+from .models import Product, Sale, SaleItem
+from .rollups import RollupDeltas, item_values
+from .search import index_sold_names
+from .stock import RETURN_STATUS, reserve_stock
+
+# Cota común de PositiveIntegerField en los motores soportados.
+MAX_QUANTITY = 2147483647
+# Límites de una petición a /ventas/bulk/ (SALE_IMPORT_MAX_RECORDS y
+# SALE_IMPORT_MAX_BYTES en settings); los archivos grandes van por el
+# comando import_sales.
+MAX_REQUEST_RECORDS = 5000
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+
+class RecordError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+def read_ndjson(lines):
+    """Una venta por línea; la referencia de cada registro es su número de línea."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, RecordError({"non_field_errors": "JSON inválido."})
+            continue
+        if not isinstance(data, dict):
+            data = RecordError({"non_field_errors": "Cada línea debe ser un objeto JSON."})
+        yield number, data
+
+
+def _csv_bool(value):
+    return (value or "").strip().lower() in TRUE_VALUES
+
+
+def read_csv(lines):
+    """Un artículo por fila; las filas consecutivas con el mismo sale_ref forman una venta."""
+    reader = csv.DictReader(lines)
+    missing = {"sale_ref", "product_id", "quantity"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}.")
+    for ref, rows in groupby(reader, key=lambda row: row["sale_ref"]):
+        rows = list(rows)
+        yield ref, {
+            "customer_name": rows[0].get("customer_name") or "",
+            "terms_accepted": _csv_bool(rows[0].get("terms_accepted")),
+            "items": [
+                {
+                    "product_id": row["product_id"],
+                    "quantity": row["quantity"],
+                    "unit_price": row.get("unit_price") or None,
+                    "status": row.get("status") or None,
+                }
+                for row in rows
+            ],
+        }
+
+
+def _clean(model, field_name, value):
+    try:
+        return model._meta.get_field(field_name).clean(value, None)
+    except ValidationError as exc:
+        raise RecordError({field_name: " ".join(exc.messages)}) from exc
+
+
+def _insert_items(items):
+    """INSERT con executemany: compilar cada fila con el ORM cuesta más que escribirla."""
+    connection = connections[router.db_for_write(SaleItem)]
+    fields = [field for field in SaleItem._meta.concrete_fields if not field.primary_key]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(SaleItem._meta.db_table),
+        ", ".join(quote(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    rows = [
+        [now if field.name == "status_updated_at" else getattr(item, field.attname) for field in fields]
+        for item in items
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), 1000):
+            cursor.executemany(sql, rows[start:start + 1000])
+
+
+class SaleImporter:
+    """Valida e inserta ventas por lotes; los registros inválidos se reportan sin detener el resto."""
+
+    def __init__(self, user=None, chunk_size=5000):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.default_customer = "Cliente"
+        if user is not None and user.is_authenticated:
+            self.default_customer = user.get_full_name() or user.get_username()
+        self.status_default = SaleItem._meta.get_field("status").default
+        self.statuses = {code for code, _ in Sale.STATUS_CHOICES}
+        self.products = {}
+        self.report = {"sales": 0, "items": 0, "errors": []}
+
+    def run(self, records):
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.report
+
+    def _load_products(self, chunk):
+        wanted = set()
+        for _, data in chunk:
+            if isinstance(data, dict) and isinstance(data.get("items"), list):
+                for item in data["items"]:
+                    try:
+                        wanted.add(int(item["product_id"]))
+                    except (KeyError, TypeError, ValueError):
+                        pass
+        wanted -= self.products.keys()
+        if wanted:
+            found = Product.objects.filter(is_active=True).select_related("category").in_bulk(wanted)
+            for pid in wanted:
+                self.products[pid] = found.get(pid)
+
+    def _build(self, data):
+        if isinstance(data, RecordError):
+            raise data
+        if not data.get("terms_accepted"):
+            raise RecordError({"terms_accepted": "Debes aceptar los términos y condiciones."})
+        items_data = data.get("items")
+        if not isinstance(items_data, list) or not items_data:
+            raise RecordError({"items": "Debes seleccionar al menos un producto."})
+
+        sale = Sale(
+            user=self.user if self.user is not None and self.user.is_authenticated else None,
+            customer_name=_clean(Sale, "customer_name", data.get("customer_name") or self.default_customer),
+            terms_accepted=True,
+        )
+        items = []
+        for item in items_data:
+            if not isinstance(item, dict):
+                raise RecordError({"items": "Cada artículo debe ser un objeto."})
+            try:
+                product = self.products.get(int(item.get("product_id")))
+            except (TypeError, ValueError):
+                raise RecordError({"product_id": "Debe ser un número entero."}) from None
+            if product is None:
+                raise RecordError({"items": f"Producto con id {item.get('product_id')} no existe o está inactivo."})
+            quantity = item.get("quantity")
+            if type(quantity) is not int or not 0 < quantity <= MAX_QUANTITY:
+                quantity = _clean(SaleItem, "quantity", quantity)
+            if quantity <= 0:
+                raise RecordError({"quantity": "La cantidad debe ser mayor a cero."})
+            unit_price = item.get("unit_price")
+            unit_price = product.price if unit_price in (None, "") else _clean(SaleItem, "unit_price", unit_price)
+            if unit_price <= 0:
+                raise RecordError({"unit_price": "El precio debe ser mayor a cero."})
+            status = item.get("status") or self.status_default
+            if status not in self.statuses:
+                raise RecordError({"status": f"«{status}» no es una opción válida."})
+            items.append(
+                SaleItem(
+                    product_id=product.pk,
+                    product_name=product.name,
+                    category_name=product.category.name if product.category_id else "",
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    status=status,
+                )
+            )
+        sale.total_amount = _clean(Sale, "total_amount", sum(item.subtotal for item in items))
+        return sale, items
+
+    def _allocate(self, candidates):
+        """Acepta en orden las ventas que caben en el stock bloqueado y rechaza las demás."""
+        wanted = {item.product_id for _, _, items in candidates for item in items}
+        available = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=wanted)
+            .order_by("pk")
+            .values_list("pk", "stock")
+        )
+        accepted, reserved = [], Counter()
+        for ref, sale, items in candidates:
+            needed = Counter()
+            for item in items:
+                if item.status != RETURN_STATUS:
+                    needed[item.product_id] += item.quantity
+            short = sorted(pid for pid, qty in needed.items() if available.get(pid, 0) - reserved[pid] < qty)
+            if short:
+                ids = ", ".join(str(pid) for pid in short)
+                self._error(ref, {"items": f"Stock insuficiente para los productos con id {ids}."})
+                continue
+            reserved.update(needed)
+            accepted.append((sale, items))
+        reserve_stock(reserved)
+        return accepted
+
+    def _insert(self, accepted):
+        sales = [sale for sale, _ in accepted]
+        if connections[router.db_for_write(Sale)].features.can_return_rows_from_bulk_insert:
+            Sale.objects.bulk_create(sales)
+        else:
+            # Sin RETURNING (MySQL) bulk_create no asigna pk a las ventas.
+            for sale in sales:
+                sale.save(force_insert=True)
+
+        deltas = RollupDeltas()
+        all_items = []
+        for sale, items in accepted:
+            day = sale.created_at.date()
+            for item in items:
+                item.sale = sale
+                deltas.add(day, item_values(item))
+            all_items.extend(items)
+        _insert_items(all_items)
+        deltas.apply()
+        index_sold_names({item.product_name for item in all_items})
+        self.report["sales"] += len(sales)
+        self.report["items"] += len(all_items)
+
+    def _error(self, ref, errors):
+        self.report["errors"].append({"record": ref, "errors": errors})
+
+    def _import_chunk(self, chunk):
+        self._load_products(chunk)
+        candidates = []
+        for ref, data in chunk:
+            try:
+                sale, items = self._build(data)
+            except RecordError as exc:
+                self._error(ref, exc.errors)
+                continue
+            candidates.append((ref, sale, items))
+        if not candidates:
+            return
+        with transaction.atomic(using=router.db_for_write(SaleItem)):
+            accepted = self._allocate(candidates)
+            if accepted:
+                self._insert(accepted)
+
+
+def import_sales(records, *, user=None, chunk_size=5000):
+    return SaleImporter(user=user, chunk_size=chunk_size).run(records)
@@ -0,0 +1,76 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from tienda.benchdata import bench_database, seed_catalog
+
+ENDPOINTS = (
+    ("productos", "tienda:product-list", "tienda:async-product-list"),
+    ("categorías", "tienda:category-list", "tienda:async-category-list"),
+)
+
+
+async def run_clients(url, clients, requests):
+    """``clients`` clientes concurrentes contra el ASGIHandler, cada uno con ``requests`` peticiones seguidas."""
+    latencies = []
+    failures = 0
+
+    async def client_loop():
+        nonlocal failures
+        client = AsyncClient()
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            failures += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "ms_p50": round(statistics.median(latencies), 1),
+        "ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 1),
+        "failures": failures,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara peticiones por segundo de las lecturas del catálogo con vistas síncronas (DRF) "
+        "y asíncronas bajo el manejador ASGI, con muchos clientes concurrentes, en una base de prueba desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=4, help="Peticiones por cliente.")
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--cold", action="store_true", help="Vacía la caché del catálogo antes de cada ronda.")
+
+    def handle(self, *args, **options):
+        # El cliente de pruebas siempre envía Host: testserver.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), bench_database():
+            seed_catalog(products=options["products"])
+            self.run(options)
+
+    def run(self, options):
+        self.stdout.write(f"{options['clients']} clientes × {options['requests']} peticiones")
+        self.stdout.write(f"{'endpoint':<22} {'pet/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'fallos':>7}")
+        for label, sync_name, async_name in ENDPOINTS:
+            for mode, name in (("sync", sync_name), ("async", async_name)):
+                cache.clear()
+                url = reverse(name)
+                if not options["cold"]:
+                    asyncio.run(run_clients(url, 1, 1))
+                row = asyncio.run(run_clients(url, options["clients"], options["requests"]))
+                self.stdout.write(
+                    f"{label + ' ' + mode:<22} {row['rps']:>9.1f} {row['ms_p50']:>9.1f} "
+                    f"{row['ms_p95']:>9.1f} {row['failures']:>7}"
+                )
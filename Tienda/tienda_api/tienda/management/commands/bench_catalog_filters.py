@@ -0,0 +1,85 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from tienda.benchdata import BENCH_SLUG_PREFIX, bench_database, seed_catalog
+from tienda.models import Product
+from tienda.serializers import ProductSerializer
+
+# Lo que pinta una tarjeta de la portada; el detalle se pide al abrir el modal.
+CARD_FIELDS = "id,name,price,thumbnail,image_srcset,category,category_name"
+
+
+def full_list():
+    """Lo que hacía la portada: bajar el catálogo completo y filtrar en el navegador."""
+    products = Product.objects.filter(is_active=True).select_related("category").order_by("-created_at", "id")
+    return JSONRenderer().render(ProductSerializer(products, many=True).data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide bytes y latencia de la primera página del catálogo con filtros, orden y facetas "
+        "en el servidor, contra descargar la lista completa y filtrarla en el navegador. "
+        "Siembra y mide en una base de prueba desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50_000)
+        parser.add_argument("--categories", type=int, default=40)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--description-chars", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            products = seed_catalog(categories=options["categories"], products=options["products"])
+            self.prepare(products, options["description_chars"])
+            self.run(products[0].category_id, options["repeat"])
+
+    @staticmethod
+    def prepare(products, description_chars):
+        bench = Product.objects.filter(slug__startswith=BENCH_SLUG_PREFIX)
+        bench.update(description="Descripción de prueba. " * (description_chars // 23 + 1))
+        # Una cuarta parte agotada para que ?in_stock=1 filtre algo.
+        sold_out = [product.pk for product in products[::4]]
+        for start in range(0, len(sold_out), 500):
+            Product.objects.filter(pk__in=sold_out[start:start + 500]).update(stock=0)
+
+    def run(self, category_id, repeat):
+        url = reverse("tienda:product-list")
+        scenarios = (
+            ("portada", {"facets": 1}),
+            ("categoría", {"category": category_id, "facets": 1}),
+            ("precio+existencias", {"min_price": 100, "max_price": 1000, "in_stock": 1, "ordering": "price", "facets": 1}),
+            ("orden por nombre", {"ordering": "name"}),
+        )
+        self.stdout.write(f"{Product.objects.filter(is_active=True).count()} productos activos, {repeat} repeticiones en frío")
+        self.stdout.write(f"{'escenario':<22} {'bytes':>11} {'p50 ms':>9} {'p95 ms':>9} {'filas':>6}")
+
+        timings = []
+        for _ in range(max(repeat // 5, 1)):
+            started = time.perf_counter()
+            body = full_list()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.report("lista completa", len(body), timings, len(json.loads(body)))
+
+        client = Client(HTTP_HOST="localhost")
+        for label, params in scenarios:
+            params = {**params, "fields": CARD_FIELDS}
+            timings = []
+            for _ in range(repeat):
+                cache.clear()
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.report(label, len(response.content), timings, len(response.json()["results"]))
+
+    def report(self, label, size, timings, rows):
+        timings.sort()
+        p95 = timings[int(0.95 * (len(timings) - 1))]
+        self.stdout.write(f"{label:<22} {size:>11} {statistics.median(timings):>9.1f} {p95:>9.1f} {rows:>6}")
@@ -0,0 +1,101 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import ConnectionHandler
+
+from tienda.db.pool import get_pool
+
+POOLED_ENGINES = {
+    "django.db.backends.mysql": "tienda.db.mysql",
+    "django.db.backends.sqlite3": "tienda.db.sqlite3",
+}
+
+
+def run_load(alias, settings_dict, threads, requests, query):
+    """Cada "petición" abre (o toma del pool) la conexión, consulta y la cierra, como Django."""
+    # ConnectionHandler exige un alias 'default'; el de la prueba va aparte para no tocar su pool.
+    handler = ConnectionHandler({"default": {"ENGINE": "django.db.backends.dummy"}, alias: settings_dict})
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        mine = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                connection = handler[alias]
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+                    cursor.fetchall()
+                connection.close()
+                mine.append((time.perf_counter() - started) * 1000)
+        except Exception as exc:
+            errors.append(exc)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise CommandError(f"La prueba falló: {errors[0]}")
+
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "ms_p50": round(statistics.median(latencies), 3),
+        "ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+        "ms_max": round(latencies[-1], 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de conexiones: compara la latencia por petición abriendo una conexión "
+        "nueva cada vez contra tomarla del pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="Peticiones por hilo.")
+        parser.add_argument("--pool-size", type=int, help="Por omisión, la mitad de los hilos.")
+        parser.add_argument("--query", default="SELECT 1")
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES.get(options["database"])
+        if base is None:
+            raise CommandError(f"No existe la base «{options['database']}».")
+        direct = {pooled: plain for plain, pooled in POOLED_ENGINES.items()}.get(base["ENGINE"], base["ENGINE"])
+        if direct not in POOLED_ENGINES:
+            raise CommandError(f"El motor {base['ENGINE']} no tiene versión con pool.")
+
+        threads = options["threads"]
+        pool = {**base.get("POOL", {}), "MAX_SIZE": options["pool_size"] or max(threads // 2, 1)}
+        runs = {
+            "directo": dict(base, ENGINE=direct),
+            "pool": dict(base, ENGINE=POOLED_ENGINES[direct], POOL=pool),
+        }
+        self.stdout.write(f"{threads} hilos × {options['requests']} peticiones, pool de {pool['MAX_SIZE']}")
+        self.stdout.write(f"{'modo':<10} {'pet/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9}")
+        for label, settings_dict in runs.items():
+            alias = f"bench_connections_{label}"
+            row = run_load(alias, settings_dict, threads, options["requests"], options["query"])
+            self.stdout.write(
+                f"{label:<10} {row['rps']:>10.1f} {row['ms_p50']:>9.3f} {row['ms_p95']:>9.3f} {row['ms_max']:>9.3f}"
+            )
+            if label == "pool":
+                stats = get_pool(alias, settings_dict).stats()
+                self.stdout.write(
+                    f"pool: {stats['created']} creadas, {stats['reused']} reutilizadas, "
+                    f"{stats['waits']} esperas (media {stats['wait_ms_avg']} ms, máx {stats['wait_ms_max']} ms)"
+                )
+                get_pool(alias, settings_dict).close_all()
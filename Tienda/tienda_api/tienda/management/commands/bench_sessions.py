@@ -0,0 +1,61 @@
+from itertools import count
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tienda.benchdata import bench_database
+
+LEGACY = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+    "SESSION_SAVE_EVERY_REQUEST": True,
+    "MIDDLEWARE": [
+        "django.contrib.sessions.middleware.SessionMiddleware" if name == "tienda.sessions.SlidingSessionMiddleware" else name
+        for name in settings.MIDDLEWARE
+    ],
+}
+
+
+def session_queries(requests, spacing):
+    """Consultas a django_session durante ``requests`` peticiones autenticadas separadas ``spacing`` s."""
+    user = get_user_model().objects.create_user("bench_sesiones")
+    clock = count(start=1_000_000, step=spacing)
+    client = Client(HTTP_HOST="localhost")
+    try:
+        client.force_login(user)
+        url = reverse("tienda:category-list")
+        with mock.patch("tienda.sessions._now", lambda: next(clock)):
+            with CaptureQueriesContext(connection) as ctx:
+                for _ in range(requests):
+                    client.get(url)
+    finally:
+        client.logout()
+        user.delete()
+    session_sql = [query["sql"] for query in ctx.captured_queries if "django_session" in query["sql"]]
+    writes = sum(1 for sql in session_sql if sql.lstrip().split()[0].upper() in {"INSERT", "UPDATE", "DELETE"})
+    return {"writes": writes, "reads": len(session_sql) - writes}
+
+
+class Command(BaseCommand):
+    help = "Cuenta escrituras y lecturas de sesión en la base por cada 1000 peticiones: guardado en cada petición contra sesión deslizante en caché."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--spacing", type=float, default=1.0, help="Segundos simulados entre peticiones.")
+
+    def handle(self, *args, **options):
+        requests, spacing = options["requests"], options["spacing"]
+        self.stdout.write(f"{requests} peticiones, una cada {spacing} s simulados")
+        self.stdout.write(f"{'modo':<14} {'escrituras':>11} {'lecturas':>9} {'escrituras/1000':>16}")
+        with bench_database():
+            with override_settings(**LEGACY):
+                legacy = session_queries(requests, spacing)
+            sliding = session_queries(requests, spacing)
+        for label, row in (("por petición", legacy), ("deslizante", sliding)):
+            per_thousand = row["writes"] * 1000 / requests
+            self.stdout.write(f"{label:<14} {row['writes']:>11} {row['reads']:>9} {per_thousand:>16.1f}")
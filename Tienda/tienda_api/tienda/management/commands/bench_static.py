@@ -0,0 +1,66 @@
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from tienda.fileserver import IMMUTABLE, FileServer
+
+ASSET = re.compile(r'(?:href|src)="([^"]+)"')
+PAGES = ("tienda:home", "tienda:login")
+
+
+class Command(BaseCommand):
+    help = (
+        "Corre collectstatic en un directorio temporal y mide los bytes de estáticos de las páginas "
+        "en la primera carga y en una carga repetida con la caché del navegador."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accept-encoding", default="br, gzip")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root, DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            self.run(FileServer.from_settings(), options["accept_encoding"])
+
+    def run(self, server, accept_encoding):
+        client = Client()
+        urls = []
+        for name in PAGES:
+            html = client.get(reverse(name)).content.decode()
+            urls += [url for url in ASSET.findall(html) if url.startswith(settings.STATIC_URL) and url not in urls]
+
+        self.stdout.write(f"{'archivo':<34} {'original':>9} {'1ª carga':>9} {'repetida':>9}  cabecera")
+        totals = {"raw": 0, "first": 0, "repeat": 0, "requests": 0}
+        for url in urls:
+            first = server.respond("GET", url, {"accept-encoding": accept_encoding})
+            if first is None:
+                self.stdout.write(f"{url:<34} {'no existe':>9}")
+                continue
+            headers = dict(first.headers)
+            raw = os.path.getsize(server.find(url))
+            sent = int(headers["Content-Length"])
+            if headers["Cache-Control"] == IMMUTABLE:
+                # immutable: el navegador ni siquiera revalida.
+                repeat, label = 0, "immutable"
+            else:
+                again = server.respond("GET", url, {"accept-encoding": accept_encoding, "if-none-match": headers["ETag"]})
+                repeat, label = (0 if again.status == 304 else int(dict(again.headers)["Content-Length"])), f"{again.status}"
+                totals["requests"] += 1
+            totals["raw"] += raw
+            totals["first"] += sent
+            totals["repeat"] += repeat
+            short = url[len(settings.STATIC_URL):]
+            encoding = headers.get("Content-Encoding", "identidad")
+            self.stdout.write(f"{short[-34:]:<34} {raw:>9} {sent:>9} {repeat:>9}  {encoding}, {label}")
+        self.stdout.write(
+            f"primera carga: {totals['raw']} B sin comprimir → {totals['first']} B; "
+            f"carga repetida: {totals['repeat']} B en {totals['requests']} peticiones"
+        )
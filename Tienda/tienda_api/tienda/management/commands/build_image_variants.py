@@ -0,0 +1,48 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from tienda import images
+from tienda.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas y variantes responsivas de las imágenes de producto que aún no las "
+        "tienen (o de todas con --force) y compara su peso contra los originales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenera también las variantes vigentes.")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image="").exclude(image__isnull=True)
+        if options["force"]:
+            products.update(image_variants={})
+        pending = [product.pk for product in products.only("image", "image_variants") if not images.variants_current(product)]
+        for pk in pending:
+            images.schedule(pk)
+        done, _ = images.wait_pending()
+        failed = sum(1 for future in done if future.exception() is not None)
+        self.stdout.write(f"Productos procesados: {len(pending) - failed}, con error: {failed}.")
+        self.report(products.only("image", "image_variants"))
+
+    def report(self, products):
+        """Bytes que bajaría el navegador por producto a cada ancho pedido, contra el original."""
+        originals, count = 0, 0
+        by_width = dict.fromkeys(images.variant_widths(), 0)
+        for product in products:
+            if not images.variants_current(product):
+                continue
+            count += 1
+            originals += default_storage.size(product.image.name)
+            variants = {int(width): name for width, name in product.image_variants["widths"].items()}
+            for wanted in by_width:
+                width = min((width for width in variants if width >= wanted), default=max(variants))
+                by_width[wanted] += default_storage.size(variants[width])
+        if not count:
+            return
+        self.stdout.write(f"{count} imágenes")
+        self.stdout.write(f"{'ancho':<10} {'KB':>9} {'% del original':>15}")
+        self.stdout.write(f"{'original':<10} {originals / 1024:>9.1f} {100:>15.1f}")
+        for width, size in by_width.items():
+            self.stdout.write(f"{f'{width}w':<10} {size / 1024:>9.1f} {100 * size / originals:>15.1f}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from tienda.totals import check_totals
+
+
+class Command(BaseCommand):
+    help = "Compara el total guardado de cada venta con la suma de sus artículos y corrige las diferencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--fix", action="store_true", help="Recalcula los totales que no coinciden.")
+
+    def handle(self, *args, **options):
+        drifted = check_totals(batch_size=options["batch_size"], fix=options["fix"])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Todos los totales coinciden."))
+            return
+        sample = ", ".join(str(pk) for pk in drifted[:20])
+        more = "…" if len(drifted) > 20 else ""
+        if options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Totales corregidos: {len(drifted)} ventas ({sample}{more})."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Ventas con total distinto: {len(drifted)} ({sample}{more}). Usa --fix para corregirlas."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tienda.idempotency import clear_expired
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de idempotencia vencidas."
+
+    def handle(self, *args, **options):
+        deleted = clear_expired()
+        self.stdout.write(self.style.SUCCESS(f"Claves vencidas borradas: {deleted}."))
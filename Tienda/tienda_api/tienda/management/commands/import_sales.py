@@ -0,0 +1,48 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda.ingest import import_sales, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    help = "Importa ventas desde un archivo NDJSON (una venta por línea) o CSV (un artículo por fila)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archivo a importar; '-' lee de la entrada estándar.")
+        parser.add_argument("--format", choices=["ndjson", "csv"])
+        parser.add_argument("--user", help="Usuario al que se asignan las ventas.")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get_by_natural_key(options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe el usuario {options['user']}.") from None
+
+        reader = read_csv if fmt == "csv" else read_ndjson
+        try:
+            stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        except OSError as exc:
+            raise CommandError(f"No se pudo abrir {path}: {exc.strerror}.") from exc
+        try:
+            report = import_sales(reader(stream), user=user, chunk_size=options["chunk_size"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report["errors"]:
+            self.stderr.write(f"Registro {error['record']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ventas importadas: {report['sales']} ({report['items']} artículos), "
+                f"registros con error: {len(report['errors'])}."
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tienda.rollups import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen diario de ventas a partir de los artículos vendidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_rollup(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {created} filas."))
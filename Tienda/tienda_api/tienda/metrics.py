@@ -0,0 +1,269 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# serialize_ms: ``serializer.data``; render_ms: renderer o plantilla.
+METRIC_FIELDS = ("queries", "db_ms", "serialize_ms", "render_ms", "total_ms")
+
+
+def _percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class RequestStats:
+    """Últimas muestras por vista, en memoria del proceso."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = defaultdict(lambda: deque(maxlen=self.window))
+            self.duplicates = defaultdict(Counter)
+
+    def resize(self, window):
+        with self.lock:
+            if window == self.window:
+                return
+            self.window = window
+            samples = self.samples
+            self.samples = defaultdict(lambda: deque(maxlen=self.window))
+            for name, rows in samples.items():
+                self.samples[name].extend(rows)
+
+    def record(self, view_name, sample, duplicates):
+        with self.lock:
+            self.samples[view_name].append(tuple(sample[field] for field in METRIC_FIELDS))
+            for sql, count in duplicates.items():
+                self.duplicates[view_name][sql] = max(self.duplicates[view_name][sql], count)
+
+    def snapshot(self):
+        with self.lock:
+            samples = {name: list(rows) for name, rows in self.samples.items()}
+            duplicates = {name: dict(found) for name, found in self.duplicates.items()}
+        views = {}
+        for name, rows in sorted(samples.items()):
+            stats = {"requests": len(rows)}
+            for position, field in enumerate(METRIC_FIELDS):
+                values = sorted(row[position] for row in rows)
+                stats[field] = {
+                    "p50": _percentile(values, 0.5),
+                    "p95": _percentile(values, 0.95),
+                    "p99": _percentile(values, 0.99),
+                    "max": values[-1],
+                }
+            repeated = sorted(duplicates.get(name, {}).items(), key=lambda pair: -pair[1])
+            stats["duplicate_queries"] = [{"sql": sql, "count": count} for sql, count in repeated[:10]]
+            views[name] = stats
+        return {"window": self.window, "views": views}
+
+
+# La ventana se ajusta a REQUEST_METRICS_WINDOW al crear la middleware.
+request_stats = RequestStats()
+
+
+def add_timing(request, name, seconds):
+    """Suma ``seconds`` a la métrica ``name`` de la petición, si se está midiendo."""
+    timings = getattr(getattr(request, "_request", request), "_metrics", None)
+    if timings is not None:
+        timings[name] += seconds
+
+
+@contextmanager
+def timed(request, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(request, name, time.perf_counter() - start)
+
+
+class TimedSerializer:
+    """Envuelve un serializador y mide el acceso a ``.data``; el resto pasa directo."""
+
+    def __init__(self, serializer, request):
+        self._serializer = serializer
+        self._request = request
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+    @property
+    def data(self):
+        with timed(self._request, "serialize"):
+            return self._serializer.data
+
+
+class SerializerTimingMixin:
+    """Para viewsets de DRF: el tiempo de serialización llega a ``serialize_ms``."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if getattr(self.request._request, "_metrics", None) is None:
+            return serializer
+        return TimedSerializer(serializer, self.request)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            # Los parámetros van aparte: la misma sentencia repetida es la
+            # firma de un N+1.
+            self.statements[sql] += 1
+
+
+# El QueryRecorder de la petición en curso. Una variable de contexto, y no
+# execute_wrapper por petición, porque las conexiones son de cada hilo: en
+# ASGI el ORM corre en el hilo de sync_to_async, que hereda el contexto.
+_current_recorder = ContextVar("tienda_metrics_recorder", default=None)
+
+
+def _dispatch(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_dispatch(connection, **kwargs):
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+
+@contextmanager
+def recording(recorder):
+    token = _current_recorder.set(recorder)
+    try:
+        yield
+    finally:
+        _current_recorder.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """Mide consultas, tiempo de SQL, de serialización, de render y total por vista.
+
+    Se activa con ``REQUEST_METRICS = True``; si no, Django la descarta al
+    arrancar y no añade ningún costo por petición. Funciona en WSGI y ASGI
+    sin saltos de hilo; en las respuestas en streaming la muestra se guarda
+    al terminar el cuerpo y la cabecera solo cubre hasta el primer byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_METRICS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, "REQUEST_METRICS_DUPLICATE_THRESHOLD", 3)
+        request_stats.resize(getattr(settings, "REQUEST_METRICS_WINDOW", 500))
+        # Las conexiones que se abran desde ahora, en cualquier hilo, y las de este.
+        connection_created.connect(install_query_dispatch, dispatch_uid="tienda.metrics")
+        for connection in connections.all():
+            install_query_dispatch(connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start, recorder = self.begin(request)
+        with recording(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, start, recorder)
+
+    async def __acall__(self, request):
+        start, recorder = self.begin(request)
+        with recording(recorder):
+            response = await self.get_response(request)
+        return self.finish(request, response, start, recorder)
+
+    @staticmethod
+    def begin(request):
+        request._metrics = Counter()
+        return time.perf_counter(), QueryRecorder()
+
+    def finish(self, request, response, start, recorder):
+        if response.streaming:
+            stream = self.astream if getattr(response, "is_async", False) else self.stream
+            response.streaming_content = stream(response.streaming_content, request, start, recorder)
+            sample, duplicates = self.sample(request, start, recorder)
+        else:
+            sample, duplicates = self.record(request, start, recorder)
+
+        timing = [
+            f'db;dur={sample["db_ms"]};desc="{recorder.count} consultas"',
+            f'serialize;dur={sample["serialize_ms"]}',
+            f'render;dur={sample["render_ms"]}',
+            f'total;dur={sample["total_ms"]}',
+        ]
+        if duplicates:
+            timing.append(f'dup;desc="{sum(duplicates.values())} consultas repetidas"')
+        response["Server-Timing"] = ", ".join(timing)
+        return response
+
+    def stream(self, content, request, start, recorder):
+        try:
+            with recording(recorder):
+                yield from content
+        finally:
+            self.record(request, start, recorder)
+
+    async def astream(self, content, request, start, recorder):
+        try:
+            with recording(recorder):
+                async for chunk in content:
+                    yield chunk
+        finally:
+            self.record(request, start, recorder)
+
+    def sample(self, request, start, recorder):
+        duplicates = {
+            sql: count for sql, count in recorder.statements.items() if count >= self.duplicate_threshold
+        }
+        sample = {
+            "queries": recorder.count,
+            "db_ms": round(recorder.seconds * 1000, 2),
+            "serialize_ms": round(request._metrics["serialize"] * 1000, 2),
+            "render_ms": round(request._metrics["render"] * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        return sample, duplicates
+
+    def record(self, request, start, recorder):
+        sample, duplicates = self.sample(request, start, recorder)
+        match = getattr(request, "resolver_match", None)
+        request_stats.record(match.view_name if match else "<sin vista>", sample, duplicates)
+        return sample, duplicates
+
+    def process_template_response(self, request, response):
+        # Se llama justo antes de render(); el callback marca el final.
+        start = time.perf_counter()
+
+        def rendered(response):
+            add_timing(request, "render", time.perf_counter() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
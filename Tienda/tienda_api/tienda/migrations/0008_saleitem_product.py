@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0007_sale_and_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_items', to='tienda.product', verbose_name='Producto del catálogo'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:17
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_rollup(apps, schema_editor):
+    SaleItem = apps.get_model('tienda', 'SaleItem')
+    DailySalesRollup = apps.get_model('tienda', 'DailySalesRollup')
+    rows = (
+        SaleItem.objects.annotate(day=TruncDate('sale__created_at'))
+        .values('day', 'category_name', 'product_name', 'status')
+        .annotate(total_qty=Sum('quantity'), total_amount=Sum(F('quantity') * F('unit_price')))
+        .order_by()
+    )
+    DailySalesRollup.objects.bulk_create(
+        (
+            DailySalesRollup(
+                day=row['day'],
+                category_name=row['category_name'] or '',
+                product_name=row['product_name'],
+                status=row['status'],
+                quantity=row['total_qty'] or 0,
+                amount=row['total_amount'] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0009_product_catalog_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('category_name', models.CharField(blank=True, max_length=120, verbose_name='Categoría')),
+                ('product_name', models.CharField(max_length=200, verbose_name='Producto')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('received', 'Recibido'), ('return_requested', 'Devolución solicitada')], max_length=20, verbose_name='Estado')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Cantidad')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Importe')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de ventas',
+                'verbose_name_plural': 'Resúmenes diarios de ventas',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'category_name', 'product_name', 'status'), name='tienda_rollup_unique_key'),
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
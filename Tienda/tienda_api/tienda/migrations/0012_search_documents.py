@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE tienda_searchdocument_fts USING fts5("
+    "text, content='tienda_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER tienda_searchdocument_ai AFTER INSERT ON tienda_searchdocument BEGIN "
+    "INSERT INTO tienda_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER tienda_searchdocument_ad AFTER DELETE ON tienda_searchdocument BEGIN "
+    "INSERT INTO tienda_searchdocument_fts(tienda_searchdocument_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER tienda_searchdocument_au AFTER UPDATE ON tienda_searchdocument BEGIN "
+    "INSERT INTO tienda_searchdocument_fts(tienda_searchdocument_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO tienda_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+)
+SQLITE_BACKWARD = (
+    "DROP TRIGGER IF EXISTS tienda_searchdocument_au",
+    "DROP TRIGGER IF EXISTS tienda_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS tienda_searchdocument_ai",
+    "DROP TABLE IF EXISTS tienda_searchdocument_fts",
+)
+MYSQL_FORWARD = ("ALTER TABLE tienda_searchdocument ADD FULLTEXT INDEX tienda_search_text_ft (text)",)
+MYSQL_BACKWARD = ("ALTER TABLE tienda_searchdocument DROP INDEX tienda_search_text_ft",)
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def create_fulltext(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'mysql': MYSQL_FORWARD})
+
+
+def drop_fulltext(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'mysql': MYSQL_BACKWARD})
+
+
+def populate_documents(apps, schema_editor):
+    Product = apps.get_model('tienda', 'Product')
+    SaleItem = apps.get_model('tienda', 'SaleItem')
+    SearchDocument = apps.get_model('tienda', 'SearchDocument')
+    products = Product.objects.select_related('category').iterator()
+    SearchDocument.objects.bulk_create(
+        (
+            SearchDocument(
+                kind='product',
+                key=str(product.pk),
+                text=' '.join(filter(None, (product.name, product.category.name, product.description))),
+            )
+            for product in products
+        ),
+        batch_size=1000,
+    )
+    names = SaleItem.objects.values_list('product_name', flat=True).distinct().order_by()
+    SearchDocument.objects.bulk_create(
+        (SearchDocument(kind='sold_product', key=name, text=name) for name in names.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0011_report_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Producto del catálogo'), ('sold_product', 'Producto vendido')], max_length=20, verbose_name='Tipo')),
+                ('key', models.CharField(max_length=200, verbose_name='Clave')),
+                ('text', models.TextField(verbose_name='Texto indexado')),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['product_name'], name='tienda_item_product_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='tienda_search_unique_key'),
+        ),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
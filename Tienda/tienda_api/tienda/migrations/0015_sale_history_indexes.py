@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0014_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='tienda_sale_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['status_updated_at'], name='tienda_item_status_upd_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0015_sale_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='Huella de la petición')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código HTTP')),
+                ('body', models.BinaryField(blank=True, null=True, verbose_name='Respuesta comprimida')),
+                ('locked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='En proceso desde')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Vence')),
+            ],
+            options={
+                'verbose_name': 'Clave de idempotencia',
+                'verbose_name_plural': 'Claves de idempotencia',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0016_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='saleitem',
+            name='tienda_item_status_upd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale', 'status_updated_at'], name='tienda_item_sale_upd_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Las ventas existentes no cambiaron desde que se crearon.
+    Sale = apps.get_model('tienda', 'Sale')
+    Sale.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tienda', '0017_sale_item_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sale_id', models.BigIntegerField(verbose_name='Venta')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Borrada')),
+            ],
+            options={
+                'verbose_name': 'Venta borrada',
+                'verbose_name_plural': 'Ventas borradas',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='saleitem',
+            name='tienda_item_sale_upd_idx',
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Actualizado'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', 'updated_at'], name='tienda_sale_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedsale',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedsale',
+            index=models.Index(fields=['user', 'deleted_at'], name='tienda_deleted_sale_user_idx'),
+        ),
+    ]
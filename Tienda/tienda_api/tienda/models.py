@@ -1,9 +1,15 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
+# Se envía después de cambiar el estado de varios artículos con un solo
+# UPDATE (que no dispara post_save); recibe ``items`` y ``previous``, el
+# estado anterior de cada artículo por pk.
+sale_items_status_changed = Signal()
+
 
 class Category(models.Model):
     name = models.CharField("Nombre", max_length=100, unique=True)
@@ -26,6 +32,8 @@ class Product(models.Model):
     price = models.DecimalField("Precio", max_digits=10, decimal_places=2)
     description = models.TextField("Descripción", blank=True)
     image = models.ImageField("Imagen", upload_to="products/", blank=True, null=True)
+    # {"source": nombre del original, "widths": {"240": nombre de la variante, ...}}; ver tienda.images.
+    image_variants = models.JSONField("Variantes de imagen", default=dict, blank=True, editable=False)
     category = models.ForeignKey(Category, verbose_name="Categoría", on_delete=models.PROTECT)
     stock = models.PositiveIntegerField("Existencias", default=0)
     is_active = models.BooleanField("Activo", default=True)
@@ -36,6 +44,11 @@ class Product(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["is_active", "-created_at", "id"], name="tienda_prod_catalog_idx"),
+            # Cubre las facetas por categoría (GROUP BY category_id) y el listado filtrado por categoría.
+            models.Index(fields=["category", "is_active", "-created_at", "id"], name="tienda_prod_cat_catalog_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,19 +87,28 @@ class Sale(models.Model):
     terms_accepted = models.BooleanField("Aceptó términos", default=False)
     total_amount = models.DecimalField("Total", max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField("Creado", auto_now_add=True)
+    # También cambia cuando cambian sus artículos (tienda.history.touch_sales).
+    updated_at = models.DateTimeField("Actualizado", auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Venta"
         verbose_name_plural = "Ventas"
+        indexes = [
+            models.Index(fields=["created_at"], name="tienda_sale_created_idx"),
+            models.Index(fields=["user", "-created_at", "-id"], name="tienda_sale_user_created_idx"),
+            # Ventas nuevas o cambiadas de ?since=.
+            models.Index(fields=["user", "updated_at"], name="tienda_sale_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"Venta #{self.pk}"
 
     def recalc_total(self):
-        total = sum(item.subtotal for item in self.items.all())
-        self.total_amount = total
-        self.save(update_fields=["total_amount"])
+        from .totals import recalculate_totals
+
+        recalculate_totals(Sale.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=["total_amount"])
 
 
 class SaleItem(models.Model):
@@ -96,6 +118,14 @@ class SaleItem(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Venta",
     )
+    product = models.ForeignKey(
+        Product,
+        related_name="sale_items",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Producto del catálogo",
+    )
     product_name = models.CharField("Producto", max_length=200)
     category_name = models.CharField("Categoría", max_length=120, blank=True)
     quantity = models.PositiveIntegerField("Cantidad", default=1)
@@ -111,6 +141,13 @@ class SaleItem(models.Model):
     class Meta:
         verbose_name = "Artículo de venta"
         verbose_name_plural = "Artículos de venta"
+        # Combinaciones de filtros del reporte; el rango de fechas entra por
+        # el índice de Sale.created_at y se une por sale.
+        indexes = [
+            models.Index(fields=["product_name"], name="tienda_item_product_name_idx"),
+            models.Index(fields=["status", "sale"], name="tienda_item_status_sale_idx"),
+            models.Index(fields=["category_name", "status", "sale"], name="tienda_item_cat_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product_name} ({self.quantity})"
@@ -119,10 +156,128 @@ class SaleItem(models.Model):
     def subtotal(self):
         return self.quantity * self.unit_price
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores tal como están en la base; los usa el resumen diario para
+        # restar la fila anterior cuando el artículo cambia.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def set_status(self, status):
+        from .stock import apply_status_transition
+
+        previous = self.status
+        with transaction.atomic():
+            self.status = status
+            self.save(update_fields=["status", "status_updated_at"])
+            apply_status_transition(self, previous)
+
+    @classmethod
+    def bulk_set_status(cls, items, status):
+        """Cambia el estado de varios artículos con un UPDATE; devuelve los que cambiaron."""
+        from .stock import apply_status_transitions
+
+        items = [item for item in items if item.status != status]
+        if not items:
+            return []
+        previous = {item.pk: item.status for item in items}
+        now = timezone.now()
+        with transaction.atomic():
+            cls.objects.filter(pk__in=previous).update(status=status, status_updated_at=now)
+            for item in items:
+                item.status = status
+                item.status_updated_at = now
+            apply_status_transitions(items, previous)
+            sale_items_status_changed.send(sender=cls, items=items, previous=previous)
+        return items
+
     def mark_received(self):
-        self.status = "received"
-        self.save(update_fields=["status", "status_updated_at"])
+        self.set_status("received")
 
     def request_return(self):
-        self.status = "return_requested"
-        self.save(update_fields=["status", "status_updated_at"])
\ No newline at end of file
+        self.set_status("return_requested")
+
+
+class DeletedSale(models.Model):
+    """Marca de una venta borrada, para que ``?since=`` la quite del historial del cliente."""
+
+    user = models.ForeignKey(User, verbose_name="Usuario", on_delete=models.CASCADE, related_name="+")
+    sale_id = models.BigIntegerField("Venta")
+    deleted_at = models.DateTimeField("Borrada", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Venta borrada"
+        verbose_name_plural = "Ventas borradas"
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tienda_deleted_sale_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"Venta #{self.sale_id} borrada"
+
+
+class DailySalesRollup(models.Model):
+    day = models.DateField("Día")
+    category_name = models.CharField("Categoría", max_length=120, blank=True)
+    product_name = models.CharField("Producto", max_length=200)
+    status = models.CharField("Estado", max_length=20, choices=Sale.STATUS_CHOICES)
+    quantity = models.BigIntegerField("Cantidad", default=0)
+    amount = models.DecimalField("Importe", max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Resumen diario de ventas"
+        verbose_name_plural = "Resúmenes diarios de ventas"
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "category_name", "product_name", "status"],
+                name="tienda_rollup_unique_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_name} ({self.status})"
+
+
+class SearchDocument(models.Model):
+    KIND_CHOICES = (
+        ("product", "Producto del catálogo"),
+        ("sold_product", "Producto vendido"),
+    )
+
+    kind = models.CharField("Tipo", max_length=20, choices=KIND_CHOICES)
+    key = models.CharField("Clave", max_length=200)
+    text = models.TextField("Texto indexado")
+
+    class Meta:
+        verbose_name = "Documento de búsqueda"
+        verbose_name_plural = "Documentos de búsqueda"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="tienda_search_unique_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
+
+
+class IdempotencyRecord(models.Model):
+    """Respuesta guardada de una petición con ``Idempotency-Key`` (ver tienda.idempotency).
+
+    Sin ``status_code`` la petición sigue en proceso y ``locked_at`` marca
+    desde cuándo; la fila vence en ``expires_at``.
+    """
+
+    key = models.CharField("Clave", max_length=64, unique=True)
+    fingerprint = models.CharField("Huella de la petición", max_length=64)
+    status_code = models.PositiveSmallIntegerField("Código HTTP", null=True, blank=True)
+    body = models.BinaryField("Respuesta comprimida", null=True, blank=True)
+    locked_at = models.DateTimeField("En proceso desde", default=timezone.now)
+    expires_at = models.DateTimeField("Vence", db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,144 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor con la posición completa: un valor por cada campo del orden.
+
+    CursorPagination guarda solo el primer campo y un desplazamiento para los
+    empates, así que una racha de precios iguales se recorre con OFFSET y un
+    alta o baja dentro de ella salta o repite filas. Aquí la posición incluye
+    el desempate (el orden debe terminar en un campo único) y la página
+    siguiente se filtra por la tupla entera.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Igual que CursorPagination.paginate_queryset salvo el filtro de la posición.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self.position_filter(current_position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def position_filter(self, position, reverse):
+        """``(a, b, id) > (x, y, z)`` respetando la dirección de cada campo."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions, equal = [], {}
+        for order, value in zip(self.ordering, values):
+            attr = order.lstrip("-")
+            lookup = "lt" if reverse != order.startswith("-") else "gt"
+            conditions.append(Q(**equal, **{f"{attr}__{lookup}": value}))
+            equal[attr] = value
+        return reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            attr = order.lstrip("-")
+            value = instance[attr] if isinstance(instance, dict) else getattr(instance, attr)
+            values.append(str(value))
+        return json.dumps(values)
+
+
+class CatalogCursorPagination(KeysetCursorPagination):
+    """Paginación por cursor sobre (-created_at, id) para no usar OFFSET.
+
+    Si la vista ordena con ``?ordering=``, el cursor sigue ese orden y se
+    desempata por id, que entra en la posición del cursor.
+    """
+
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "id")
+    search_ordering = ("search_rank", "id")
+
+    def get_ordering(self, request, queryset, view):
+        # Con ?q= y sin orden explícito manda la relevancia que calculó el índice de búsqueda.
+        if "search_rank" in queryset.query.annotations and not request.query_params.get("ordering"):
+            return self.search_ordering
+        ordering = super().get_ordering(request, queryset, view)
+        if not {"id", "-id", "pk", "-pk"} & set(ordering):
+            ordering = (*ordering, "id")
+        return ordering
+
+
+class SaleHistoryPagination(KeysetCursorPagination):
+    """Historial de compras, de la más reciente a la más antigua.
+
+    Solo pagina si se pide con ``?page_size=`` o ``?cursor=``: sin ellos la
+    respuesta sigue siendo la lista completa, como antes.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
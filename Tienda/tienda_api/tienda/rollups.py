@@ -0,0 +1,134 @@
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from .models import DailySalesRollup, SaleItem
+
+ROLLUP_KEY_FIELDS = ("day", "category_name", "product_name", "status")
+
+
+def rollup_key(day, values):
+    return (day, values["category_name"] or "", values["product_name"], values["status"])
+
+
+def loose_key(key):
+    """La clave como la compara MySQL (utf8mb4_*_ci): sin mayúsculas, acentos ni espacios finales."""
+    day, category_name, product_name, status = key
+
+    def fold(text):
+        text = unicodedata.normalize("NFKD", text.rstrip(" "))
+        return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+    return day, fold(category_name), fold(product_name), status
+
+
+def match_rows(deltas, rows):
+    """Reparte ``deltas`` por pk de las filas ``(pk, *ROLLUP_KEY_FIELDS)`` leídas de la base.
+
+    Con una colación que no distingue mayúsculas, acentos ni espacios finales,
+    dos nombres distintos caen en la misma fila única: primero se busca la
+    clave exacta y luego la equivalente, y sus deltas se suman.
+    """
+    exact, loose = {}, {}
+    for pk, *key in rows:
+        exact[tuple(key)] = pk
+        loose.setdefault(loose_key(key), pk)
+    targets = defaultdict(lambda: [0, Decimal("0")])
+    for key, (qty, amount) in deltas.items():
+        pk = exact.get(key) or loose[loose_key(key)]
+        targets[pk][0] += qty
+        targets[pk][1] += amount
+    return targets
+
+
+def item_values(item):
+    return {
+        "category_name": item.category_name,
+        "product_name": item.product_name,
+        "status": item.status,
+        "quantity": item.quantity,
+        "unit_price": item.unit_price,
+    }
+
+
+class RollupDeltas:
+    """Acumula cambios por clave para aplicarlos con pocas consultas."""
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, Decimal("0")])
+
+    def add(self, day, values, sign=1):
+        delta = self.deltas[rollup_key(day, values)]
+        delta[0] += sign * values["quantity"]
+        delta[1] += sign * values["quantity"] * Decimal(values["unit_price"])
+
+    def apply(self):
+        deltas = {key: delta for key, delta in self.deltas.items() if delta[0] or delta[1]}
+        if not deltas:
+            return
+        with transaction.atomic():
+            DailySalesRollup.objects.bulk_create(
+                [DailySalesRollup(**dict(zip(ROLLUP_KEY_FIELDS, key))) for key in deltas],
+                ignore_conflicts=True,
+            )
+            rows = DailySalesRollup.objects.filter(
+                day__in={key[0] for key in deltas},
+                product_name__in={key[2] for key in deltas},
+            ).values_list("pk", *ROLLUP_KEY_FIELDS)
+            targets = match_rows(deltas, rows)
+            DailySalesRollup.objects.filter(pk__in=targets).update(
+                quantity=F("quantity") + Case(
+                    *(When(pk=pk, then=Value(qty)) for pk, (qty, _) in targets.items()),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                amount=F("amount") + Case(
+                    *(When(pk=pk, then=Value(amount)) for pk, (_, amount) in targets.items()),
+                    default=Value(Decimal("0")),
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
+                ),
+            )
+
+
+def record_sale_items(sale, items):
+    """Suma al resumen artículos insertados sin señales (bulk_create)."""
+    deltas = RollupDeltas()
+    day = sale.created_at.date()
+    for item in items:
+        deltas.add(day, item_values(item))
+    deltas.apply()
+
+
+def rebuild_rollup(batch_size=1000):
+    rows = (
+        SaleItem.objects.annotate(day=TruncDate("sale__created_at"))
+        .values(*ROLLUP_KEY_FIELDS)
+        .annotate(total_qty=Sum("quantity"), total_amount=Sum(F("quantity") * F("unit_price")))
+        .order_by()
+    )
+    with transaction.atomic():
+        DailySalesRollup.objects.all().delete()
+        batch = []
+        created = 0
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(
+                DailySalesRollup(
+                    day=row["day"],
+                    category_name=row["category_name"] or "",
+                    product_name=row["product_name"],
+                    status=row["status"],
+                    quantity=row["total_qty"] or 0,
+                    amount=row["total_amount"] or 0,
+                )
+            )
+            if len(batch) >= batch_size:
+                DailySalesRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        DailySalesRollup.objects.bulk_create(batch)
+        created += len(batch)
+    return created
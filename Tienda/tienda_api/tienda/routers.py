@@ -0,0 +1,185 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max
+from django.utils import timezone
+
+# Cookie que fija las lecturas al primario tras una escritura del cliente.
+PIN_COOKIE = "db_pin"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_alias():
+    """Alias de la réplica configurada, o None si el proyecto no tiene una."""
+    alias = getattr(settings, "REPLICA_DATABASE", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Dentro del bloque, las lecturas van a la réplica (si está al día)."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaStatus:
+    """Retraso de la réplica medido cada pocos segundos y compartido por el proceso.
+
+    El retraso es la antigüedad de la venta más vieja del primario que la
+    réplica aún no tiene: no requiere permisos de replicación y funciona con
+    cualquier motor.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checked_at = None
+            self.healthy = False
+            self.lag = None
+
+    def measure(self, alias):
+        from .models import Sale
+
+        try:
+            last = Sale.objects.using(alias).aggregate(last=Max("pk"))["last"] or 0
+        except DatabaseError:
+            connections[alias].close()
+            return None
+        missing = (
+            Sale.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if missing is None:
+            return 0.0
+        return max((timezone.now() - missing).total_seconds(), 0.0)
+
+    def is_usable(self, alias):
+        interval = getattr(settings, "REPLICA_CHECK_INTERVAL", 5)
+        now = time.monotonic()
+        with self.lock:
+            if self.checked_at is not None and now - self.checked_at < interval:
+                return self.healthy
+            # Solo un hilo mide; los demás usan el último resultado mientras tanto.
+            self.checked_at = now
+        lag = self.measure(alias)
+        healthy = lag is not None and lag <= getattr(settings, "REPLICA_MAX_LAG", 10)
+        with self.lock:
+            self.lag = lag
+            self.healthy = healthy
+        return healthy
+
+    def snapshot(self):
+        with self.lock:
+            return {"healthy": self.healthy, "lag_seconds": self.lag}
+
+
+replica_status = ReplicaStatus()
+
+
+class ReplicaRouter:
+    """Escrituras siempre al primario; lecturas a la réplica solo dentro de
+    ``replica_reads()`` y mientras su retraso sea tolerable."""
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and _replica_reads.get() and replica_status.is_usable(alias):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica tienen los mismos datos.
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def _view_class(view_func):
+    # DRF guarda la clase en .cls y las vistas genéricas de Django en .view_class.
+    return getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+
+
+class ReplicaRoutingMiddleware:
+    """Envía a la réplica las lecturas de las vistas con ``replica_reads = True``.
+
+    Tras una escritura correcta deja una cookie que durante
+    ``REPLICA_PIN_SECONDS`` manda las lecturas de ese cliente al primario,
+    para que vea sus propios cambios aunque la réplica vaya atrasada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Bajo ASGI no debe obligar a las vistas async a pasar por un hilo.
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request._replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        request._replica_token = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(request)
+        return self.pin(request, response)
+
+    def finish(self, request):
+        if request._replica_token is not None:
+            _replica_reads.reset(request._replica_token)
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", 30),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def route(self, request, view_func):
+        if (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and getattr(_view_class(view_func), "replica_reads", False)
+        ):
+            request._replica_token = _replica_reads.set(True)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.route(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.route(request, view_func)
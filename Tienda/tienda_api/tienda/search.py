@@ -0,0 +1,164 @@
+import re
+
+from django.db import connections, router
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Product, SearchDocument
+
+PRODUCT = "product"
+SOLD_PRODUCT = "sold_product"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# InnoDB ignora sin error los términos más cortos que innodb_ft_min_token_size
+# y las palabras de su lista de stopwords; esos términos se buscan con LIKE.
+MYSQL_MIN_TOKEN_SIZE = 3
+MYSQL_STOPWORDS = frozenset((
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how", "i",
+    "in", "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when",
+    "where", "who", "will", "with", "und", "www",
+))
+
+
+def _terms(query):
+    return _WORD_RE.findall(query or "")[:8]
+
+
+def product_text(product):
+    category = product.category.name if product.category_id else ""
+    return " ".join(filter(None, (product.name, category, product.description)))
+
+
+def index_products(products):
+    documents = [
+        SearchDocument(kind=PRODUCT, key=str(product.pk), text=product_text(product))
+        for product in products
+    ]
+    options = {"update_conflicts": True, "update_fields": ["text"]}
+    # MySQL no acepta columnas de conflicto: ON DUPLICATE KEY UPDATE usa la clave única (kind, key).
+    if connections[router.db_for_write(SearchDocument)].features.supports_update_conflicts_with_target:
+        options["unique_fields"] = ["kind", "key"]
+    SearchDocument.objects.bulk_create(documents, **options)
+
+
+def unindex_products(product_ids):
+    SearchDocument.objects.filter(kind=PRODUCT, key__in=[str(pk) for pk in product_ids]).delete()
+
+
+def index_sold_names(names):
+    names = {name for name in names if name}
+    if names:
+        SearchDocument.objects.bulk_create(
+            [SearchDocument(kind=SOLD_PRODUCT, key=name, text=name) for name in names],
+            ignore_conflicts=True,
+        )
+
+
+def reindex_category(category):
+    index_products(Product.objects.filter(category=category).select_related("category"))
+
+
+def _sqlite_match(terms):
+    return " ".join('"{}"*'.format(term.replace('"', "")) for term in terms)
+
+
+def _mysql_terms(terms):
+    """Separa los términos que entiende el índice FULLTEXT de los que hay que buscar con LIKE."""
+    fulltext, literal = [], []
+    for term in terms:
+        short = len(term) < MYSQL_MIN_TOKEN_SIZE or term.lower() in MYSQL_STOPWORDS
+        (literal if short else fulltext).append(term)
+    return " ".join(f"+{term}*" for term in fulltext), literal
+
+
+def _like(term):
+    return "%{}%".format(term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+
+
+def _sqlite_search(connection, kind, terms, limit):
+    match = _sqlite_match(terms)
+    sql = (
+        "SELECT d.key FROM tienda_searchdocument_fts f "
+        "JOIN tienda_searchdocument d ON d.id = f.rowid "
+        "WHERE tienda_searchdocument_fts MATCH %s AND d.kind = %s "
+        "ORDER BY bm25(tienda_searchdocument_fts) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, kind, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _mysql_search(connection, kind, terms, limit):
+    against, literal = _mysql_terms(terms)
+    if not against:
+        return _fallback_search(connection, kind, terms, limit)
+    likes = "".join(" AND text LIKE %s" for _ in literal)
+    sql = (
+        "SELECT `key` FROM tienda_searchdocument "
+        f"WHERE MATCH(text) AGAINST (%s IN BOOLEAN MODE) AND kind = %s{likes} "
+        "ORDER BY MATCH(text) AGAINST (%s IN BOOLEAN MODE) DESC LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [against, kind, *map(_like, literal), against, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(connection, kind, terms, limit):
+    qs = SearchDocument.objects.using(connection.alias).filter(kind=kind)
+    for term in terms:
+        qs = qs.filter(text__icontains=term)
+    return list(qs.values_list("key", flat=True)[:limit])
+
+
+def matching_documents(kind, query):
+    """Todos los documentos que contienen los términos, sin límite ni orden.
+
+    Es un queryset para usar como subconsulta (``__in``): el reporte filtra
+    con él todas las coincidencias, no solo las primeras.
+    """
+    terms = _terms(query)
+    documents = SearchDocument.objects.filter(kind=kind)
+    if not terms:
+        return documents.none()
+    vendor = connections[router.db_for_read(SearchDocument)].vendor
+    if vendor == "sqlite":
+        return documents.filter(pk__in=RawSQL(
+            "SELECT rowid FROM tienda_searchdocument_fts WHERE tienda_searchdocument_fts MATCH %s",
+            [_sqlite_match(terms)],
+        ))
+    if vendor == "mysql":
+        against, terms = _mysql_terms(terms)
+        if against:
+            # La relevancia es un número, no un booleano: usada sola en el WHERE,
+            # Django la compara con 1 en MySQL y casi nunca coincide.
+            documents = documents.annotate(
+                relevance=RawSQL("MATCH(text) AGAINST (%s IN BOOLEAN MODE)", [against], output_field=FloatField())
+            ).filter(relevance__gt=0)
+    for term in terms:
+        documents = documents.filter(text__icontains=term)
+    return documents
+
+
+def search(kind, query, limit=200):
+    """Claves de los documentos que contienen todos los términos, de mejor a peor."""
+    terms = _terms(query)
+    if not terms:
+        return []
+    # SQL propio: la base la elige el router, igual que para el ORM.
+    connection = connections[router.db_for_read(SearchDocument)]
+    backend = {"sqlite": _sqlite_search, "mysql": _mysql_search}.get(connection.vendor, _fallback_search)
+    return backend(connection, kind, terms, limit)
+
+
+def search_product_ids(query, limit=200):
+    return [int(key) for key in search(PRODUCT, query, limit)]
+
+
+def search_sold_names(query, limit=500):
+    return search(SOLD_PRODUCT, query, limit)
+
+
+def sold_names(query):
+    """Subconsulta con todos los nombres vendidos que coinciden con ``query``."""
+    return matching_documents(SOLD_PRODUCT, query).values("key")
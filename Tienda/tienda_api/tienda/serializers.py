@@ -1,7 +1,12 @@
 from django.db import transaction
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 
+from .images import variant_urls
 from .models import Category, Product, Sale, SaleItem
+from .rollups import record_sale_items
+from .search import index_sold_names
+from .stock import InsufficientStock, item_quantities, reserve_stock
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,6 +17,8 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -22,12 +29,36 @@ class ProductSerializer(serializers.ModelSerializer):
             "price",
             "description",
             "image",
+            "thumbnail",
+            "image_srcset",
             "category",
             "category_name",
             "stock",
             "is_active",
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ``fields`` en el contexto deja solo esos campos (la vista lo toma de ?fields=).
+        wanted = set(self.context.get("fields") or ()) & set(self.fields)
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+    def absolute(self, url):
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_thumbnail(self, obj):
+        """La variante más chica; el original mientras no existan variantes."""
+        urls = variant_urls(obj)
+        if urls:
+            return self.absolute(urls[0][1])
+        return self.absolute(obj.image.url) if obj.image else None
+
+    def get_image_srcset(self, obj):
+        return ", ".join(f"{self.absolute(url)} {width}w" for width, url in variant_urls(obj))
+
 
 class SaleItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField(write_only=True, required=True)
@@ -72,6 +103,25 @@ class SaleSerializer(serializers.ModelSerializer):
         fields = ("id", "customer_name", "terms_accepted", "total_amount", "created_at", "items")
         read_only_fields = ("id", "total_amount", "created_at")
 
+    def _resolve_products(self, items_data):
+        product_ids = {item.get("product_id") for item in items_data}
+        products = (
+            Product.objects.filter(is_active=True)
+            .select_related("category")
+            .in_bulk(product_ids)
+        )
+        missing = sorted(pid for pid in product_ids if pid not in products)
+        if len(missing) == 1:
+            raise serializers.ValidationError(
+                {"items": f"Producto con id {missing[0]} no existe o está inactivo."}
+            )
+        if missing:
+            ids = ", ".join(str(pid) for pid in missing)
+            raise serializers.ValidationError(
+                {"items": f"Productos con id {ids} no existen o están inactivos."}
+            )
+        return products
+
     def create(self, validated_data):
         request = self.context.get("request")
         items_data = validated_data.pop("items", [])
@@ -94,34 +144,35 @@ class SaleSerializer(serializers.ModelSerializer):
             user_for_sale = request.user
 
         with transaction.atomic():
-            sale = Sale.objects.create(user=user_for_sale, **validated_data)
+            products = self._resolve_products(items_data)
+            status_default = SaleItem._meta.get_field("status").default
+            sale_items = []
             total = 0
 
             for item in items_data:
-                product_id = item.get("product_id")
-                try:
-                    product = Product.objects.get(pk=product_id, is_active=True)
-                except Product.DoesNotExist as exc:
-                    raise serializers.ValidationError(
-                        {"items": f"Producto con id {product_id} no existe o está inactivo."}
-                    ) from exc
-
-                quantity = item.get("quantity", 1)
-                unit_price = item.get("unit_price") or product.price
-                status = item.get("status", SaleItem._meta.get_field("status").default)
-
-                sale_item = SaleItem.objects.create(
-                    sale=sale,
+                product = products[item.get("product_id")]
+                sale_item = SaleItem(
+                    product=product,
                     product_name=product.name,
                     category_name=product.category.name if product.category_id else "",
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    status=status,
+                    quantity=item.get("quantity", 1),
+                    unit_price=item.get("unit_price") or product.price,
+                    status=item.get("status", status_default),
                 )
+                sale_items.append(sale_item)
                 total += sale_item.subtotal
 
-            sale.total_amount = total
-            sale.save(update_fields=["total_amount"])
+            try:
+                reserve_stock(item_quantities(sale_items))
+            except InsufficientStock as exc:
+                raise serializers.ValidationError({"items": str(exc)}) from exc
+
+            sale = Sale.objects.create(user=user_for_sale, total_amount=total, **validated_data)
+            for sale_item in sale_items:
+                sale_item.sale = sale
+            SaleItem.objects.bulk_create(sale_items)
+            record_sale_items(sale, sale_items)
+            index_sold_names(item.product_name for item in sale_items)
 
         return sale
 
@@ -131,4 +182,46 @@ class SaleItemStatusSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SaleItem
-        fields = ("status",)
\ No newline at end of file
+        fields = ("status",)
+
+    def update(self, instance, validated_data):
+        try:
+            instance.set_status(validated_data.get("status", instance.status))
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({"status": str(exc)}) from exc
+        return instance
+
+
+class SaleItemBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000
+    )
+    sale = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Sale.STATUS_CHOICES)
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("sale" in attrs):
+            raise serializers.ValidationError("Indica la lista de artículos o la venta, pero no ambas.")
+        return attrs
+
+    def get_items(self, queryset):
+        """Artículos del usuario, bloqueados y con su venta, en una sola consulta."""
+        data = self.validated_data
+        if "sale" in data:
+            items = list(queryset.filter(sale_id=data["sale"]).select_for_update().select_related("sale"))
+            if not items:
+                raise NotFound("La venta no existe.")
+            return items
+        ids = set(data["ids"])
+        items = list(queryset.filter(pk__in=ids).select_for_update().select_related("sale"))
+        missing = sorted(ids - {item.pk for item in items})
+        if missing:
+            raise NotFound(f"Artículos con id {', '.join(str(pk) for pk in missing)} no existen.")
+        return items
+
+    def apply(self, queryset):
+        with transaction.atomic():
+            try:
+                return SaleItem.bulk_set_status(self.get_items(queryset), self.validated_data["status"])
+            except InsufficientStock as exc:
+                raise serializers.ValidationError({"status": str(exc)}) from exc
\ No newline at end of file
@@ -0,0 +1,79 @@
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
+
+# Momento (segundos epoch) de la última renovación guardada de la sesión.
+REFRESHED_KEY = "_refreshed_at"
+
+
+def _now():
+    return time.time()
+
+
+class SessionCleaner:
+    """Borra las sesiones vencidas de la base en un hilo aparte, como mucho una vez por intervalo."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        # La primera limpieza espera un intervalo completo desde el arranque.
+        self.last_run = time.monotonic()
+        self.thread = None
+
+    def maybe_start(self):
+        if not self.interval:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_run < self.interval or (self.thread and self.thread.is_alive()):
+                return False
+            self.last_run = now
+            self.thread = threading.Thread(target=self.run, name="session-cleanup", daemon=True)
+        self.thread.start()
+        return True
+
+    def run(self):
+        try:
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+        finally:
+            connections.close_all()
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    """Vencimiento deslizante sin guardar la sesión en cada petición.
+
+    Una sesión sin cambios solo se vuelve a guardar (y se reenvía la cookie)
+    si su última renovación tiene más de ``SESSION_REFRESH_INTERVAL``
+    segundos. Con el motor ``cached_db`` las lecturas salen de la caché y la
+    base solo se escribe en esas renovaciones o cuando cambian los datos.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.refresh_interval = getattr(settings, "SESSION_REFRESH_INTERVAL", 15)
+        self.cleaner = SessionCleaner(getattr(settings, "SESSION_CLEANUP_INTERVAL", 300))
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        if session is not None:
+            # Consultar la marca no debe añadir "Vary: Cookie" a respuestas que no usan la sesión.
+            accessed = session.accessed
+            now = _now()
+            if session.modified:
+                # Se guarda de todos modos: la marca viaja gratis.
+                due = not session.is_empty()
+            else:
+                due = (
+                    session.session_key is not None
+                    and now - session.get(REFRESHED_KEY, 0) >= self.refresh_interval
+                    and not session.is_empty()
+                )
+            if due:
+                session[REFRESHED_KEY] = int(now)
+            session.accessed = accessed
+        self.cleaner.maybe_start()
+        return super().process_response(request, response)
@@ -0,0 +1,158 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import images
+from .cache import invalidate_catalog
+from .history import touch_sales
+from .models import Category, DeletedSale, Product, Sale, SaleItem, sale_items_status_changed
+from .rollups import RollupDeltas, item_values
+from .search import index_products, index_sold_names, reindex_category, unindex_products
+from .stock import item_quantities, release_stock
+from .totals import apply_total_deltas, recalculate_totals
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog_on_change(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products([instance])
+
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    if (instance.image_variants or {}).get("source") != instance.image.name:
+        transaction.on_commit(lambda: images.schedule(instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    unindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        reindex_category(instance)
+
+
+SNAPSHOT_FIELDS = ("sale_id", "category_name", "product_name", "status", "quantity", "unit_price")
+
+
+def _snapshot(item):
+    return {**item_values(item), "sale_id": item.sale_id}
+
+
+def _subtotal(values):
+    return values["quantity"] * values["unit_price"]
+
+
+@receiver(pre_save, sender=SaleItem)
+def load_stored_values(sender, instance, raw=False, **kwargs):
+    """Lee la fila guardada antes del UPDATE si no vino de la base completa.
+
+    Pasa con artículos armados a mano con un pk existente o leídos con
+    .only()/.defer(): sin esto el resumen sumaría la fila nueva sin restar
+    la anterior.
+    """
+    if raw or instance.pk is None:
+        return
+    previous = getattr(instance, "_loaded_values", None) or {}
+    missing = [name for name in SNAPSHOT_FIELDS if name not in previous]
+    if missing:
+        stored = SaleItem.objects.filter(pk=instance.pk).values(*missing).first()
+        instance._loaded_values = {**previous, **(stored or {})}
+
+
+@receiver(post_save, sender=SaleItem)
+def touch_sale_on_item_save(sender, instance, raw=False, **kwargs):
+    # Va antes de update_aggregates_on_save, que reemplaza _loaded_values:
+    # si el artículo cambió de venta, cambian las dos.
+    if not raw:
+        previous = getattr(instance, "_loaded_values", None) or {}
+        touch_sales([instance.sale_id, previous.get("sale_id")])
+
+
+@receiver(post_save, sender=SaleItem)
+def update_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    """Resumen diario y total de la venta: resta la fila anterior y suma la nueva."""
+    if raw:
+        return
+    deltas = RollupDeltas()
+    totals = {}
+    day = instance.sale.created_at.date()
+    previous = getattr(instance, "_loaded_values", None)
+    if not created and previous:
+        before = {**_snapshot(instance), **previous}
+        deltas.add(day, before, sign=-1)
+        totals[before["sale_id"]] = -_subtotal(before)
+    deltas.add(day, item_values(instance))
+    deltas.apply()
+    if created or previous:
+        totals[instance.sale_id] = totals.get(instance.sale_id, 0) + instance.subtotal
+        apply_total_deltas(totals)
+    else:
+        recalculate_totals(Sale.objects.filter(pk=instance.sale_id))
+    instance._loaded_values = _snapshot(instance)
+    index_sold_names([instance.product_name])
+
+
+def _deleting_sale(origin):
+    return isinstance(origin, Sale) or getattr(origin, "model", None) is Sale
+
+
+@receiver(post_delete, sender=SaleItem)
+def update_aggregates_on_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_sale(origin):
+        return
+    deltas = RollupDeltas()
+    before = {**_snapshot(instance), **(getattr(instance, "_loaded_values", None) or {})}
+    deltas.add(instance.sale.created_at.date(), before, sign=-1)
+    deltas.apply()
+    apply_total_deltas({before["sale_id"]: -_subtotal(before)})
+
+
+@receiver(pre_delete, sender=Sale)
+def release_items_on_sale_delete(sender, instance, **kwargs):
+    # Stock y resumen en una pasada por venta: los artículos borrados en
+    # cascada no hacen nada en sus propias señales (ni leen su venta uno a uno).
+    items = list(instance.items.all())
+    release_stock(item_quantities(items))
+    deltas = RollupDeltas()
+    day = instance.created_at.date()
+    for item in items:
+        deltas.add(day, item_values(item), sign=-1)
+    deltas.apply()
+
+
+@receiver(post_delete, sender=SaleItem)
+def release_stock_on_item_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_sale(origin):
+        return
+    release_stock(item_quantities([instance]))
+    touch_sales([instance.sale_id])
+
+
+@receiver(post_delete, sender=Sale)
+def record_deleted_sale(sender, instance, **kwargs):
+    if instance.user_id:
+        DeletedSale.objects.create(user_id=instance.user_id, sale_id=instance.pk)
+
+
+@receiver(sale_items_status_changed, sender=SaleItem)
+def update_rollup_on_bulk_status(sender, items, previous, **kwargs):
+    deltas = RollupDeltas()
+    for item in items:
+        day = item.sale.created_at.date()
+        deltas.add(day, {**item_values(item), "status": previous[item.pk]}, sign=-1)
+        deltas.add(day, item_values(item))
+        item._loaded_values = _snapshot(item)
+    deltas.apply()
+    touch_sales({item.sale_id for item in items})
\ No newline at end of file
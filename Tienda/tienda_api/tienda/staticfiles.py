@@ -0,0 +1,65 @@
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".map", ".json", ".svg", ".html", ".txt", ".xml", ".ico"}
+MIN_COMPRESS_SIZE = 256
+# Si la versión comprimida no ahorra al menos esto, no vale la cabecera Vary.
+MAX_COMPRESSED_RATIO = 0.95
+
+
+def compressors():
+    available = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        available.append((".br", lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+def compress_file(path):
+    """Escribe los hermanos ``.gz`` (y ``.br`` si está instalado brotli) de ``path``.
+
+    Devuelve las rutas escritas; se omite la versión que no ahorra lo suficiente.
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, "rb") as handle:
+        data = handle.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    written = []
+    for suffix, compress in compressors():
+        compressed = compress(data)
+        if len(compressed) > len(data) * MAX_COMPRESSED_RATIO:
+            continue
+        with open(path + suffix, "wb") as handle:
+            handle.write(compressed)
+        written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Nombres con el hash del contenido (manifiesto) y hermanos precomprimidos.
+
+    ``collectstatic`` deja junto a cada archivo de texto su ``.gz`` y, con el
+    paquete ``brotli``, su ``.br``; ``tienda.fileserver`` elige el que acepte
+    el navegador.
+    """
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get("dry_run"):
+            return
+        if brotli is None:
+            logger.info("Sin el paquete brotli: solo se generan los .gz.")
+        for name in sorted(set(self.hashed_files) | set(self.hashed_files.values())):
+            for path in compress_file(self.path(name)):
+                yield name, os.path.relpath(path, self.location), True
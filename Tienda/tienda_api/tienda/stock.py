@@ -0,0 +1,110 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+
+from .cache import invalidate_catalog
+from .models import Product
+
+RETURN_STATUS = "return_requested"
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        self.shortages = shortages
+        ids = ", ".join(str(pid) for pid in sorted(shortages))
+        super().__init__(f"Stock insuficiente para los productos con id {ids}.")
+
+
+def item_quantities(items):
+    quantities = Counter()
+    for item in items:
+        if item.product_id and item.status != RETURN_STATUS:
+            quantities[item.product_id] += item.quantity
+    return quantities
+
+
+def _delta(quantities):
+    return Case(
+        *(When(pk=pid, then=Value(qty)) for pid, qty in quantities.items()),
+        default=Value(0),
+        output_field=PositiveIntegerField(),
+    )
+
+
+def _shortages(quantities, available):
+    return {
+        pid: available.get(pid, 0)
+        for pid, qty in quantities.items()
+        if available.get(pid, 0) < qty
+    }
+
+
+def reserve_stock(quantities):
+    """Descuenta existencias de todos los productos o de ninguno."""
+    quantities = {pid: qty for pid, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return
+
+    with transaction.atomic():
+        # Bloqueamos siempre en orden de pk para que dos compras que comparten
+        # productos no puedan esperarse mutuamente.
+        locked = (
+            Product.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .order_by("pk")
+            .values_list("pk", "stock")
+        )
+        shortages = _shortages(quantities, dict(locked))
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        enough = Q()
+        for pid, qty in quantities.items():
+            enough |= Q(pk=pid, stock__gte=qty)
+        updated = Product.objects.filter(enough).update(
+            stock=F("stock") - _delta(quantities),
+            updated_at=timezone.now(),
+        )
+
+        if updated != len(quantities):
+            # Solo ocurre en motores sin bloqueo por fila (SQLite); el atomic
+            # deshace el descuento parcial.
+            available = dict(Product.objects.filter(pk__in=quantities).values_list("pk", "stock"))
+            raise InsufficientStock(_shortages(quantities, available) or quantities)
+
+        invalidate_catalog()
+
+
+def release_stock(quantities):
+    quantities = {pid: qty for pid, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return
+    Product.objects.filter(pk__in=quantities).update(
+        stock=F("stock") + _delta(quantities),
+        updated_at=timezone.now(),
+    )
+    invalidate_catalog()
+
+
+def apply_status_transitions(items, previous):
+    """Devuelve o vuelve a apartar stock de los artículos que entran o salen de devolución.
+
+    ``previous`` mapea el pk de cada artículo a su estado anterior.
+    """
+    released, reserved = Counter(), Counter()
+    for item in items:
+        before = previous[item.pk]
+        if not item.product_id or before == item.status:
+            continue
+        if item.status == RETURN_STATUS:
+            released[item.product_id] += item.quantity
+        elif before == RETURN_STATUS:
+            reserved[item.product_id] += item.quantity
+    reserve_stock(reserved)
+    release_stock(released)
+
+
+def apply_status_transition(item, previous_status):
+    apply_status_transitions([item], {item.pk: previous_status})
@@ -1,3 +1,1729 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import CacheHandler, cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, router
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse, StreamingHttpResponse
+from PIL import Image
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APITestCase
+
+from . import images
+from .cache import invalidate_catalog
+from .db.pool import ConnectionPool, PoolTimeout, get_pool
+from .fileserver import IMMUTABLE, FileServer, StaticFilesASGIMiddleware, StaticFilesMiddleware
+from .idempotency import idempotency_store
+from .ingest import _insert_items
+from .metrics import RequestMetricsMiddleware, request_stats
+from .models import (
+    Category, DailySalesRollup, DeletedSale, IdempotencyRecord, Product, Sale, SaleItem, SearchDocument,
+)
+from .rollups import match_rows, rebuild_rollup
+from .routers import PIN_COOKIE, ReplicaRouter, replica_reads, replica_status
+from .search import SOLD_PRODUCT, _mysql_terms, index_products, matching_documents, search_sold_names
+from .sessions import REFRESHED_KEY, SessionCleaner
+from .stock import reserve_stock
+from .views import ProductViewSet, SaleViewSet
+
+
+class CatalogFixturesMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @classmethod
+    def create_catalog(cls, products=40, stock=100):
+        category = Category.objects.create(name="Electrónica", slug="electronica")
+        return category, [
+            Product.objects.create(
+                name=f"Producto {n}",
+                slug=f"producto-{n}",
+                price=Decimal("10.00") + n,
+                category=category,
+                stock=stock,
+            )
+            for n in range(products)
+        ]
+
+
+class SaleCheckoutTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category, cls.products = cls.create_catalog()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = reverse("tienda:sale-list")
+
+    def payload(self, products, quantity=2):
+        return {
+            "customer_name": "Cliente",
+            "terms_accepted": True,
+            "items": [
+                {"product_id": p.pk, "quantity": quantity, "unit_price": str(p.price)}
+                for p in products
+            ],
+        }
+
+    def test_checkout_creates_items_and_total_in_memory(self):
+        products = self.products[:3]
+        res = self.client.post(self.url, self.payload(products), format="json")
+
+        self.assertEqual(res.status_code, 201, res.data)
+        sale = Sale.objects.get(pk=res.data["id"])
+        self.assertEqual(sale.items.count(), 3)
+        self.assertEqual(sale.total_amount, sum(p.price * 2 for p in products))
+        self.assertEqual(
+            set(sale.items.values_list("category_name", flat=True)), {self.category.name}
+        )
+
+    def test_checkout_reports_every_missing_or_inactive_product(self):
+        inactive = self.products[0]
+        inactive.is_active = False
+        inactive.save(update_fields=["is_active"])
+        payload = self.payload(self.products[:2])
+        payload["items"].append({"product_id": 999999, "quantity": 1, "unit_price": "1.00"})
+
+        res = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(res.status_code, 400)
+        message = str(res.data["items"])
+        self.assertIn(str(inactive.pk), message)
+        self.assertIn("999999", message)
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(SaleItem.objects.exists())
+
+    def test_checkout_query_count_is_constant_for_cart_size(self):
+        counts = {}
+        for size in (1, 10, 40):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(self.url, self.payload(self.products[:size]), format="json")
+            self.assertEqual(res.status_code, 201, res.data)
+            counts[size] = len(ctx.captured_queries)
+
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+
+
+@override_settings(SALES_SINCE_OVERLAP=0)
+class SaleHistoryTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        other = get_user_model().objects.create_user("otro", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=2)
+        cls.sales = [cls.create_sale(cls.user) for _ in range(25)]
+        cls.foreign = cls.create_sale(other)
+
+    @classmethod
+    def create_sale(cls, user):
+        sale = Sale.objects.create(user=user, customer_name="Cliente", terms_accepted=True)
+        for product in cls.products:
+            SaleItem.objects.create(
+                sale=sale, product=product, product_name=product.name, quantity=1, unit_price=product.price
+            )
+        return sale
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("tienda:sale-list")
+
+    def test_history_without_params_is_the_full_list(self):
+        res = self.client.get(self.url)
+        self.assertEqual([sale["id"] for sale in res.data], [sale.pk for sale in reversed(self.sales)])
+
+    def test_history_is_paginated_newest_first(self):
+        res = self.client.get(self.url, {"page_size": 20})
+        self.assertEqual(len(res.data["results"]), 20)
+        self.assertTrue(res.data["since"])
+        rest = self.client.get(res.data["next"])
+        seen = [sale["id"] for sale in res.data["results"] + rest.data["results"]]
+        self.assertEqual(seen, [sale.pk for sale in reversed(self.sales)])
+
+    def test_since_returns_only_changed_sales(self):
+        since = self.client.get(self.url, {"page_size": 1}).data["since"]
+        item = self.sales[3].items.first()
+        res = self.client.patch(reverse("tienda:sale-item-detail", args=[item.pk]), {"status": "received"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        new_sale = self.create_sale(self.user)
+        self.foreign.items.first().set_status("received")
+
+        # Ventas nuevas o cambiadas + ventas borradas + la página con sus artículos.
+        with self.assertNumQueries(4):
+            res = self.client.get(self.url, {"since": since})
+        self.assertFalse(res.data["reset"])
+        self.assertEqual([sale["id"] for sale in res.data["results"]], [new_sale.pk, self.sales[3].pk])
+        changed = next(row for row in res.data["results"][1]["items"] if row["id"] == item.pk)
+        self.assertEqual(changed["status"], "received")
+
+        res = self.client.get(self.url, {"since": res.data["since"]})
+        self.assertEqual(res.data["results"], [])
+
+    def test_since_reports_deleted_sales(self):
+        since = self.client.get(self.url, {"page_size": 1}).data["since"]
+        gone = self.sales[5].pk
+        self.assertEqual(self.client.delete(reverse("tienda:sale-detail", args=[gone])).status_code, 204)
+        self.foreign.delete()
+        SaleItem.objects.filter(sale=self.sales[2]).first().delete()
+
+        res = self.client.get(self.url, {"since": since})
+        self.assertEqual(res.data["deleted"], [gone])
+        self.assertEqual([sale["id"] for sale in res.data["results"]], [self.sales[2].pk])
+
+    def test_delta_reads_one_index_range_per_part(self):
+        since = timezone.now()
+        changed = Sale.objects.filter(user=self.user, updated_at__gt=since).values_list("pk").explain()
+        self.assertIn("tienda_sale_user_updated_idx", changed)
+        deleted = DeletedSale.objects.filter(user=self.user, deleted_at__gt=since).values_list("sale_id").explain()
+        self.assertIn("tienda_deleted_sale_user_idx", deleted)
+
+    def test_too_many_changes_or_bad_cursor(self):
+        since = self.client.get(self.url, {"page_size": 1}).data["since"]
+        self.create_sale(self.user)
+        self.create_sale(self.user)
+        with mock.patch.object(SaleViewSet, "delta_limit", 1):
+            res = self.client.get(self.url, {"since": since})
+        self.assertEqual((res.data["reset"], res.data["results"]), (True, []))
+        self.assertEqual(self.client.get(self.url, {"since": "no-es-un-cursor"}).status_code, 400)
+
+
+class StockReservationTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=2, stock=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def buy(self, quantities):
+        return self.client.post(
+            reverse("tienda:sale-list"),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": True,
+                "items": [
+                    {"product_id": p.pk, "quantity": qty, "unit_price": str(p.price)}
+                    for p, qty in quantities
+                ],
+            },
+            format="json",
+        )
+
+    def stock(self, product):
+        product.refresh_from_db(fields=["stock"])
+        return product.stock
+
+    def test_checkout_decrements_stock(self):
+        first, second = self.products
+        res = self.buy([(first, 2), (second, 5)])
+
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(self.stock(first), 3)
+        self.assertEqual(self.stock(second), 0)
+
+    def test_insufficient_stock_rejects_whole_sale(self):
+        first, second = self.products
+        res = self.buy([(first, 1), (second, 6)])
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn(str(second.pk), str(res.data["items"]))
+        self.assertEqual(self.stock(first), 5)
+        self.assertEqual(self.stock(second), 5)
+        self.assertFalse(Sale.objects.exists())
+
+    def test_return_request_releases_stock_once(self):
+        first, _ = self.products
+        res = self.buy([(first, 3)])
+        item_id = res.data["items"][0]["id"]
+        url = reverse("tienda:sale-item-detail", args=[item_id])
+
+        self.client.patch(url, {"status": "return_requested"}, format="json")
+        self.client.patch(url, {"status": "return_requested"}, format="json")
+        self.assertEqual(self.stock(first), 5)
+
+        self.client.patch(url, {"status": "received"}, format="json")
+        self.assertEqual(self.stock(first), 2)
+
+    def test_admin_status_changes_move_stock(self):
+        first, _ = self.products
+        item = SaleItem.objects.get(pk=self.buy([(first, 3)]).data["items"][0]["id"])
+        admin_user = get_user_model().objects.create_superuser("admin", "admin@example.com", "secreto123")
+        self.client.force_login(admin_user)
+        fields = {
+            "sale": item.sale_id,
+            "product": first.pk,
+            "product_name": item.product_name,
+            "quantity": "3",
+            "unit_price": str(item.unit_price),
+        }
+
+        res = self.client.post(
+            reverse("admin:tienda_saleitem_change", args=[item.pk]), {**fields, "status": "return_requested"}
+        )
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(self.stock(first), 5)
+
+        res = self.client.post(
+            reverse("admin:tienda_sale_change", args=[item.sale_id]),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": "on",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "1",
+                "items-0-id": item.pk,
+                **{f"items-0-{name}": value for name, value in fields.items()},
+                "items-0-status": "received",
+            },
+        )
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(self.stock(first), 2)
+
+    # El formulario con errores se vuelve a mostrar; sin collectstatic no hay manifiesto.
+    @override_settings(STORAGES={
+        **settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_admin_added_items_reserve_and_deleted_items_release(self):
+        first, second = self.products
+        item = SaleItem.objects.get(pk=self.buy([(first, 1)]).data["items"][0]["id"])
+        admin_user = get_user_model().objects.create_superuser("admin", "admin@example.com", "secreto123")
+        self.client.force_login(admin_user)
+        url = reverse("admin:tienda_sale_change", args=[item.sale_id])
+        data = {
+            "customer_name": "Cliente",
+            "terms_accepted": "on",
+            "items-TOTAL_FORMS": "2",
+            "items-INITIAL_FORMS": "1",
+            "items-0-id": item.pk,
+            "items-0-sale": item.sale_id,
+            "items-0-product": first.pk,
+            "items-0-product_name": item.product_name,
+            "items-0-quantity": "2",
+            "items-0-unit_price": str(item.unit_price),
+            "items-0-status": "pending",
+            "items-1-sale": item.sale_id,
+            "items-1-product": second.pk,
+            "items-1-product_name": second.name,
+            "items-1-quantity": "6",
+            "items-1-unit_price": str(second.price),
+            "items-1-status": "pending",
+        }
+
+        res = self.client.post(url, data)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("Stock insuficiente", res.content.decode())
+        self.assertEqual((self.stock(first), self.stock(second)), (4, 5))
+
+        res = self.client.post(url, {**data, "items-1-quantity": "3"})
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual((self.stock(first), self.stock(second)), (3, 2))
+
+        added = SaleItem.objects.get(sale=item.sale_id, product=second)
+        res = self.client.post(url, {
+            **data, "items-INITIAL_FORMS": "2", "items-1-id": added.pk, "items-1-quantity": "3", "items-1-DELETE": "on",
+        })
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual((self.stock(first), self.stock(second)), (3, 5))
+
+    def test_deleting_a_sale_releases_its_stock(self):
+        first, second = self.products
+        sale_id = self.buy([(first, 2), (second, 3)]).data["id"]
+        SaleItem.objects.filter(sale=sale_id, product=second).get().request_return()
+        self.assertEqual((self.stock(first), self.stock(second)), (3, 5))
+
+        res = self.client.delete(reverse("tienda:sale-detail", args=[sale_id]))
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual((self.stock(first), self.stock(second)), (5, 5))
+
+
+class ConcurrentCheckoutStressTests(CatalogFixturesMixin, TransactionTestCase):
+    workers = 16
+    purchases_per_worker = 10
+    initial_stock = 40
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        _, self.products = self.create_catalog(products=3, stock=self.initial_stock)
+
+    def worker(self, index, results):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Cada hilo recorre los productos en distinto orden para provocar
+        # bloqueos cruzados si el orden no fuera fijo.
+        ordered = self.products[index % 3:] + self.products[:index % 3]
+        try:
+            for _ in range(self.purchases_per_worker):
+                payload = {
+                    "customer_name": "Cliente",
+                    "terms_accepted": True,
+                    "items": [
+                        {"product_id": p.pk, "quantity": 1, "unit_price": str(p.price)}
+                        for p in ordered
+                    ],
+                }
+                try:
+                    res = client.post(reverse("tienda:sale-list"), payload, format="json")
+                    results.append(res.status_code)
+                except DatabaseError:
+                    results.append("db_error")
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_never_oversell(self):
+        results = []
+        threads = [
+            threading.Thread(target=self.worker, args=(n, results)) for n in range(self.workers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(results), self.workers * self.purchases_per_worker)
+        # Un error de bloqueo del motor puede llegar después del commit, así que
+        # contamos las ventas en la base y no solo las respuestas 201.
+        sales = Sale.objects.count()
+        oversold = {}
+        for product in self.products:
+            product.refresh_from_db(fields=["stock"])
+            sold = SaleItem.objects.filter(product=product).count()
+            oversold[product.pk] = max(sold - self.initial_stock, 0)
+            self.assertEqual(product.stock, self.initial_stock - sold)
+        report = (
+            f"{len(results)} peticiones en {elapsed:.2f} s ({len(results) / elapsed:.1f}/s), "
+            f"{sales} ventas ({sales / elapsed:.1f} ventas/s), sobreventa {sum(oversold.values())}"
+        )
+        sys.stderr.write(f"\n{self.id()}: {report}\n")
+        self.assertEqual(sum(oversold.values()), 0, report)
+        self.assertLessEqual(sales, self.initial_stock, report)
+        self.assertGreater(sales, 0, f"{report}; resultados: {results}")
+
+
+class IdempotentCheckoutTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=2, stock=5)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("tienda:sale-list")
+
+    def buy(self, key, quantity=1):
+        product = self.products[0]
+        return self.client.post(
+            self.url,
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": True,
+                "items": [{"product_id": product.pk, "quantity": quantity, "unit_price": str(product.price)}],
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def assertNoSaleOrProductQueries(self, queries):
+        touched = [q["sql"] for q in queries if "tienda_sale" in q["sql"] or "tienda_product" in q["sql"]]
+        self.assertEqual(touched, [])
+
+    def test_retry_replays_stored_response(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.buy("compra-1")
+        self.assertEqual(first.status_code, 201, first.data)
+
+        with self.assertNumQueries(0):
+            again = self.buy("compra-1")
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(json.loads(again.content), json.loads(first.content))
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(Sale.objects.count(), 1)
+        self.products[0].refresh_from_db(fields=["stock"])
+        self.assertEqual(self.products[0].stock, 4)
+
+    def test_database_tier_replays_without_cache(self):
+        first = self.buy("compra-1")
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            again = self.buy("compra-1")
+        self.assertEqual(again.data["id"], first.data["id"])
+        self.assertNoSaleOrProductQueries(queries.captured_queries)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_same_key_with_other_body_is_rejected(self):
+        self.buy("compra-1")
+        res = self.buy("compra-1", quantity=2)
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        self.assertEqual(self.buy("compra-1", quantity=6).status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.assertEqual(self.buy("compra-1", quantity=6).status_code, 400)
+
+        res = self.client.post(self.url, {}, format="json", HTTP_IDEMPOTENCY_KEY="x" * 256)
+        self.assertEqual(res.status_code, 400)
+
+    def test_lost_claim_rolls_back_the_sale(self):
+        record = idempotency_store.claim("clave", "huella")
+
+        def handler():
+            Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+            # Otra petición toma la reserva por vencida mientras esta sigue corriendo.
+            IdempotencyRecord.objects.filter(pk=record.pk).update(locked_at=record.locked_at + timedelta(seconds=1))
+            return Response({"id": 1}, status=201)
+
+        res = idempotency_store.execute(record, handler)
+        self.assertEqual(res.status_code, 409)
+        self.assertFalse(Sale.objects.exists())
+
+    def test_expired_keys_are_cleared(self):
+        self.buy("compra-1")
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("clear_idempotency_keys", stdout=io.StringIO())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+
+class ConcurrentIdempotentCheckoutTests(CatalogFixturesMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        _, self.products = self.create_catalog(products=1, stock=10)
+
+    def worker(self, results):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        product = self.products[0]
+        try:
+            res = client.post(
+                reverse("tienda:sale-list"),
+                {
+                    "customer_name": "Cliente",
+                    "terms_accepted": True,
+                    "items": [{"product_id": product.pk, "quantity": 1, "unit_price": str(product.price)}],
+                },
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="compra-concurrente",
+            )
+            results.append((res.status_code, res.data["id"]))
+        finally:
+            connection.close()
+
+    def test_concurrent_duplicates_run_once(self):
+        results = []
+        threads = [threading.Thread(target=self.worker, args=(results,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual({code for code, _ in results}, {201})
+        self.assertEqual(len({sale_id for _, sale_id in results}), 1)
+        self.assertEqual(Sale.objects.count(), 1)
+        self.products[0].refresh_from_db(fields=["stock"])
+        self.assertEqual(self.products[0].stock, 9)
+
+
+class ProductCatalogPaginationTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = cls.create_catalog(products=60)
+        # Empates de created_at: el cursor debe desempatar por id.
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[10:30]]).update(
+            created_at=cls.products[10].created_at
+        )
+
+    def walk(self, url):
+        seen = []
+        while url:
+            # Página + validador del ETag.
+            with self.assertNumQueries(2):
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertLessEqual(len(res.data["results"]), 25)
+            seen.extend(row["id"] for row in res.data["results"])
+            url = res.data["next"]
+        return seen
+
+    def test_cursor_walks_catalog_once_in_order(self):
+        seen = self.walk(reverse("tienda:product-list") + "?page_size=25")
+
+        expected = list(
+            Product.objects.filter(is_active=True)
+            .order_by("-created_at", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_page_includes_category_name_without_extra_queries(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse("tienda:product-list"))
+        self.assertEqual(len(res.data["results"]), 24)
+        self.assertEqual(res.data["results"][0]["category_name"], self.category.name)
+
+
+class CatalogFilterTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = cls.create_catalog(products=30)
+        cls.other = Category.objects.create(name="Hogar", slug="hogar")
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[:10]]).update(category=cls.other)
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[::3]]).update(stock=0)
+        # Empates de precio: el cursor por precio debe desempatar por id.
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[20:26]]).update(price=Decimal("50.00"))
+
+    def ids(self, **params):
+        ids, url = [], reverse("tienda:product-list")
+        while url:
+            res = self.client.get(url, {**params, "page_size": 4} if not ids else None)
+            self.assertEqual(res.status_code, 200)
+            ids.extend(row["id"] for row in res.data["results"])
+            url = res.data["next"]
+        return ids
+
+    def test_filters_by_category_price_and_stock(self):
+        expected = Product.objects.filter(
+            category=self.other, price__gte=12, price__lte=18, stock__gt=0
+        ).order_by("-created_at", "id")
+        self.assertEqual(
+            self.ids(category=self.other.pk, min_price="12", max_price="18", in_stock="1"),
+            list(expected.values_list("id", flat=True)),
+        )
+        self.assertEqual(len(self.ids(category_name="hog")), 10)
+
+    def test_ordering_walks_the_cursor_with_ties(self):
+        for ordering in ("price", "-price", "name"):
+            with self.subTest(ordering=ordering):
+                expected = Product.objects.order_by(ordering, "id").values_list("id", flat=True)
+                self.assertEqual(self.ids(ordering=ordering), list(expected))
+
+    def test_cursor_inside_a_tie_survives_deleting_a_seen_row(self):
+        expected = list(Product.objects.order_by("price", "id").values_list("id", flat=True))
+        tied = list(Product.objects.filter(price=Decimal("50.00")).order_by("id").values_list("id", flat=True))
+        # La primera página termina con los dos primeros empatados.
+        page_size = expected.index(tied[0]) + 2
+        url = reverse("tienda:product-list")
+        first = self.client.get(url, {"ordering": "price", "page_size": page_size})
+        self.assertEqual([row["id"] for row in first.data["results"]][-2:], tied[:2])
+
+        Product.objects.filter(pk=tied[0]).delete()
+        res = self.client.get(first.data["next"])
+        self.assertEqual(res.data["results"][0]["id"], tied[2])
+        self.assertEqual(self.client.get(url, {"cursor": "cD1ub2VzanNvbg=="}).status_code, 404)
+
+    def test_facets_come_from_one_grouped_query_and_ignore_the_category_filter(self):
+        url = reverse("tienda:product-list")
+        # Validador del ETag + página + facetas.
+        with self.assertNumQueries(3):
+            res = self.client.get(url, {"category": self.other.pk, "in_stock": "1", "facets": "1"})
+        self.assertEqual(len(res.data["results"]), 6)
+        self.assertEqual(
+            res.data["facets"]["categories"],
+            [
+                {"id": self.category.pk, "name": "Electrónica", "count": 14},
+                {"id": self.other.pk, "name": "Hogar", "count": 6},
+            ],
+        )
+        self.assertNotIn("facets", self.client.get(url).data)
+
+    def test_facet_validator_covers_other_categories(self):
+        url = reverse("tienda:product-list")
+        params = {"category": self.other.pk, "facets": "1"}
+        etag = self.client.get(url, params)["ETag"]
+
+        Product.objects.create(name="Otro", slug="otro", price=5, category=self.category, stock=1)
+        res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["facets"]["categories"][0]["count"], 21)
+
+    def test_search_runs_once_per_request(self):
+        url = reverse("tienda:product-list")
+        ids = [p.pk for p in self.products[10:14]]
+        with mock.patch("tienda.views.search_product_ids", return_value=ids) as search:
+            res = self.client.get(url, {"q": "producto", "facets": "1"})
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual([row["id"] for row in res.data["results"]], ids)
+
+    def test_fields_limit_the_payload(self):
+        res = self.client.get(reverse("tienda:product-list"), {"fields": "id,name,price,nope"})
+        self.assertEqual(set(res.data["results"][0]), {"id", "name", "price"})
+        res = self.client.get(reverse("tienda:product-detail", args=[self.products[15].pk]), {"fields": "description"})
+        self.assertEqual(res.data, {"description": ""})
+
+    def test_invalid_filters_are_rejected(self):
+        url = reverse("tienda:product-list")
+        self.assertEqual(self.client.get(url, {"min_price": "barato"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"category": "uno"}).status_code, 400)
+
+
+class ConditionalCatalogTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = cls.create_catalog(products=60)
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        url = reverse("tienda:product-list")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+
+        with mock.patch.object(ProductViewSet, "get_serializer", side_effect=AssertionError):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], first["ETag"])
+
+    def test_edit_and_delete_change_the_validator(self):
+        url = reverse("tienda:category-list")
+        etag = self.client.get(url)["ETag"]
+
+        Category.objects.create(name="Hogar", slug="hogar")
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+        Category.objects.filter(slug="hogar").delete()
+        self.assertNotEqual(self.client.get(url)["ETag"], res["ETag"])
+
+    def test_last_modified_uses_local_time_and_if_modified_since_is_not_trusted(self):
+        url = reverse("tienda:category-list")
+        Category.objects.update(updated_at=datetime(2025, 1, 1, 12, 0, 0, 100000))
+        first = self.client.get(url)
+        # America/Mexico_City es UTC-6 en enero.
+        self.assertEqual(first["Last-Modified"], "Wed, 01 Jan 2025 18:00:00 GMT")
+
+        # Otro cambio en el mismo segundo: If-Modified-Since no lo distingue, el ETag sí.
+        Category.objects.update(updated_at=datetime(2025, 1, 1, 12, 0, 0, 900000))
+        invalidate_catalog()
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_category_rename_changes_the_product_validator(self):
+        url = reverse("tienda:product-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.category.name = "Electrónica y audio"
+        self.category.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["results"][0]["category_name"], "Electrónica y audio")
+
+    def test_retrieve_uses_the_object_validator(self):
+        product = self.products[0]
+        url = reverse("tienda:product-detail", args=[product.pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        product.price += 1
+        product.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_conditional_request_saves_serialization_time(self):
+        url = reverse("tienda:product-list") + "?page_size=100"
+        etag = self.client.get(url)["ETag"]
+        rounds = 20
+
+        def timed(**headers):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                self.client.get(url, **headers)
+            return (time.perf_counter() - started) / rounds
+
+        full = timed()
+        not_modified = timed(HTTP_IF_NONE_MATCH=etag)
+        self.assertLess(not_modified, full, f"200: {full * 1000:.2f} ms, 304: {not_modified * 1000:.2f} ms")
+
+
+class CatalogCacheTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = cls.create_catalog(products=30)
+        cls.admin = get_user_model().objects.create_user("admin", password="secreto123", is_staff=True)
+
+    def test_second_request_skips_db_and_serializer(self):
+        url = reverse("tienda:product-list")
+        first = self.client.get(url)
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0), mock.patch.object(
+            ProductViewSet, "get_serializer", side_effect=AssertionError
+        ):
+            second = self.client.get(url)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_one_edit_invalidates_every_catalog_page(self):
+        product_url = reverse("tienda:product-detail", args=[self.products[0].pk])
+        category_url = reverse("tienda:category-list")
+        self.client.get(product_url)
+        self.client.get(category_url)
+
+        self.category.name = "Cómputo"
+        self.category.save()
+
+        self.assertEqual(self.client.get(category_url)["X-Cache"], "MISS")
+        res = self.client.get(product_url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["category_name"], "Cómputo")
+
+    def test_stock_changes_invalidate_the_catalog(self):
+        product = self.products[0]
+        url = reverse("tienda:product-detail", args=[product.pk])
+        self.client.get(url)
+
+        reserve_stock({product.pk: 3})
+
+        res = self.client.get(url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["stock"], product.stock - 3)
+
+    def test_stats_endpoint_reports_hits_and_misses(self):
+        url = reverse("tienda:category-list")
+        for _ in range(3):
+            self.client.get(url)
+
+        stats_url = reverse("tienda:catalog-cache")
+        self.assertEqual(self.client.get(stats_url).status_code, 403)
+        self.client.force_authenticate(self.admin)
+        stats = self.client.get(stats_url).data
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.mkdtemp(prefix="tienda-cache-"),
+        },
+    }
+)
+class FileBasedCatalogCacheTests(CatalogCacheTests):
+    pass
+
+
+class DailySalesRollupTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=3)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, quantity=2):
+        res = self.client.post(
+            reverse("tienda:sale-list"),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": True,
+                "items": [
+                    {"product_id": p.pk, "quantity": quantity, "unit_price": str(p.price)}
+                    for p in self.products
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        return Sale.objects.get(pk=res.data["id"])
+
+    def snapshot(self):
+        return sorted(
+            DailySalesRollup.objects.exclude(quantity=0).values_list(
+                "day", "category_name", "product_name", "status", "quantity", "amount"
+            )
+        )
+
+    def test_checkout_and_status_changes_keep_rollup_in_sync(self):
+        sale = self.checkout()
+        self.checkout(quantity=1)
+        item = sale.items.first()
+        item.mark_received()
+        SaleItem.objects.get(pk=sale.items.last().pk).request_return()
+
+        pending = DailySalesRollup.objects.get(
+            product_name=self.products[1].name, status="pending"
+        )
+        self.assertEqual(pending.quantity, 3)
+        self.assertEqual(pending.amount, self.products[1].price * 3)
+
+        incremental = self.snapshot()
+        rebuild_rollup()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_admin_edit_and_delete_adjust_rollup(self):
+        sale = self.checkout()
+        item = SaleItem.objects.get(sale=sale, product_name=self.products[0].name)
+        item.quantity = 5
+        item.save()
+        self.assertEqual(
+            DailySalesRollup.objects.get(product_name=item.product_name).quantity, 5
+        )
+
+        sale.delete()
+        self.assertEqual(self.snapshot(), [])
+
+    def test_saving_without_loaded_values_subtracts_the_stored_row(self):
+        sale = self.checkout()
+        first, second = sale.items.order_by("pk")[:2]
+        item = SaleItem.objects.only("status").get(pk=first.pk)
+        item.quantity = 5
+        item.save()
+        SaleItem(
+            pk=second.pk, sale=sale, product=second.product, product_name=second.product_name,
+            category_name=second.category_name, quantity=4, unit_price=second.unit_price,
+        ).save()
+
+        incremental = self.snapshot()
+        rebuild_rollup()
+        self.assertEqual(incremental, self.snapshot())
+        sale.refresh_from_db()
+        self.assertEqual(
+            sale.total_amount, sum(i.quantity * i.unit_price for i in sale.items.all())
+        )
+
+    def test_deleting_a_sale_does_not_query_per_item(self):
+        counts = []
+        for extra in (0, 1):
+            sale = self.checkout()
+            if not extra:
+                sale.items.order_by("pk").first().delete()
+            sale = Sale.objects.get(pk=sale.pk)
+            with CaptureQueriesContext(connection) as queries:
+                sale.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(self.snapshot(), [])
+
+    def test_names_merged_by_the_collation_share_one_row(self):
+        # MySQL guarda "Café" y "cafe " en la misma fila única y la devuelve con la primera grafía.
+        day = timezone.now().date()
+        rows = [(7, day, "Bebidas", "Café", "pending"), (8, day, "Bebidas", "Té", "pending")]
+        deltas = {
+            (day, "Bebidas", "Café", "pending"): [1, Decimal("10")],
+            (day, "bebidas", "cafe ", "pending"): [2, Decimal("20")],
+            (day, "Bebidas", "Té", "pending"): [1, Decimal("5")],
+        }
+        self.assertEqual(dict(match_rows(deltas, rows)), {7: [3, Decimal("30")], 8: [1, Decimal("5")]})
+
+
+class ProductSearchTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category = Category.objects.create(name="Cómputo", slug="computo")
+        cls.laptop = Product.objects.create(
+            name="Laptop Gamer", slug="laptop-gamer", price=Decimal("900.00"), category=cls.category, stock=5,
+            description="Portátil con teclado retroiluminado",
+        )
+        cls.mouse = Product.objects.create(
+            name="Mouse inalámbrico", slug="mouse", price=Decimal("20.00"), category=cls.category, stock=5,
+        )
+
+    def search(self, query):
+        res = self.client.get(reverse("tienda:product-list"), {"q": query})
+        self.assertEqual(res.status_code, 200)
+        return [row["id"] for row in res.data["results"]]
+
+    def test_matches_word_prefixes_without_accents(self):
+        self.assertEqual(self.search("inalambr"), [self.mouse.pk])
+        self.assertEqual(self.search("lap gam"), [self.laptop.pk])
+        self.assertEqual(self.search("teclado"), [self.laptop.pk])
+        self.assertEqual(sorted(self.search("computo")), sorted([self.laptop.pk, self.mouse.pk]))
+        self.assertEqual(self.search("tablet"), [])
+
+    def test_index_follows_product_and_category_changes(self):
+        self.mouse.name = "Ratón óptico"
+        self.mouse.save()
+        self.assertEqual(self.search("raton"), [self.mouse.pk])
+        self.assertEqual(self.search("inalambrico"), [])
+
+        self.category.name = "Periféricos"
+        self.category.save()
+        self.assertEqual(len(self.search("perifericos")), 2)
+
+        self.laptop.delete()
+        self.assertEqual(self.search("laptop"), [])
+
+    def test_checkout_indexes_sold_names_for_reports(self):
+        self.client.force_authenticate(self.user)
+        res = self.client.post(
+            reverse("tienda:sale-list"),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": True,
+                "items": [{"product_id": self.mouse.pk, "quantity": 1, "unit_price": "20.00"}],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(search_sold_names("mouse inal"), ["Mouse inalámbrico"])
+
+    def test_upsert_omits_conflict_target_when_unsupported(self):
+        # MySQL: ON DUPLICATE KEY UPDATE no admite unique_fields.
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False), \
+                mock.patch.object(SearchDocument.objects, "bulk_create") as bulk_create:
+            index_products([self.mouse])
+        self.assertNotIn("unique_fields", bulk_create.call_args.kwargs)
+        self.assertTrue(bulk_create.call_args.kwargs["update_conflicts"])
+
+    def test_mysql_terms_below_token_size_fall_back_to_like(self):
+        self.assertEqual(_mysql_terms(["cable", "de", "usb", "5v"]), ("+cable* +usb*", ["de", "5v"]))
+
+    def test_mysql_subquery_compares_relevance_above_zero(self):
+        # Como en MySQL: una expresión condicional sola en el WHERE se compara con 1.
+        reader = connections[router.db_for_read(SearchDocument)]
+        with mock.patch.object(reader, "vendor", "mysql"), \
+                mock.patch.object(reader.ops, "conditional_expression_supported_in_where_clause", return_value=False):
+            sql, params = matching_documents(SOLD_PRODUCT, "cable de usb").values("key").query.sql_with_params()
+        self.assertIn("(MATCH(text) AGAINST (%s IN BOOLEAN MODE)) > %s", sql)
+        self.assertEqual(params[1:3], ("+cable* +usb*", 0))
+        self.assertIn("%de%", params)
+
+
+class BulkSaleImportTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("pos", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=3, stock=10)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("tienda:sale-bulk")
+
+    def ndjson(self, *records):
+        return "\n".join(json.dumps(record) for record in records)
+
+    def sale(self, *lines, **extra):
+        return {
+            "customer_name": "Mostrador",
+            "terms_accepted": True,
+            "items": [{"product_id": p.pk, "quantity": qty} for p, qty in lines],
+            **extra,
+        }
+
+    def test_ndjson_reports_bad_records_and_imports_the_rest(self):
+        first, second, third = self.products
+        body = self.ndjson(
+            self.sale((first, 2), (second, 1)),
+            self.sale((first, 9)),
+            self.sale((third, 1), terms_accepted=False),
+            {"terms_accepted": True, "items": [{"product_id": 999, "quantity": 1}]},
+            self.sale((first, 8)),
+        ) + "\n{roto"
+        res = self.client.post(self.url, body, content_type="application/x-ndjson")
+
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual((res.data["sales"], res.data["items"]), (2, 3))
+        errors = {error["record"]: error["errors"] for error in res.data["errors"]}
+        self.assertEqual(sorted(errors), [2, 3, 4, 6])
+        self.assertIn("Stock insuficiente", errors[2]["items"])
+
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 0)
+        sale = Sale.objects.filter(user=self.user).order_by("pk").first()
+        self.assertEqual(sale.total_amount, 2 * first.price + second.price)
+        self.assertEqual(
+            DailySalesRollup.objects.get(product_name=first.name).quantity, 10
+        )
+
+    def test_csv_groups_rows_by_sale_ref(self):
+        first, second, _ = self.products
+        body = (
+            "sale_ref,customer_name,terms_accepted,product_id,quantity,unit_price,status\n"
+            f"A,Ana,1,{first.pk},1,5.00,received\n"
+            f"A,Ana,1,{second.pk},2,,\n"
+            f"B,Beto,1,{second.pk},0,,\n"
+        )
+        res = self.client.post(self.url, body, content_type="text/csv")
+
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data["errors"], [{"record": "B", "errors": {"quantity": "La cantidad debe ser mayor a cero."}}])
+        sale = Sale.objects.get(customer_name="Ana")
+        self.assertEqual(sale.total_amount, Decimal("5.00") + 2 * second.price)
+        self.assertEqual(
+            sorted(sale.items.values_list("product_id", "status")),
+            sorted([(first.pk, "received"), (second.pk, "pending")]),
+        )
+
+    def test_oversized_batches_are_rejected_before_importing(self):
+        first = self.products[0]
+        body = self.ndjson(*(self.sale((first, 1)) for _ in range(3)))
+        with override_settings(SALE_IMPORT_MAX_RECORDS=2):
+            res = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, 413)
+        with override_settings(SALE_IMPORT_MAX_BYTES=len(body) - 1):
+            res = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, 413)
+
+        self.assertFalse(Sale.objects.exists())
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 10)
+        with override_settings(SALE_IMPORT_MAX_RECORDS=3, SALE_IMPORT_MAX_BYTES=len(body)):
+            res = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual((res.status_code, res.data["sales"]), (201, 3))
+
+    def test_command_imports_a_file(self):
+        first = self.products[0]
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False, encoding="utf-8") as handle:
+            handle.write(self.ndjson(self.sale((first, 1)), self.sale((first, 1))))
+        self.addCleanup(os.unlink, handle.name)
+        call_command("import_sales", handle.name, user="pos", stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(Sale.objects.filter(user=self.user).count(), 2)
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 8)
+
+
+class BulkStatusTransitionTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.other = get_user_model().objects.create_user("otro", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=3, stock=10)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("tienda:sale-item-bulk-status")
+        res = self.client.post(
+            reverse("tienda:sale-list"),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": True,
+                "items": [
+                    {"product_id": p.pk, "quantity": 2, "unit_price": str(p.price)} for p in self.products
+                ],
+            },
+            format="json",
+        )
+        self.sale = Sale.objects.get(pk=res.data["id"])
+
+    def rollup(self):
+        return sorted(
+            DailySalesRollup.objects.exclude(quantity=0).values_list("product_name", "status", "quantity", "amount")
+        )
+
+    def test_sale_transition_uses_one_update_and_keeps_rollup_in_sync(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(self.url, {"sale": self.sale.pk, "status": "received"}, format="json")
+
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(len(res.data["updated"]), 3)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "tienda_saleitem"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(self.sale.items.values_list("status", flat=True)), {"received"})
+        expected = self.rollup()
+        rebuild_rollup()
+        self.assertEqual(self.rollup(), expected)
+
+    def test_returns_release_stock_and_reverting_reserves_it(self):
+        ids = list(self.sale.items.values_list("pk", flat=True)[:2])
+        res = self.client.post(self.url, {"ids": ids, "status": "return_requested"}, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(
+            sorted(Product.objects.values_list("stock", flat=True)), [8, 10, 10]
+        )
+
+        self.client.post(self.url, {"ids": ids, "status": "pending"}, format="json")
+        self.assertEqual(list(Product.objects.values_list("stock", flat=True)), [8, 8, 8])
+
+    def test_items_of_other_users_are_rejected(self):
+        self.client.force_authenticate(self.other)
+        ids = list(self.sale.items.values_list("pk", flat=True))
+        res = self.client.post(self.url, {"ids": ids, "status": "received"}, format="json")
+        self.assertEqual(res.status_code, 404)
+        res = self.client.post(self.url, {"sale": self.sale.pk, "status": "received"}, format="json")
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(SaleItem.objects.filter(status="received").exists())
+
+
+class SaleTotalsTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "secreto123")
+        cls.category, cls.products = cls.create_catalog(products=2)
+
+    def create_sale(self, *lines):
+        sale = Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+        for product, quantity in lines:
+            SaleItem.objects.create(
+                sale=sale, product=product, product_name=product.name, quantity=quantity, unit_price=product.price
+            )
+        return sale
+
+    def total(self, sale):
+        sale.refresh_from_db(fields=["total_amount"])
+        return sale.total_amount
+
+    def test_item_changes_apply_deltas_without_reloading_items(self):
+        first, second = self.products
+        sale = self.create_sale((first, 2), (second, 1))
+        self.assertEqual(self.total(sale), 2 * first.price + second.price)
+
+        item = sale.items.get(product=first)
+        item.quantity = 5
+        with CaptureQueriesContext(connection) as ctx:
+            item.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "tienda_saleitem"' in q["sql"]])
+        self.assertEqual(self.total(sale), 5 * first.price + second.price)
+
+        item.delete()
+        self.assertEqual(self.total(sale), second.price)
+
+    def test_admin_inline_edit_updates_total(self):
+        first, second = self.products
+        sale = self.create_sale((first, 1))
+        item = sale.items.get()
+        self.client.force_login(self.admin)
+        prefix = "items"
+        res = self.client.post(
+            reverse("admin:tienda_sale_change", args=[sale.pk]),
+            {
+                "customer_name": "Cliente",
+                "terms_accepted": "on",
+                f"{prefix}-TOTAL_FORMS": "2",
+                f"{prefix}-INITIAL_FORMS": "1",
+                f"{prefix}-0-id": item.pk,
+                f"{prefix}-0-sale": sale.pk,
+                f"{prefix}-0-product_name": item.product_name,
+                f"{prefix}-0-quantity": "3",
+                f"{prefix}-0-unit_price": str(first.price),
+                f"{prefix}-0-status": "pending",
+                f"{prefix}-1-sale": sale.pk,
+                f"{prefix}-1-product_name": second.name,
+                f"{prefix}-1-quantity": "1",
+                f"{prefix}-1-unit_price": "7.50",
+                f"{prefix}-1-status": "pending",
+            },
+        )
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(self.total(sale), 3 * first.price + Decimal("7.50"))
+
+    def test_check_command_fixes_drift_in_batches(self):
+        first, second = self.products
+        sales = [self.create_sale((first, n), (second, 1)) for n in range(1, 4)]
+        Sale.objects.filter(pk__in=[sales[0].pk, sales[2].pk]).update(total_amount=0)
+        empty = Sale.objects.create(customer_name="Sin artículos", terms_accepted=True, total_amount=5)
+
+        out = io.StringIO()
+        call_command("check_sale_totals", batch_size=2, stdout=out)
+        self.assertIn("3 (", out.getvalue())
+        self.assertEqual(self.total(sales[0]), 0)
+
+        call_command("check_sale_totals", "--fix", batch_size=2, stdout=io.StringIO())
+        for n, sale in enumerate(sales, start=1):
+            self.assertEqual(self.total(sale), n * first.price + second.price)
+        self.assertEqual(self.total(empty), 0)
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "secreto123")
+        cls.create_catalog(products=3)
+
+    def setUp(self):
+        super().setUp()
+        request_stats.reset()
+
+    def test_server_timing_and_staff_endpoint(self):
+        res = self.client.get(reverse("tienda:product-list"))
+        self.assertRegex(
+            res["Server-Timing"],
+            r'db;dur=[\d.]+;desc="2 consultas", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=',
+        )
+
+        self.assertEqual(self.client.get(reverse("tienda:metrics")).status_code, 403)
+        self.client.force_authenticate(self.admin)
+        data = self.client.get(reverse("tienda:metrics")).data
+        stats = data["views"]["tienda:product-list"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["queries"]["p95"], 2)
+        self.assertGreater(stats["serialize_ms"]["max"], 0)
+        self.assertGreater(stats["render_ms"]["max"], 0)
+
+    def test_repeated_statements_are_flagged(self):
+        def view(request):
+            for product in Product.objects.all():
+                Category.objects.get(pk=product.category_id)
+            return HttpResponse()
+
+        res = RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+        self.assertIn('dup;desc="3 consultas repetidas"', res["Server-Timing"])
+        repeated = request_stats.snapshot()["views"]["<sin vista>"]["duplicate_queries"]
+        self.assertEqual(repeated[0]["count"], 3)
+        self.assertIn("tienda_category", repeated[0]["sql"])
+
+    def test_async_views_stay_async(self):
+        async def view(request):
+            await Product.objects.acount()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        res = async_to_sync(middleware)(RequestFactory().get("/"))
+        self.assertIn('desc="1 consultas"', res["Server-Timing"])
+
+    def test_streamed_body_is_measured_to_the_end(self):
+        def view(request):
+            return StreamingHttpResponse(str(Product.objects.count()) for _ in range(2))
+
+        res = RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+        self.assertIn('desc="0 consultas"', res["Server-Timing"])
+        self.assertEqual(request_stats.snapshot()["views"], {})
+        self.assertEqual(b"".join(res.streaming_content), b"33")
+        stats = request_stats.snapshot()["views"]["<sin vista>"]
+        self.assertEqual(stats["queries"]["max"], 2)
+
+    @override_settings(REQUEST_METRICS_WINDOW=2)
+    def test_window_is_read_when_the_middleware_is_created(self):
+        self.addCleanup(request_stats.resize, request_stats.window)
+        RequestMetricsMiddleware(lambda request: HttpResponse())
+        self.assertEqual(request_stats.snapshot()["window"], 2)
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_disabled_middleware_is_dropped(self):
+        res = self.client.get(reverse("tienda:product-list"))
+        self.assertNotIn("Server-Timing", res)
+
+HAS_REPLICA = "replica" in settings.DATABASES
+
+
+@override_settings(REPLICA_DATABASE="replica", REPLICA_MAX_LAG=10, REPLICA_CHECK_INTERVAL=0)
+class ReplicaRoutingTests(CatalogFixturesMixin, APITestCase):
+    """Con tienda_api.settings_sqlite: dos archivos SQLite hacen de primario y réplica."""
+
+    databases = {"default", "replica"} if HAS_REPLICA else {"default"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        cls.category, cls.products = cls.create_catalog(products=3)
+
+    def setUp(self):
+        super().setUp()
+        replica_status.reset()
+
+    def listed(self):
+        res = self.client.get(reverse("tienda:product-list"))
+        self.assertEqual(res.status_code, 200)
+        return len(res.data["results"])
+
+    @override_settings(REPLICA_DATABASE="no-existe")
+    def test_without_replica_everything_uses_primary(self):
+        router = ReplicaRouter()
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Product), "default")
+        self.assertEqual(router.db_for_write(Product), "default")
+        self.assertEqual(self.listed(), 3)
+
+    @skipUnless(HAS_REPLICA, "requiere un alias 'replica' (tienda_api.settings_sqlite)")
+    def test_catalog_reads_go_to_replica_and_writes_to_primary(self):
+        # La réplica de prueba está vacía: el catálogo sale de ahí.
+        self.assertEqual(self.listed(), 0)
+        Category.objects.using("replica").create(name="Hogar", slug="hogar")
+        res = self.client.get(reverse("tienda:category-list"))
+        self.assertEqual([c["name"] for c in res.data], ["Hogar"])
+        # Fuera de las vistas de solo lectura se lee del primario.
+        self.assertEqual(Product.objects.count(), 3)
+
+    @skipUnless(HAS_REPLICA, "requiere un alias 'replica' (tienda_api.settings_sqlite)")
+    def test_lagging_replica_falls_back_to_primary(self):
+        sale = Sale.objects.create(customer_name="Cliente", terms_accepted=True)
+        Sale.objects.filter(pk=sale.pk).update(created_at=sale.created_at - timedelta(minutes=5))
+        self.assertEqual(self.listed(), 3)
+        self.assertGreater(replica_status.snapshot()["lag_seconds"], 10)
+
+    @skipUnless(HAS_REPLICA, "requiere un alias 'replica' (tienda_api.settings_sqlite)")
+    def test_sale_creation_pins_reads_to_primary(self):
+        self.client.force_authenticate(self.user)
+        payload = {
+            "customer_name": "Cliente",
+            "terms_accepted": True,
+            "items": [{"product_id": self.products[0].pk, "quantity": 1, "unit_price": str(self.products[0].price)}],
+        }
+        res = self.client.post(reverse("tienda:sale-list"), payload, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertIn(PIN_COOKIE, res.cookies)
+        # La venta acaba de crearse: la réplica va atrasada pero dentro de la tolerancia.
+        self.assertEqual(self.listed(), 3)
+
+        cache.clear()
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual(self.listed(), 0)
+
+    @skipUnless(HAS_REPLICA, "requiere un alias 'replica' (tienda_api.settings_sqlite)")
+    def test_bulk_item_insert_follows_the_write_router(self):
+        sale = Sale.objects.using("replica").create(customer_name="Cliente", terms_accepted=True)
+        item = SaleItem(sale=sale, product_name="Cable", quantity=1, unit_price=Decimal("10.00"))
+        with mock.patch.object(router, "db_for_write", return_value="replica"):
+            _insert_items([item])
+        self.assertEqual(SaleItem.objects.using("replica").filter(sale_id=sale.pk).count(), 1)
+        self.assertFalse(SaleItem.objects.filter(sale_id=sale.pk).exists())
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def connect(self):
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    def healthy(self, raw):
+        return True
+
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        raw, reused = pool.acquire(self.connect, self.healthy)
+        self.assertFalse(reused)
+        pool.release(raw)
+        again, reused = pool.acquire(self.connect, self.healthy)
+        self.assertIs(again, raw)
+        self.assertTrue(reused)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["reused"], stats["in_use"]), (1, 1, 1))
+
+    def test_full_pool_waits_then_times_out(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        raw, _ = pool.acquire(self.connect, self.healthy)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect, self.healthy)
+
+        pool.timeout = 2
+        threading.Timer(0.05, pool.release, args=[raw]).start()
+        again, reused = pool.acquire(self.connect, self.healthy)
+        self.assertIs(again, raw)
+        stats = pool.stats()
+        self.assertEqual((stats["waits"], stats["timeouts"]), (1, 1))
+        self.assertGreater(stats["wait_ms_max"], 0)
+
+    def test_idle_and_unhealthy_connections_are_replaced(self):
+        pool = ConnectionPool(max_idle=0)
+        raw, _ = pool.acquire(self.connect, self.healthy)
+        pool.release(raw)
+        time.sleep(0.01)
+        fresh, reused = pool.acquire(self.connect, self.healthy)
+        self.assertFalse(reused)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute("SELECT 1")
+
+        pool = ConnectionPool(check_after=0)
+        raw, _ = pool.acquire(self.connect, self.healthy)
+        pool.release(raw)
+        fresh, reused = pool.acquire(self.connect, lambda raw: False)
+        self.assertIsNot(fresh, raw)
+        self.assertEqual(pool.stats()["failed_checks"], 1)
+
+    def test_backend_returns_connections_to_the_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            alias = "pool_test"
+            handler = ConnectionHandler({
+                "default": {"ENGINE": "django.db.backends.dummy"},
+                alias: {"ENGINE": "tienda.db.sqlite3", "NAME": os.path.join(tmp, "db.sqlite3")},
+            })
+            db = handler[alias]
+            db.ensure_connection()
+            raw = db.connection
+            db.close()
+            db.ensure_connection()
+            self.assertIs(db.connection, raw)
+
+            # Lo pendiente de una transacción abierta no pasa a la siguiente petición.
+            with db.cursor() as cursor:
+                cursor.execute("CREATE TABLE t (n INTEGER)")
+            db.set_autocommit(False)
+            with db.cursor() as cursor:
+                cursor.execute("INSERT INTO t VALUES (1)")
+            db.close()
+            with db.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM t")
+                self.assertEqual(cursor.fetchone(), (0,))
+            self.assertIs(db.connection, raw)
+            db.close()
+            get_pool(alias, db.settings_dict).close_all()
+
+    def test_pool_follows_database_settings_changes(self):
+        # Como hace el ejecutor de pruebas: mismo alias, otra base.
+        with tempfile.TemporaryDirectory() as tmp:
+            alias = "pool_switch_test"
+            first_settings = {"ENGINE": "tienda.db.sqlite3", "NAME": os.path.join(tmp, "primera.sqlite3")}
+            handler = ConnectionHandler({"default": {"ENGINE": "django.db.backends.dummy"}, alias: first_settings})
+            db = handler[alias]
+            with db.cursor() as cursor:
+                cursor.execute("CREATE TABLE solo_en_la_primera (n INTEGER)")
+            first = db.connection
+            first_settings = dict(db.settings_dict)
+            db.close()
+
+            db.settings_dict["NAME"] = os.path.join(tmp, "segunda.sqlite3")
+            with db.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'solo_en_la_primera'")
+                self.assertEqual(cursor.fetchone(), (0,))
+            self.assertIsNot(db.connection, first)
+            db.close()
+            self.assertIsNot(get_pool(alias, db.settings_dict), get_pool(alias, first_settings))
+            for settings_dict in (db.settings_dict, first_settings):
+                get_pool(alias, settings_dict).close_all()
+
+
+@override_settings(SESSION_REFRESH_INTERVAL=15)
+class SlidingSessionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user("cliente", password="secreto123")
+        self.client.force_login(self.user)
+        self.url = reverse("tienda:category-list")
+
+    def session_writes(self, at):
+        with mock.patch("tienda.sessions._now", return_value=at), CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        writes = [
+            q["sql"] for q in ctx.captured_queries
+            if "django_session" in q["sql"] and not q["sql"].lstrip().upper().startswith("SELECT")
+        ]
+        return len(writes), settings.SESSION_COOKIE_NAME in res.cookies
+
+    def test_expiry_is_refreshed_at_most_once_per_interval(self):
+        start = time.time()
+        self.assertEqual(self.session_writes(start), (1, True))
+        self.assertEqual(self.session_writes(start + 5), (0, False))
+        self.assertEqual(self.session_writes(start + 14), (0, False))
+        self.assertEqual(self.session_writes(start + 16), (1, True))
+        self.assertEqual(self.client.session[REFRESHED_KEY], int(start + 16))
+
+    def test_logout_is_seen_by_other_workers(self):
+        # Otro proceso del servidor arma sus propias instancias de caché con la misma configuración.
+        other = CacheHandler(settings.CACHES)[settings.SESSION_CACHE_ALIAS]
+        self.assertNotIsInstance(other, LocMemCache)
+        key = import_module(settings.SESSION_ENGINE).SessionStore(self.client.session.session_key).cache_key
+        self.assertIsNotNone(other.get(key))
+
+        self.client.logout()
+        self.assertIsNone(other.get(key))
+
+    def test_cleanup_runs_in_background_once_per_interval(self):
+        cleaner = SessionCleaner(300)
+        with mock.patch.object(SessionCleaner, "run") as run:
+            self.assertFalse(cleaner.maybe_start())
+            cleaner.last_run -= 301
+            self.assertTrue(cleaner.maybe_start())
+            cleaner.thread.join()
+            self.assertFalse(cleaner.maybe_start())
+        run.assert_called_once()
+
+
+class AsyncCatalogTests(CatalogFixturesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = cls.create_catalog(products=30)
+
+    async def test_async_endpoints_match_the_viewsets(self):
+        res = await self.async_client.get(reverse("tienda:async-product-list"))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Cache"], "MISS")
+        page = res.json()
+        expected = (await self.async_client.get(reverse("tienda:product-list"))).json()
+        self.assertEqual(page["results"], expected["results"])
+
+        rest = (await self.async_client.get(page["next"])).json()
+        self.assertIsNone(rest["next"])
+        self.assertEqual(len(page["results"]) + len(rest["results"]), 30)
+
+        res = await self.async_client.get(reverse("tienda:async-category-list"))
+        self.assertEqual(res.json(), [{"id": self.category.pk, "name": "Electrónica", "slug": "electronica"}])
+        res = await self.async_client.get(reverse("tienda:async-product-detail", args=[self.products[0].pk]))
+        self.assertEqual(res.json()["name"], "Producto 0")
+        res = await self.async_client.get(reverse("tienda:async-category-detail", args=[0]))
+        self.assertEqual(res.status_code, 404)
+
+    async def test_cached_until_the_catalog_changes(self):
+        url = reverse("tienda:async-product-detail", args=[self.products[0].pk])
+        await self.async_client.get(url)
+        res = await self.async_client.get(url)
+        self.assertEqual(res["X-Cache"], "HIT")
+
+        product = self.products[0]
+        product.price = Decimal("99.00")
+        await product.asave()
+        res = await self.async_client.get(url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.json()["price"], "99.00")
+
+
+@override_settings(PRODUCT_IMAGE_WIDTHS=(240, 480, 720))
+class ProductImageVariantTests(CatalogFixturesMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.category = Category.objects.create(name="Electrónica", slug="electronica")
+
+    def upload(self, width, height, name="foto.jpg"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, "JPEG")
+        product = Product.objects.create(
+            name="Cámara", slug=f"camara-{width}", price=Decimal("10.00"), category=self.category,
+            image=SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg"),
+        )
+        images.wait_pending(timeout=30)
+        product.refresh_from_db()
+        return product
+
+    def test_upload_builds_hashed_variants_in_the_background(self):
+        product = self.upload(1200, 800)
+        widths = product.image_variants["widths"]
+        self.assertEqual(product.image_variants["source"], product.image.name)
+        self.assertEqual(sorted(widths, key=int), ["240", "480", "720"])
+        for width, name in widths.items():
+            self.assertRegex(name, rf"^products/derived/foto[^/]*-{width}w\.[0-9a-f]{{12}}\.webp$")
+            with default_storage.open(name) as handle, Image.open(handle) as variant:
+                self.assertEqual(variant.width, int(width))
+                self.assertLess(handle.size, product.image.size)
+
+        res = self.client.get(reverse("tienda:product-detail", args=[product.pk]), {"fields": "thumbnail,image_srcset"})
+        self.assertTrue(res.data["thumbnail"].endswith(widths["240"]))
+        self.assertEqual(
+            [entry.rsplit(" ", 1)[1] for entry in res.data["image_srcset"].split(", ")],
+            ["240w", "480w", "720w"],
+        )
+
+    def test_narrow_original_is_never_upscaled(self):
+        product = self.upload(300, 300)
+        self.assertEqual(sorted(product.image_variants["widths"], key=int), ["240", "300"])
+
+    def test_backfill_rebuilds_missing_variants(self):
+        product = self.upload(800, 600)
+        default_storage.delete(product.image_variants["widths"]["480"])
+        out = io.StringIO()
+        call_command("build_image_variants", stdout=out)
+        self.assertIn("Productos procesados: 1, con error: 0.", out.getvalue())
+        product.refresh_from_db()
+        self.assertTrue(images.variants_current(product))
+
+
+class StaticDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.server = FileServer([("/static/", self.root)], max_age=60)
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        return path
+
+    def wsgi(self, path, **headers):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path}
+        environ.update({f"HTTP_{key.upper()}": value for key, value in headers.items()})
+        started = {}
+
+        def start_response(status, response_headers):
+            started.update(status=status, headers=dict(response_headers))
+
+        app = StaticFilesMiddleware(lambda environ, start_response: [b"django"], server=self.server)
+        body = b"".join(app(environ, start_response))
+        return started.get("status", "django"), started.get("headers", {}), body
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        with override_settings(STATIC_ROOT=self.root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            with open(os.path.join(self.root, "staticfiles.json")) as handle:
+                hashed = json.load(handle)["paths"]["css/base.css"]
+            self.assertRegex(hashed, r"^css/base\.[0-9a-f]{12}\.css$")
+            self.assertTrue(os.path.isfile(os.path.join(self.root, hashed + ".gz")))
+            # Un archivo fuera del manifiesto es un error, no una ruta sin hash.
+            with self.assertRaises(ValueError):
+                staticfiles_storage.url("css/no-existe.css")
+
+            status, headers, body = self.wsgi(f"/static/{hashed}", ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Cache-Control"], IMMUTABLE)
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        with open(os.path.join(self.root, hashed), "rb") as handle:
+            self.assertEqual(gzip.decompress(body), handle.read())
+
+    def test_conditional_requests_and_fallthrough(self):
+        self.write("app.js", b"console.log(1);")
+        status, headers, _ = self.wsgi("/static/app.js")
+        self.assertEqual(headers["Cache-Control"], "public, max-age=60")
+
+        status, headers, body = self.wsgi("/static/app.js", IF_NONE_MATCH=f"W/{headers['ETag']}")
+        self.assertEqual((status, body), ("304 Not Modified", b""))
+        status, _, _ = self.wsgi("/static/app.js", IF_MODIFIED_SINCE=headers["Last-Modified"])
+        self.assertEqual(status, "304 Not Modified")
+
+        self.assertEqual(self.wsgi("/static/nope.js")[2], b"django")
+        self.assertEqual(self.wsgi("/static/../etc/passwd")[2], b"django")
+        self.assertEqual(self.wsgi("/api/products/")[2], b"django")
+
+    def test_byte_ranges(self):
+        self.write("video.bin", bytes(range(100)))
+        status, headers, body = self.wsgi("/static/video.bin", RANGE="bytes=10-19")
+        self.assertEqual(status, "206 Partial Content")
+        self.assertEqual(headers["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(body, bytes(range(10, 20)))
+
+        self.assertEqual(self.wsgi("/static/video.bin", RANGE="bytes=-5")[2], bytes(range(95, 100)))
+        status, headers, _ = self.wsgi("/static/video.bin", RANGE="bytes=200-")
+        self.assertEqual((status[:3], headers["Content-Range"]), ("416", "bytes */100"))
+        # If-Range con otro validador: el archivo completo.
+        status, _, body = self.wsgi("/static/video.bin", RANGE="bytes=10-19", IF_RANGE='"viejo"')
+        self.assertEqual((status, len(body)), ("200 OK", 100))
+
+    async def test_asgi_serves_the_same_response(self):
+        self.write("app.css", b"body{}" * 100)
+        with open(os.path.join(self.root, "app.css.gz"), "wb") as handle:
+            handle.write(gzip.compress(b"body{}" * 100))
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        app = StaticFilesASGIMiddleware(None, server=self.server)
+        scope = {"type": "http", "method": "GET", "path": "/static/app.css", "headers": [(b"accept-encoding", b"gzip")]}
+        await app(scope, None, send)
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertIn((b"content-encoding", b"gzip"), messages[0]["headers"])
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        self.assertEqual(gzip.decompress(body), b"body{}" * 100)
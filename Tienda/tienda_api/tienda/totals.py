@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+
+from .models import Sale, SaleItem
+
+TOTAL_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def apply_total_deltas(deltas):
+    """Suma a cada venta su diferencia con un solo UPDATE, sin cargar artículos."""
+    deltas = {pk: delta for pk, delta in deltas.items() if pk and delta}
+    if not deltas:
+        return
+    Sale.objects.filter(pk__in=deltas).update(
+        total_amount=F("total_amount") + Case(
+            *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+            default=Value(Decimal("0")),
+            output_field=TOTAL_FIELD,
+        )
+    )
+
+
+def items_total():
+    """Total de los artículos de la venta externa, calculado por la base."""
+    totals = (
+        SaleItem.objects.filter(sale=OuterRef("pk"))
+        .order_by()
+        .values("sale")
+        .annotate(total=Sum(F("quantity") * F("unit_price")))
+        .values("total")
+    )
+    # SQLite suma en coma flotante; redondear evita falsas diferencias.
+    return Round(Coalesce(Subquery(totals, output_field=TOTAL_FIELD), Value(Decimal("0"))), 2)
+
+
+def recalculate_totals(sales):
+    return sales.update(total_amount=items_total())
+
+
+def check_totals(batch_size=5000, fix=False):
+    """Recorre las ventas por rangos de pk y devuelve (y opcionalmente corrige) las que difieren."""
+    last = Sale.objects.aggregate(last=Max("pk"))["last"] or 0
+    drifted = []
+    for start in range(0, last, batch_size):
+        window = Sale.objects.filter(pk__gt=start, pk__lte=start + batch_size)
+        ids = list(
+            window.annotate(computed=items_total())
+            .exclude(total_amount=F("computed"))
+            .values_list("pk", flat=True)
+        )
+        if ids and fix:
+            recalculate_totals(Sale.objects.filter(pk__in=ids))
+        drifted.extend(ids)
+    return drifted
@@ -1,13 +1,21 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import (
+    AsyncCategoryDetailView,
+    AsyncCategoryListView,
+    AsyncProductDetailView,
+    AsyncProductListView,
+)
 from .views import (
     AuthLoginView,
     AuthLogoutView,
+    CatalogCacheStatsView,
     CategoryViewSet,
     ContactView,
     HomeView,
     ProductViewSet,
+    RequestMetricsView,
     SaleItemViewSet,
     SalesView,
     SaleViewSet,
@@ -27,5 +35,11 @@ urlpatterns = [
     path("login/", AuthLoginView.as_view(), name="login"),
     path("logout/", AuthLogoutView.as_view(), name="logout"),
     path("signup/", SignUpView.as_view(), name="signup"),
+    path("api/catalog-cache/", CatalogCacheStatsView.as_view(), name="catalog-cache"),
+    path("api/metrics/", RequestMetricsView.as_view(), name="metrics"),
+    path("api/async/products/", AsyncProductListView.as_view(), name="async-product-list"),
+    path("api/async/products/<int:pk>/", AsyncProductDetailView.as_view(), name="async-product-detail"),
+    path("api/async/categories/", AsyncCategoryListView.as_view(), name="async-category-list"),
+    path("api/async/categories/<int:pk>/", AsyncCategoryDetailView.as_view(), name="async-category-detail"),
     path("api/", include(router.urls)),  
 ]
\ No newline at end of file
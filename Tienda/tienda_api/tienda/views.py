@@ -1,20 +1,38 @@
+import codecs
+from itertools import islice
+
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, LogoutView
+from django.db.models import Case, IntegerField, Value, When
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView
 from django.views.generic.edit import FormView
 
 from rest_framework import mixins, status, viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from .cache import CatalogCacheMixin, catalog_cache_stats
+from .conditional import ConditionalGetMixin
+from .db.pool import pool_stats
+from .filters import TRUE_VALUES, CatalogFilter, CatalogOrderingFilter
 from .forms import ContactForm
+from .history import decode_since, encode_since, sale_changes, watermark
+from .idempotency import idempotent
+from .ingest import MAX_REQUEST_BYTES, MAX_REQUEST_RECORDS, import_sales, read_csv, read_ndjson
+from .metrics import SerializerTimingMixin, request_stats
 from .models import Category, Product, Sale, SaleItem
+from .pagination import CatalogCursorPagination, SaleHistoryPagination
+from .search import search_product_ids
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
+    SaleItemBulkStatusSerializer,
     SaleItemStatusSerializer,
     SaleSerializer,
 )
@@ -65,25 +83,127 @@ class SignUpView(FormView):
 
 
 
-class ProductViewSet(ReadOnlyModelViewSet):
-    queryset = Product.objects.filter(is_active=True).order_by("-created_at")
+class ProductViewSet(CatalogCacheMixin, ConditionalGetMixin, SerializerTimingMixin, ReadOnlyModelViewSet):
+    queryset = (
+        Product.objects.filter(is_active=True)
+        .select_related("category")
+        .order_by("-created_at", "id")
+    )
     serializer_class = ProductSerializer
+    pagination_class = CatalogCursorPagination
+    filter_backends = [CatalogFilter, CatalogOrderingFilter]
+    # category_name viene de la categoría: renombrarla también cambia el ETag.
+    validator_related_fields = ("category__updated_at",)
+    search_limit = 200
+    replica_reads = True
+
+    def get_search_ids(self, query):
+        # El validador, la página y las facetas piden el queryset: se busca una vez por petición.
+        if getattr(self, "_search", None) is None or self._search[0] != query:
+            self._search = (query, search_product_ids(query, limit=self.search_limit))
+        return self._search[1]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            return queryset
+        ids = self.get_search_ids(query)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).annotate(
+            search_rank=Case(
+                *(When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)),
+                output_field=IntegerField(),
+            )
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.request.query_params.get("fields", "")
+        context["fields"] = [name.strip() for name in fields.split(",") if name.strip()]
+        return context
 
-class CategoryViewSet(ReadOnlyModelViewSet):
+    def wants_facets(self):
+        return self.action == "list" and self.request.query_params.get("facets", "").strip().lower() in TRUE_VALUES
+
+    def get_validator_queryset(self):
+        if not self.wants_facets():
+            return super().get_validator_queryset()
+        # Las facetas cuentan todas las categorías: el ETag cubre esa base, no solo la página filtrada.
+        return CatalogFilter().filter_queryset(
+            self.request, self.get_queryset(), self, skip=CatalogFilter.category_params
+        ).order_by()
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        # ?facets=1 añade el conteo por categoría; la portada solo lo pide en la primera página.
+        if self.wants_facets():
+            response.data["facets"] = {
+                "categories": CatalogFilter().category_facets(self.request, self.get_queryset(), self),
+            }
+        return response
+
+class CategoryViewSet(CatalogCacheMixin, ConditionalGetMixin, SerializerTimingMixin, ReadOnlyModelViewSet):
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
+    replica_reads = True
+
+class CatalogCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(catalog_cache_stats())
 
-class SaleViewSet(viewsets.ModelViewSet):
+class RequestMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**request_stats.snapshot(), "pools": pool_stats()})
+
+class SaleViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SaleHistoryPagination
+    # Más cambios que esto en un ?since= y conviene recargar el historial.
+    delta_limit = 100
 
     def get_queryset(self):
         return (
             Sale.objects.filter(user=self.request.user)
             .prefetch_related("items")
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
 
+    def list(self, request, *args, **kwargs):
+        """Historial de compras; con ``?since=`` solo las ventas que cambiaron.
+
+        Sin parámetros devuelve la lista completa. Con ``?page_size=`` o
+        ``?cursor=`` la página trae ``since``, igual que la respuesta a
+        ``?since=``: el cursor para la siguiente consulta incremental. Esa
+        respuesta lista en ``deleted`` los ids de las ventas borradas; si hubo
+        demasiados cambios, ``reset`` pide recargar todo.
+        """
+        mark = encode_since(watermark())
+        token = request.query_params.get("since")
+        if not token:
+            response = super().list(request, *args, **kwargs)
+            if isinstance(response.data, dict):
+                response.data["since"] = mark
+            return response
+
+        changed, deleted = sale_changes(request.user, decode_since(token))
+        if len(changed) + len(deleted) > self.delta_limit:
+            return Response({"since": None, "reset": True, "results": [], "deleted": []})
+        sales = self.get_queryset().filter(pk__in=changed)
+        return Response({
+            "since": mark,
+            "reset": False,
+            "results": self.get_serializer(sales, many=True).data,
+            "deleted": sorted(deleted - changed),
+        })
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -92,10 +212,52 @@ class SaleViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(read_serializer.data)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class SaleItemViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet):
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Importa ventas en NDJSON (una por línea) o CSV (un artículo por fila).
+
+        Un lote que pasa de SALE_IMPORT_MAX_BYTES o SALE_IMPORT_MAX_RECORDS
+        se rechaza con 413 antes de importar nada.
+        """
+        max_bytes = getattr(settings, "SALE_IMPORT_MAX_BYTES", MAX_REQUEST_BYTES)
+        max_records = getattr(settings, "SALE_IMPORT_MAX_RECORDS", MAX_REQUEST_RECORDS)
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > max_bytes:
+            return Response(
+                {"detail": f"El lote pasa de {max_bytes} bytes; usa el comando import_sales."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        lines = codecs.iterdecode(request.stream or [], "utf-8")
+        reader = read_csv if request.content_type.startswith("text/csv") else read_ndjson
+        try:
+            records = list(islice(reader(lines), max_records + 1))
+            if len(records) > max_records:
+                return Response(
+                    {"detail": f"El lote pasa de {max_records} ventas; usa el comando import_sales."},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            report = import_sales(records, user=request.user)
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        code = status.HTTP_201_CREATED if report["sales"] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=code)
+
+class SaleItemViewSet(SerializerTimingMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet):
     serializer_class = SaleItemStatusSerializer
     permission_classes = [IsAuthenticated]
-    http_method_names = ["patch", "head", "options"]
+    http_method_names = ["patch", "post", "head", "options"]
 
     def get_queryset(self):
         return SaleItem.objects.filter(sale__user=self.request.user)
+
+    @action(detail=False, methods=["post"], url_path="bulk-status")
+    def bulk_status(self, request):
+        """Cambia el estado de varios artículos (``ids``) o de toda una venta (``sale``)."""
+        serializer = SaleItemBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changed = serializer.apply(self.get_queryset())
+        return Response({"status": serializer.validated_data["status"], "updated": [item.pk for item in changed]})
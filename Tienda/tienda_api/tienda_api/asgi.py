@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tienda_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from tienda.fileserver import StaticFilesASGIMiddleware  # noqa: E402  (requiere la configuración cargada)
+
+application = StaticFilesASGIMiddleware(django_application)
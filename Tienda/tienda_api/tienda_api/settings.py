@@ -22,11 +22,13 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'tienda.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'tienda.sessions.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tienda.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +58,8 @@ WSGI_APPLICATION = 'tienda_api.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # MySQL con pool de conexiones por proceso (tienda.db.pool).
+        'ENGINE': 'tienda.db.mysql',
         'NAME': 'tienda_db',
         'USER': 'Admin',
         'PASSWORD': 'Panda15w6',
@@ -66,9 +69,30 @@ DATABASES = {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # Django cierra la conexión al final de cada petición; con el pool eso
+        # solo la devuelve para la siguiente. Ver POOL_DEFAULTS en tienda.db.pool.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': 20,
+            'MAX_IDLE': 300,
+            'MAX_LIFETIME': 3600,
+            'TIMEOUT': 5,
+            'CHECK_AFTER': 30,
+        },
     }
 }
 
+# Réplica de lectura: añadir a DATABASES un alias 'replica' con la misma
+# configuración apuntando al servidor réplica. Sin él todo va al primario.
+# Las vistas con replica_reads = True leen de la réplica salvo que vaya más de
+# REPLICA_MAX_LAG segundos atrasada (se mide cada REPLICA_CHECK_INTERVAL) o que
+# el cliente haya escrito en los últimos REPLICA_PIN_SECONDS.
+DATABASE_ROUTERS = ['tienda.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_MAX_LAG = 10
+REPLICA_CHECK_INTERVAL = 5
+REPLICA_PIN_SECONDS = 30
+
 
 LANGUAGE_CODE = 'es-mx'
 TIME_ZONE = 'America/Mexico_City'
@@ -84,15 +108,84 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic deja nombres con hash del contenido y hermanos .gz/.br (este
+# último con el paquete brotli). tienda.fileserver, montado en wsgi.py y
+# asgi.py, los sirve con Cache-Control immutable; lo que no lleva hash en el
+# nombre (media original, estáticos sin manifiesto) se cachea STATIC_MAX_AGE s.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'tienda.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+STATIC_MAX_AGE = 60
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Variantes de las imágenes de producto (tienda.images): se generan en un pool
+# de hilos al guardar el producto, en media/products/derived/ con el hash del
+# contenido en el nombre. build_image_variants rellena las que falten.
+PRODUCT_IMAGE_WIDTHS = (240, 480, 720)
+PRODUCT_IMAGE_FORMAT = 'WEBP'
+PRODUCT_IMAGE_QUALITY = 80
+PRODUCT_IMAGE_WORKERS = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-SESSION_COOKIE_AGE = 60               
-SESSION_SAVE_EVERY_REQUEST = True     
+# Las páginas del catálogo se guardan aquí bajo una versión que se incrementa
+# en cada cambio. Para compartirla entre procesos sin Redis/Memcached sirve
+# 'django.core.cache.backends.filebased.FileBasedCache' con LOCATION en disco.
+# Las sesiones (cached_db) van en una caché en disco compartida por todos los
+# procesos del servidor: con LocMem, un cierre de sesión en un proceso seguiría
+# valiendo en los demás hasta que venciera su copia.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'sessions',
+    },
+}
+
+
+# Métricas por vista (consultas, tiempo de SQL, serialización, render y total) en la
+# cabecera Server-Timing y en /api/metrics/. Desactivadas, la middleware se
+# descarta al arrancar.
+REQUEST_METRICS = False
+REQUEST_METRICS_WINDOW = 500
+REQUEST_METRICS_DUPLICATE_THRESHOLD = 3
+
+
+# Sesiones en caché con copia en la base (cached_db). El vencimiento se
+# desliza, pero la sesión solo se vuelve a guardar cuando cambia o cuando su
+# última renovación tiene más de SESSION_REFRESH_INTERVAL segundos; las
+# vencidas se borran en segundo plano cada SESSION_CLEANUP_INTERVAL segundos.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_COOKIE_AGE = 60
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = 15
+SESSION_CLEANUP_INTERVAL = 300
+
+
+# Historial de compras incremental (GET /api/sales/?since=): el cursor se
+# retrasa estos segundos para no perder transacciones que confirmaron tarde.
+SALES_SINCE_OVERLAP = 5
+
+# Idempotency-Key en POST /api/sales/: la respuesta se guarda IDEMPOTENCY_TTL
+# segundos; una reserva sin terminar se libera tras IDEMPOTENCY_LOCK_TIMEOUT y
+# un duplicado concurrente espera hasta IDEMPOTENCY_WAIT antes de recibir 409.
+# IDEMPOTENCY_LOCK_TIMEOUT debe superar con holgura el timeout de las peticiones.
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 300
+IDEMPOTENCY_WAIT = 10
 
 
 LOGIN_URL = "tienda:login"
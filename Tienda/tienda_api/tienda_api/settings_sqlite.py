@@ -0,0 +1,20 @@
+"""Primario y réplica en dos archivos SQLite, para desarrollo y pruebas sin MySQL.
+
+    python manage.py test tienda --settings=tienda_api.settings_sqlite
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+    },
+}
+
+# Los dos archivos no se replican entre sí: el alias existe, pero solo lo
+# activan las pruebas del router (override_settings(REPLICA_DATABASE=...)).
+REPLICA_DATABASE = None
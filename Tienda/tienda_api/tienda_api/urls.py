@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+# Los estáticos y la media los sirve tienda.fileserver (ver wsgi.py y asgi.py);
+# en DEBUG la media queda también aquí para lo que no pase por él.
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include(("tienda.urls", "tienda"), namespace="tienda")),
@@ -13,4 +13,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tienda_api.settings')
 
-application = get_wsgi_application()
+django_application = get_wsgi_application()
+
+from tienda.fileserver import StaticFilesMiddleware  # noqa: E402  (requiere la configuración cargada)
+
+application = StaticFilesMiddleware(django_application)